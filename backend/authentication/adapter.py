@@ -5,8 +5,8 @@ from django.conf import settings
 from allauth.account.adapter import DefaultAccountAdapter
 from allauth.headless.adapter import DefaultHeadlessAdapter
 
-# Utils
-from utils.loops import send_transactional_email_task
+# Local App
+from emails.models import EmailOutbox
 
 import logging
 
@@ -89,10 +89,14 @@ class CustomAccountAdapter(DefaultAccountAdapter):
         if not transactional_id:
             raise ValueError("Transactional ID not set")
 
-        send_transactional_email_task.delay(
-            transactional_id=transactional_id,
-            email=email,
+        # Written to the outbox in the request's transaction. Auth emails are
+        # time sensitive, they are sent first and can use the reserved rate
+        # limit.
+        EmailOutbox.objects.enqueue(
+            transactional_id,
+            email,
             data_variables=email_context,
+            priority=True,
         )
 
     # def is_login_by_code_required(self, login) -> bool:
@@ -14,7 +14,7 @@ class UserAdmin(BaseUserAdmin):
     ordering = ["email"]
     list_display = ["email", "first_name", "last_name", "is_active", "is_staff"]
     fieldsets = (
-        (None, {"fields": ("email", "password")}),
+        (None, {"fields": ("email", "phone", "password")}),
         (("Personal info"), {"fields": ("first_name", "last_name")}),
         (("Permissions"), {"fields": ("is_active", "is_staff", "is_superuser")}),
         (("Important dates"), {"fields": ("last_login", "date_joined")}),
@@ -34,7 +34,7 @@ class UserAdmin(BaseUserAdmin):
             },
         ),
     )
-    search_fields = ["email"]
+    search_fields = ["email", "phone"]
     filter_horizontal = ()
 
 
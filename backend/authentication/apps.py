@@ -7,3 +7,7 @@ class AuthenticationConfig(AppConfig):
 
     def ready(self):
         from authentication import signals
+        from authentication.providers import build_providers_response
+
+        # Served as is by ProvidersListView, it only changes on deploy
+        self.providers_response = build_providers_response()
@@ -0,0 +1,50 @@
+# django
+from django.core.management.base import BaseCommand
+
+# Local App
+from authentication.tasks import (
+    ResyncStatus,
+    resync_contacts,
+    resync_loops_contacts_task,
+)
+
+
+class Command(BaseCommand):
+    help = (
+        "Resync the Loops contact of every active user. An interrupted resync "
+        "resumes where it stopped."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "--restart",
+            action="store_true",
+            help="Start over from the first user instead of the checkpoint",
+        )
+        parser.add_argument(
+            "--background",
+            action="store_true",
+            help="Queue the resync task instead of running it here",
+        )
+
+    def handle(self, *args, **options):
+        if options["background"]:
+            resync_loops_contacts_task.delay(restart=options["restart"])
+            self.stdout.write(self.style.SUCCESS("Contact resync queued"))
+            return
+
+        def progress(synced, last_pk):
+            self.stdout.write(f"{synced} contacts synced (up to user {last_pk})")
+
+        synced, status = resync_contacts(restart=options["restart"], progress=progress)
+        if status == ResyncStatus.DONE:
+            self.stdout.write(self.style.SUCCESS(f"Resync complete: {synced} contacts"))
+        elif status == ResyncStatus.LOCKED:
+            self.stdout.write(self.style.WARNING("A contact resync is already running"))
+        else:
+            self.stdout.write(
+                self.style.WARNING(
+                    f"Resync stopped after {synced} contacts, run the command "
+                    "again to resume"
+                )
+            )
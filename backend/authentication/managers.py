@@ -1,7 +1,16 @@
+import re
+
 from django.contrib.auth.models import BaseUserManager
+from django.db.models.functions import Lower
 from django.utils.translation import gettext_lazy as _
 from django.utils import timezone
 
+# E.164: a "+", the country code and the number, 15 digits at most
+E164_PHONE_RE = re.compile(r"^\+[1-9]\d{1,14}$")
+
+# Characters commonly used to group the digits of a phone number
+PHONE_SEPARATORS_RE = re.compile(r"[\s\-().]")
+
 
 class EmailUsernameUserManager(BaseUserManager):
     """
@@ -9,6 +18,44 @@ class EmailUsernameUserManager(BaseUserManager):
     for authentication instead of username.
     """
 
+    @classmethod
+    def normalize_phone(cls, phone):
+        """
+        Normalize a phone number in international format to E.164
+        (e.g. "+34 123 45 67 89" or "0034123456789" to "+34123456789").
+        Returns None for an empty phone number.
+
+        Raises:
+            ValueError: If the phone number isn't in international format
+        """
+        if not phone:
+            return None
+        phone = PHONE_SEPARATORS_RE.sub("", phone)
+        if phone.startswith("00"):
+            phone = f"+{phone[2:]}"
+        if not E164_PHONE_RE.match(phone):
+            raise ValueError(
+                _("Enter the phone number in international format, e.g. +34123456789.")
+            )
+        return phone
+
+    def filter_by_email(self, email):
+        """
+        Case-insensitive email lookup. Compares LOWER(email), which is served
+        by the unique index on it (email__iexact compares UPPER(email) and
+        scans the table).
+        """
+        return self.alias(email_lower=Lower("email")).filter(email_lower=email.lower())
+
+    def filter_by_phone(self, phone):
+        """
+        Phone lookup by the E.164 form of the phone number.
+
+        Raises:
+            ValueError: If the phone number isn't in international format
+        """
+        return self.filter(phone=self.normalize_phone(phone))
+
     def _create_user(self, email, password, **extra_fields):
         """
         Private method to create and save a user with the given email and password.
@@ -16,6 +63,7 @@ class EmailUsernameUserManager(BaseUserManager):
         if not email:
             raise ValueError(_("The Email must be set"))
         email = self.normalize_email(email)
+        extra_fields["phone"] = self.normalize_phone(extra_fields.get("phone"))
         now = timezone.now()
         extra_fields.setdefault("last_login", now)
         extra_fields.setdefault("date_joined", now)
@@ -1,6 +1,8 @@
 # django
 from django.db import models
+from django.db.models.functions import Lower
 from django.contrib.auth.models import AbstractBaseUser, PermissionsMixin
+from django.core.exceptions import ValidationError
 from django.utils import timezone
 
 # Local App
@@ -15,20 +17,46 @@ from .utils import avatar_upload_path
 # User model with email as the unique identifier
 class User(AbstractBaseUser, PermissionsMixin):
     email = models.EmailField(unique=True)
+    # E.164 (see EmailUsernameUserManager.normalize_phone), null when not set
+    phone = models.CharField(max_length=16, unique=True, null=True, blank=True)
     first_name = models.CharField(max_length=30, blank=True)
     last_name = models.CharField(max_length=30, blank=True)
     is_active = models.BooleanField(default=True)
     is_staff = models.BooleanField(default=False)
     date_joined = models.DateTimeField(default=timezone.now)
+    updated_at = models.DateTimeField(auto_now=True)
 
     USERNAME_FIELD = "email"
     REQUIRED_FIELDS = []
 
     objects = EmailUsernameUserManager()
 
+    class Meta:
+        indexes = [
+            # Email prefix filtering (LIKE 'prefix%'), the unique index on email
+            # can't serve it unless the database uses the C collation
+            models.Index(
+                fields=["email"],
+                name="user_email_prefix",
+                opclasses=["varchar_pattern_ops"],
+            ),
+        ]
+        constraints = [
+            # Emails are unique regardless of case, and the index serves the
+            # case-insensitive lookups (see EmailUsernameUserManager.filter_by_email)
+            models.UniqueConstraint(Lower("email"), name="user_email_lower_unique"),
+        ]
+
     def __str__(self):
         return self.email
 
+    def clean(self):
+        super().clean()
+        try:
+            self.phone = self.__class__.objects.normalize_phone(self.phone)
+        except ValueError as e:
+            raise ValidationError({"phone": str(e)})
+
     def get_full_name(self):
         if self.first_name:
             return self.first_name
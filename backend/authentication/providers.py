@@ -0,0 +1,55 @@
+import hashlib
+from dataclasses import dataclass
+
+# django
+from django.conf import settings
+
+# Django Rest Framework
+from rest_framework.renderers import JSONRenderer
+
+# Local App
+from .serializers import ProvidersListResponseSerializer
+
+PROVIDER_APP_PREFIX = "allauth.socialaccount.providers."
+
+
+@dataclass(frozen=True)
+class ProvidersResponse:
+    """
+    The rendered body of the providers list and its strong ETag.
+    """
+
+    body: bytes
+    etag: str
+
+
+def get_providers() -> list[dict]:
+    """
+    The social providers configured in SOCIALACCOUNT_PROVIDERS or installed
+    as apps, with their client IDs, sorted by provider id.
+    """
+    config = getattr(settings, "SOCIALACCOUNT_PROVIDERS", {})
+    provider_ids = set(config)
+    provider_ids.update(
+        app.removeprefix(PROVIDER_APP_PREFIX)
+        for app in settings.INSTALLED_APPS
+        if app.startswith(PROVIDER_APP_PREFIX)
+    )
+
+    providers = []
+    for provider_id in sorted(provider_ids):
+        app_config = config.get(provider_id, {}).get("APP", {})
+        providers.append(
+            {"provider": provider_id, "client_id": app_config.get("client_id", "")}
+        )
+    return providers
+
+
+def build_providers_response() -> ProvidersResponse:
+    """
+    Render the providers list. It only depends on the settings, so it is
+    built once when the app is ready (see AuthenticationConfig).
+    """
+    data = ProvidersListResponseSerializer({"providers": get_providers()}).data
+    body = JSONRenderer().render(data)
+    return ProvidersResponse(body=body, etag=f'"{hashlib.sha256(body).hexdigest()}"')
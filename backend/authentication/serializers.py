@@ -20,6 +20,12 @@ class StartAuthRequestSerializer(serializers.Serializer):
     email = serializers.EmailField(required=False)
     phone = serializers.CharField(required=False)
 
+    def validate_phone(self, value):
+        try:
+            return User.objects.normalize_phone(value)
+        except ValueError as e:
+            raise serializers.ValidationError(str(e))
+
     def validate(self, attrs):
         if bool(attrs.get("email")) == bool(attrs.get("phone")):
             raise serializers.ValidationError(
@@ -163,7 +169,9 @@ class UserMeSerializer(serializers.ModelSerializer):
     Serializer for current authenticated user with tenant information.
     """
 
-    tenant = SimpleTenantSerializer(read_only=True)
+    # The user is loaded with select_related("tenant_user__tenant", "profile")
+    # (see authentication.views.get_me_user)
+    tenant = SimpleTenantSerializer(source="tenant_user.tenant", read_only=True)
     tenant_user = TenantUserSimpleSerializer(read_only=True)
     profile = UserProfileSerializer(read_only=True)
 
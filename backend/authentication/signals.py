@@ -8,8 +8,9 @@ from django.dispatch import receiver
 from allauth.account.signals import email_confirmed
 from django.db.models.signals import pre_save, post_save
 from django.contrib.auth import get_user_model
-from django.db import transaction
-from utils.loops import update_or_create_contact_task
+from utils.loops import queue_contact_update
+from tenants.cache import bump_tenant_cache_version
+from tenants.models import TenantUser
 from .models import UserProfile
 
 
@@ -27,6 +28,24 @@ def create_user_profile(sender, instance, created, **kwargs):
         UserProfile.objects.create(user=instance)
 
 
+@receiver(post_save, sender=get_user_model())
+def on_user_saved(sender, instance, created, update_fields=None, **kwargs):
+    """
+    Invalidate the cached responses of the user's tenant (e.g. the member list
+    shows the user's name). Login bookkeeping saves are ignored.
+    """
+    if created or (update_fields and set(update_fields) <= {"last_login"}):
+        return
+
+    tenant_id = (
+        TenantUser.objects.filter(user_id=instance.pk)
+        .values_list("tenant_id", flat=True)
+        .first()
+    )
+    if tenant_id:
+        bump_tenant_cache_version(tenant_id)
+
+
 @receiver(email_confirmed)
 def on_email_confirmed(sender, request, email_address, **kwargs):
     """
@@ -35,7 +54,7 @@ def on_email_confirmed(sender, request, email_address, **kwargs):
     """
     log.debug(f"Request: {request}")
 
-    update_or_create_contact_task.delay(
+    queue_contact_update(
         email=email_address.email,
         firstName=email_address.user.first_name,
         lastName=email_address.user.last_name,
@@ -50,7 +69,7 @@ def on_email_confirmed(sender, request, email_address, **kwargs):
 def on_user_name_updated(sender, instance, **kwargs):
     """
     When a user updates their first and/or last name, sync the Loops contact.
-    Uses pre_save to detect changes and enqueues the task on transaction commit.
+    Uses pre_save to detect changes and buffers the update on transaction commit.
     """
     # New instance, nothing to compare
     if not instance.pk:
@@ -67,17 +86,15 @@ def on_user_name_updated(sender, instance, **kwargs):
     if not (first_name_changed or last_name_changed):
         return
 
-    def enqueue_update():
-        update_or_create_contact_task.delay(
-            email=instance.email,
-            firstName=instance.first_name,
-            lastName=instance.last_name,
-            source="app",
-            subscribed=True,
-            userGroup="app",
-            userId=instance.id,
-        )
-
-    # Send the task to update the Loops contact info after the transaction commits
+    # Buffer the Loops contact update once the transaction commits
     # This ensures the user's updated name is saved before syncing to Loops
-    transaction.on_commit(enqueue_update)
+    # A burst of changes is coalesced into one call by the periodic flush
+    queue_contact_update(
+        email=instance.email,
+        firstName=instance.first_name,
+        lastName=instance.last_name,
+        source="app",
+        subscribed=True,
+        userGroup="app",
+        userId=instance.id,
+    )
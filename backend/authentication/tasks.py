@@ -0,0 +1,194 @@
+import asyncio
+import logging
+import time
+from enum import Enum
+from itertools import islice
+from celery import shared_task
+from django.contrib.auth import get_user_model
+from utils.loops import (
+    LOOPS_CIRCUIT,
+    LOOPS_CONTACT_SYNC_BATCH_SIZE,
+    LOOPS_CONTACT_SYNC_CONCURRENCY,
+    AsyncLoopsClient,
+    LoopsPermanentError,
+    LoopsRetryableError,
+)
+from utils.redis import get_redis
+
+log = logging.getLogger(__name__)
+
+# Last user pk synced by the running (or an interrupted) resync
+CONTACT_RESYNC_CHECKPOINT_KEY = "loops:contact_resync:last_pk"
+CONTACT_RESYNC_LOCK_KEY = "loops:contact_resync:lock"
+
+# An interrupted resync resumes from its checkpoint if restarted within this
+# time (seconds), otherwise it starts over
+CONTACT_RESYNC_CHECKPOINT_TTL = 7 * 24 * 60 * 60
+
+# Users read from the database per round trip
+CONTACT_RESYNC_CHUNK_SIZE = 2000
+
+# The task stops after this time (seconds) and queues itself to continue from
+# its checkpoint, so a single run never approaches the broker's visibility
+# timeout
+CONTACT_RESYNC_TASK_TIME_LIMIT = 5 * 60
+
+# After a temporary failure the task tries again after this time (seconds),
+# or once the Loops circuit closes if that is later
+CONTACT_RESYNC_RETRY_DELAY = 60
+
+
+class ResyncStatus(Enum):
+    # Every user was synced
+    DONE = "done"
+    # Stopped after the time limit, resumes from the checkpoint
+    PAUSED = "paused"
+    # Stopped by a temporary failure (e.g. Loops is down), resumes from the
+    # checkpoint
+    FAILED = "failed"
+    # Another resync holds the lock, nothing was done
+    LOCKED = "locked"
+
+
+def _contact(pk, email, first_name, last_name, tenant_id) -> dict:
+    """
+    The Loops contact of a user, with the fields of the contact syncs. The
+    subscription is left as is.
+    """
+    return {
+        "email": email,
+        "firstName": first_name,
+        "lastName": last_name,
+        "source": "app",
+        "subscribed": None,
+        "userGroup": "app",
+        "userId": pk,
+        "tenantId": tenant_id,
+    }
+
+
+def resync_contacts(
+    restart: bool = False, time_limit: float | None = None, progress=None
+) -> tuple[int, ResyncStatus]:
+    """
+    Send the Loops contact of every active user, in pk order.
+
+    The users are streamed from the database (with their tenant) and sent in
+    batches of LOOPS_CONTACT_SYNC_BATCH_SIZE, with
+    LOOPS_CONTACT_SYNC_CONCURRENCY calls in flight, so memory use doesn't
+    depend on the number of users. The last pk synced is saved in Redis after
+    every batch and an interrupted resync resumes from it, unless `restart`.
+
+    Stops at the first temporary failure (e.g. Loops is down) or after
+    `time_limit` seconds, leaving the checkpoint for the next run. Users
+    rejected by Loops are logged and skipped.
+
+    Args:
+        progress: Called with the number of users synced and the last pk
+            after every batch
+
+    Returns:
+        tuple[int, ResyncStatus]: The number of users synced, and how the
+            resync ended
+    """
+    client = get_redis()
+    lock = client.lock(CONTACT_RESYNC_LOCK_KEY, timeout=10 * 60)
+    if not lock.acquire(blocking=False):
+        log.info("A contact resync is already running")
+        return 0, ResyncStatus.LOCKED
+
+    deadline = time.monotonic() + time_limit if time_limit else None
+    synced = 0
+    try:
+        if restart:
+            client.delete(CONTACT_RESYNC_CHECKPOINT_KEY)
+        last_pk = int(client.get(CONTACT_RESYNC_CHECKPOINT_KEY) or 0)
+        if last_pk:
+            log.info(f"Resuming the contact resync after user {last_pk}")
+
+        users = (
+            get_user_model()
+            .objects.filter(is_active=True, pk__gt=last_pk)
+            .order_by("pk")
+            .values_list(
+                "pk", "email", "first_name", "last_name", "tenant_user__tenant_id"
+            )
+            .iterator(chunk_size=CONTACT_RESYNC_CHUNK_SIZE)
+        )
+
+        # A single event loop and connection pool for the whole resync. The
+        # loop only runs while a batch is sent, the users are read in between.
+        loop = asyncio.new_event_loop()
+        loops = AsyncLoopsClient(LOOPS_CONTACT_SYNC_CONCURRENCY)
+        try:
+            while batch := list(islice(users, LOOPS_CONTACT_SYNC_BATCH_SIZE)):
+                results = loop.run_until_complete(
+                    loops.send_many(
+                        "update_or_create_contact",
+                        [_contact(*user) for user in batch],
+                    )
+                )
+
+                # The checkpoint only moves past the users synced (or
+                # rejected) without a gap
+                failed = False
+                for user, result in zip(batch, results):
+                    if isinstance(result, LoopsRetryableError):
+                        log.warning(f"Contact resync stopped at {user[1]}: {result}")
+                        failed = True
+                        break
+                    if isinstance(result, LoopsPermanentError):
+                        log.error(
+                            f"Error syncing the Loops contact {user[1]}: {result}"
+                        )
+                    elif isinstance(result, Exception):
+                        raise result
+                    else:
+                        synced += 1
+                    last_pk = user[0]
+
+                client.set(
+                    CONTACT_RESYNC_CHECKPOINT_KEY,
+                    last_pk,
+                    ex=CONTACT_RESYNC_CHECKPOINT_TTL,
+                )
+                lock.extend(10 * 60, replace_ttl=True)
+                if progress:
+                    progress(synced, last_pk)
+
+                if failed:
+                    return synced, ResyncStatus.FAILED
+                if deadline and time.monotonic() > deadline:
+                    return synced, ResyncStatus.PAUSED
+        finally:
+            loops.close()
+            loop.close()
+
+        client.delete(CONTACT_RESYNC_CHECKPOINT_KEY)
+        log.info(f"Contact resync complete, {synced} contacts synced")
+        return synced, ResyncStatus.DONE
+    finally:
+        lock.release()
+
+
+@shared_task
+def resync_loops_contacts_task(restart: bool = False):
+    """
+    Resync the Loops contact of every user, e.g. after an outage or a data
+    fix. It can be scheduled from the admin (periodic tasks).
+
+    Each run syncs for up to CONTACT_RESYNC_TASK_TIME_LIMIT seconds, then
+    queues the next run, which resumes from the checkpoint. After a temporary
+    failure the next run waits CONTACT_RESYNC_RETRY_DELAY seconds, or for the
+    Loops circuit to close. If another resync holds the lock, this run ends.
+    """
+    synced, status = resync_contacts(
+        restart=restart, time_limit=CONTACT_RESYNC_TASK_TIME_LIMIT
+    )
+    if status == ResyncStatus.PAUSED:
+        resync_loops_contacts_task.delay()
+    elif status == ResyncStatus.FAILED:
+        resync_loops_contacts_task.apply_async(
+            countdown=max(LOOPS_CIRCUIT.retry_after(), CONTACT_RESYNC_RETRY_DELAY)
+        )
+    return synced
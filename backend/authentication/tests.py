@@ -1,3 +1,293 @@
-from django.test import TestCase
+import json
+import time
+import uuid
+from unittest import skipUnless
+from unittest.mock import patch
 
-# Create your tests here.
+import redis
+
+from django.apps import apps
+from django.conf import settings
+from django.test import TestCase, override_settings
+from django.urls import reverse
+
+# Django Rest Framework
+from rest_framework.test import APIClient, APIRequestFactory
+from rest_framework.request import Request
+
+# Allauth
+from allauth.headless.constants import Client
+
+# Tenants App
+from tenants.models import Tenant, TenantUser
+
+# Utils
+from utils.ratelimit import SlidingWindow
+from utils.redis import get_redis
+
+# Local App
+from .models import User
+from .views import (
+    PARSED_BODY_ATTR,
+    SESSION_VIEWS,
+    ParsedBodyMixin,
+    StartAuthView,
+    parse_json_body,
+)
+
+
+def redis_available() -> bool:
+    try:
+        return get_redis().ping()
+    except redis.RedisError:
+        return False
+
+
+REDIS_AVAILABLE = redis_available()
+
+
+class UserMeQueriesTests(TestCase):
+    """
+    GET /auth/user/me/ loads the user, its membership, tenant and profile with
+    a single joined query.
+    """
+
+    def setUp(self):
+        self.client = APIClient()
+        self.url = reverse("user-me")
+
+    def test_me_with_tenant_is_one_query(self):
+        user = User.objects.create_user(email="owner@example.com")
+        tenant = Tenant.objects.create(name="Acme")
+        TenantUser.objects.create(user=user, tenant=tenant, role="owner")
+        self.client.force_authenticate(user)
+
+        with self.assertNumQueries(1):
+            response = self.client.get(self.url)
+
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.data["tenant"]["pk"], tenant.pk)
+        self.assertEqual(response.data["tenant_user"]["role"], "owner")
+        self.assertIn("avatar", response.data["profile"])
+
+    def test_me_without_tenant_is_one_query(self):
+        user = User.objects.create_user(email="solo@example.com")
+        self.client.force_authenticate(user)
+
+        with self.assertNumQueries(1):
+            response = self.client.get(self.url)
+
+        self.assertEqual(response.status_code, 200)
+        self.assertIsNone(response.data["tenant"])
+        self.assertIsNone(response.data["tenant_user"])
+
+
+class UserMeConditionalGetTests(TestCase):
+    """
+    GET /auth/user/me/ answers a matching If-None-Match with a 304.
+    """
+
+    def setUp(self):
+        self.client = APIClient()
+        self.user = User.objects.create_user(email="owner@example.com")
+        self.client.force_authenticate(self.user)
+        self.url = reverse("user-me")
+
+    def test_matching_etag_is_not_modified(self):
+        etag = self.client.get(self.url)["ETag"]
+
+        response = self.client.get(self.url, HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, 304)
+        self.assertFalse(response.content)
+
+    def test_changed_user_is_sent_again(self):
+        etag = self.client.get(self.url)["ETag"]
+        response = self.client.patch(self.url, {"first_name": "Ada"}, format="json")
+        self.assertEqual(response.status_code, 200)
+
+        response = self.client.get(self.url, HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, 200)
+        self.assertNotEqual(response["ETag"], etag)
+        self.assertEqual(response.data["first_name"], "Ada")
+
+
+@skipUnless(REDIS_AVAILABLE, "Redis unavailable")
+class SlidingWindowTests(TestCase):
+    def test_rejects_at_the_limit_until_the_window_slides(self):
+        window = SlidingWindow(f"test-{uuid.uuid4().hex}", limit=2, period=0.5)
+
+        self.assertEqual(window.hit("client"), 0)
+        self.assertEqual(window.hit("client"), 0)
+        retry_after = window.hit("client")
+        self.assertGreater(retry_after, 0)
+        self.assertLessEqual(retry_after, 1)
+        # Other keys have their own window
+        self.assertEqual(window.hit("other"), 0)
+
+        time.sleep(retry_after)
+        self.assertEqual(window.hit("client"), 0)
+
+
+class StartAuthThrottleIdentifierTests(TestCase):
+    """
+    The spellings of an email or phone share the same throttle bucket.
+    """
+
+    def identifier(self, payload: dict) -> str | None:
+        request = APIRequestFactory().post(
+            "/auth/browser/start/", json.dumps(payload), content_type="application/json"
+        )
+        return StartAuthView().get_throttle_identifier(Request(request))
+
+    def test_email_variants_share_an_identifier(self):
+        identifiers = {
+            self.identifier({"email": email})
+            for email in ["Foo@Example.com", " foo@example.com", "FOO@EXAMPLE.COM "]
+        }
+        self.assertEqual(identifiers, {"foo@example.com"})
+
+    def test_phone_variants_share_an_identifier(self):
+        identifiers = {
+            self.identifier({"phone": phone})
+            for phone in ["+34 600 000 000", "0034600000000", "+34 (600) 000-000"]
+        }
+        self.assertEqual(identifiers, {"+34600000000"})
+
+    def test_invalid_body_has_no_identifier(self):
+        self.assertIsNone(self.identifier({"phone": "not a phone"}))
+        self.assertIsNone(self.identifier(["foo@example.com"]))
+
+
+@skipUnless(REDIS_AVAILABLE, "Redis unavailable")
+class StartAuthThrottleTests(TestCase):
+    """
+    The start endpoint is limited per IP and per identifier, before any
+    database query.
+    """
+
+    url = "/auth/browser/start/"
+
+    def setUp(self):
+        self.client = APIClient()
+        # Fresh IPs and identifiers, the windows live in Redis
+        self.prefix = uuid.uuid4().hex[:12]
+
+    def start(self, payload: dict, ip: str):
+        # Both identifiers is a validation error, the request never reaches
+        # allauth once it passes the throttle
+        return self.client.post(
+            self.url,
+            {**payload, "phone": "+34600000000"} if "email" in payload else payload,
+            format="json",
+            REMOTE_ADDR=ip,
+        )
+
+    def throttle_rates(self, **rates):
+        return override_settings(
+            REST_FRAMEWORK={**settings.REST_FRAMEWORK, "DEFAULT_THROTTLE_RATES": rates}
+        )
+
+    def test_ip_limit_rejects_before_any_query(self):
+        ip = f"10.{uuid.uuid4().int % 250}.{uuid.uuid4().int % 250}.1"
+        with self.throttle_rates(auth_start="2/minute"):
+            for i in range(2):
+                response = self.start({"email": f"{self.prefix}-{i}@example.com"}, ip)
+                self.assertEqual(response.status_code, 400)
+
+            with self.assertNumQueries(0):
+                response = self.start({"email": f"{self.prefix}@example.com"}, ip)
+        self.assertEqual(response.status_code, 429)
+        self.assertIn("Retry-After", response)
+
+    def test_identifier_variants_share_a_limit(self):
+        email = f"{self.prefix}@example.com"
+        with self.throttle_rates(auth_start_identifier="1/minute"):
+            response = self.start({"email": email.upper()}, "10.0.0.1")
+            self.assertEqual(response.status_code, 400)
+            # Another IP and spelling of the same email
+            response = self.start({"email": f" {email}"}, "10.0.0.2")
+        self.assertEqual(response.status_code, 429)
+
+
+class ParseJsonBodyTests(TestCase):
+    """
+    The JSON body is parsed once per request and shared with the allauth
+    delegate.
+    """
+
+    def request(self, body: bytes) -> Request:
+        return Request(
+            APIRequestFactory().post(
+                "/auth/browser/start/", body, content_type="application/json"
+            )
+        )
+
+    def test_body_is_parsed_once(self):
+        request = self.request(b'{"email": "ada@example.com"}')
+        payload = parse_json_body(request)
+        self.assertEqual(payload, {"email": "ada@example.com"})
+        self.assertIs(getattr(request._request, PARSED_BODY_ATTR), payload)
+
+        with patch("authentication.views.json.loads") as loads:
+            self.assertIs(parse_json_body(request), payload)
+        loads.assert_not_called()
+
+    def test_empty_body(self):
+        self.assertEqual(parse_json_body(self.request(b"")), {})
+
+    def test_invalid_json(self):
+        self.assertIsNone(parse_json_body(self.request(b"{not json")))
+
+    def test_invalid_json_is_rejected(self):
+        response = APIClient().post(
+            "/auth/browser/start/", b"{not json", content_type="application/json"
+        )
+        self.assertEqual(response.status_code, 400)
+        self.assertEqual(response.json(), {"detail": "Invalid JSON."})
+
+
+class AllauthDelegateTests(TestCase):
+    def test_views_are_built_once_per_client(self):
+        self.assertEqual(set(SESSION_VIEWS), {client.value for client in Client})
+        for view in SESSION_VIEWS.values():
+            self.assertTrue(issubclass(view.view_class, ParsedBodyMixin))
+
+    def test_unknown_client(self):
+        response = APIClient().get("/auth/unknown/session/")
+        self.assertEqual(response.status_code, 404)
+        self.assertEqual(response.json(), {"detail": "Unknown client."})
+
+
+class ProvidersListTests(TestCase):
+    """
+    The providers list is rendered once and served with its ETag and a
+    public Cache-Control, without touching the database or the session.
+    """
+
+    def setUp(self):
+        self.client = APIClient()
+        self.url = reverse("auth-providers-list")
+        self.providers = apps.get_app_config("authentication").providers_response
+
+    def test_list(self):
+        with self.assertNumQueries(0):
+            response = self.client.get(self.url)
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.content, self.providers.body)
+        self.assertIn("providers", response.json())
+        self.assertEqual(response["ETag"], self.providers.etag)
+
+        cache_control = response["Cache-Control"]
+        self.assertIn("public", cache_control)
+        self.assertIn(f"max-age={settings.AUTH_PROVIDERS_CACHE_MAX_AGE}", cache_control)
+        self.assertNotIn("Cookie", response.get("Vary", ""))
+
+    def test_etag_match_returns_not_modified(self):
+        with self.assertNumQueries(0):
+            response = self.client.get(self.url, HTTP_IF_NONE_MATCH=self.providers.etag)
+        self.assertEqual(response.status_code, 304)
+        self.assertEqual(response.content, b"")
+        self.assertEqual(response["ETag"], self.providers.etag)
+
+        response = self.client.get(self.url, HTTP_IF_NONE_MATCH='"stale"')
+        self.assertEqual(response.status_code, 200)
@@ -1,5 +1,9 @@
 # django
+from django.apps import apps
+from django.conf import settings
 from django.contrib.auth import get_user_model
+from django.http import HttpResponse
+from django.utils.cache import get_conditional_response, patch_cache_control
 import logging
 import json
 
@@ -22,6 +26,7 @@ from allauth.headless.account.views import (
 from allauth.headless.socialaccount.views import (
     ProviderTokenView as AllauthProviderTokenView,
 )
+from allauth.headless.constants import Client
 
 # DRF Spectacular
 from drf_spectacular.utils import (
@@ -52,9 +57,139 @@ from .serializers import (
 )
 from .models import User, UserProfile
 
+# Tenants App
+from tenants.context import get_tenant_context
+
+# Utils
+from utils.conditional import conditional_get
+from utils.throttling import SlidingWindowThrottle, ThrottleFirstMixin
+
 log = logging.getLogger(__name__)
 
 
+def get_or_create_profile(user) -> UserProfile:
+    """
+    Return the user's profile, reusing the one cached on the user if it was
+    already loaded in this request.
+    """
+    try:
+        return user.profile
+    except UserProfile.DoesNotExist:
+        profile, _ = UserProfile.objects.get_or_create(user=user)
+        return profile
+
+
+def get_me_user(request) -> User:
+    """
+    Return the current user with its TenantUser, Tenant and UserProfile,
+    loaded with a single joined query once per request. The membership is
+    shared with the tenant context so it isn't loaded again.
+    """
+    target = getattr(request, "_request", request)
+    user = getattr(target, "me_user", None)
+    if user is None:
+        user = User.objects.select_related("tenant_user__tenant", "profile").get(
+            pk=request.user.pk
+        )
+        target.me_user = user
+        get_tenant_context(request).tenant_user = getattr(user, "tenant_user", None)
+    return user
+
+
+def user_me_etag_parts(view, request):
+    """
+    Validator values for the current user payload, read from the user loaded
+    for the response (see get_me_user).
+    """
+    user = get_me_user(request)
+    tenant_user = getattr(user, "tenant_user", None)
+    tenant = tenant_user and tenant_user.tenant
+    return [
+        user.pk,
+        user.updated_at,
+        tenant and (tenant.pk, tenant.updated_at),
+        tenant_user and (tenant_user.pk, tenant_user.updated_at),
+        get_or_create_profile(user).avatar.name,
+    ]
+
+
+def profile_me_etag_parts(view, request):
+    """
+    Validator values for the current user's profile.
+    """
+    return [get_or_create_profile(request.user).avatar.name]
+
+
+# ---------------------------------------------------------------------------- #
+#                               ALLAUTH DELEGATES                              #
+# ---------------------------------------------------------------------------- #
+# Attribute of the HttpRequest holding the JSON body parsed by our view
+PARSED_BODY_ATTR = "_auth_parsed_body"
+
+
+class ParsedBodyMixin:
+    """
+    Allauth view mixin reusing the JSON body already parsed by our view,
+    instead of parsing the raw body a second time.
+    """
+
+    def _parse_json(self, request):
+        if hasattr(request, PARSED_BODY_ATTR):
+            return getattr(request, PARSED_BODY_ATTR)
+        return super()._parse_json(request)
+
+
+def build_delegates(allauth_view) -> dict:
+    """
+    Build the view function of an allauth headless view for every client
+    once, instead of on every request.
+    """
+    view_class = type(allauth_view.__name__, (ParsedBodyMixin, allauth_view), {})
+    return {client.value: view_class.as_api_view(client=client) for client in Client}
+
+
+REQUEST_LOGIN_CODE_VIEWS = build_delegates(AllauthRequestLoginCodeView)
+SIGNUP_VIEWS = build_delegates(AllauthSignupView)
+CONFIRM_LOGIN_CODE_VIEWS = build_delegates(AllauthConfirmLoginCodeView)
+PROVIDER_TOKEN_VIEWS = build_delegates(AllauthProviderTokenView)
+SESSION_VIEWS = build_delegates(AllauthSessionView)
+
+
+def parse_json_body(request: Request):
+    """
+    Parse the JSON body of the request once, without touching DRF's
+    request.data (the stream is left for allauth). The result is kept on the
+    underlying HttpRequest for the throttles and the allauth delegate.
+
+    Returns:
+        The parsed body ({} if empty), or None if it isn't valid JSON
+    """
+    if hasattr(request._request, PARSED_BODY_ATTR):
+        return getattr(request._request, PARSED_BODY_ATTR)
+
+    raw_body = request._request.body
+    if not raw_body:
+        payload = {}
+    else:
+        try:
+            payload = json.loads(raw_body.decode("utf-8"))
+        except (UnicodeDecodeError, json.JSONDecodeError):
+            return None
+    setattr(request._request, PARSED_BODY_ATTR, payload)
+    return payload
+
+
+def delegate(views: dict, request: Request, client: str, *args, **kwargs):
+    """
+    Hand the underlying Django HttpRequest to the allauth view of the client,
+    so allauth handles cookies, headers and the session itself.
+    """
+    view = views.get(client)
+    if view is None:
+        return Response({"detail": "Unknown client."}, status=404)
+    return view(request._request, *args, **kwargs)
+
+
 @extend_schema_view(
     post=extend_schema(
         tags=["Authentication Email"],
@@ -104,7 +239,7 @@ log = logging.getLogger(__name__)
         ),
     )
 )
-class StartAuthView(APIView):
+class StartAuthView(ThrottleFirstMixin, APIView):
     """
     POST /auth/<client>/start
 
@@ -115,15 +250,28 @@ class StartAuthView(APIView):
     """
 
     permission_classes = [AllowAny]
-    # throttle_classes = [ScopedRateThrottle]
-    # throttle_scope = "auth_start"
+    throttle_classes = [SlidingWindowThrottle]
+    throttle_scope = "auth_start"
+
+    def get_throttle_identifier(self, request: Request) -> str | None:
+        """
+        The email or phone an auth code would be sent to, normalized so its
+        spellings share the same limit.
+        """
+        payload = parse_json_body(request)
+        if not isinstance(payload, dict):
+            return None
+        if email := payload.get("email"):
+            return str(email).strip().lower()
+        try:
+            return User.objects.normalize_phone(str(payload.get("phone") or ""))
+        except ValueError:
+            return None
 
     def post(self, request: Request, client: str, *args, **kwargs):
         # Parse JSON without touching DRF's request.data to avoid consuming the stream
-        try:
-            raw_body = request._request.body or b"{}"
-            payload = json.loads(raw_body.decode("utf-8")) if raw_body else {}
-        except json.JSONDecodeError:
+        payload = parse_json_body(request)
+        if payload is None:
             return Response({"detail": "Invalid JSON."}, status=400)
 
         # Validate input (email OR phone)
@@ -132,24 +280,20 @@ class StartAuthView(APIView):
         email = data.validated_data.get("email")
         phone = data.validated_data.get("phone")
 
-        # Determine existence by your chosen identifier.
-        # If you support phone auth, adjust this lookup accordingly.
+        # Determine existence by the identifier, both lookups are index backed
         User = get_user_model()
         exists = False
         if email:
-            exists = User._default_manager.filter(email__iexact=email).exists()
+            exists = User._default_manager.filter_by_email(email).exists()
         elif phone:
-            # If you store phone normalized (E.164), normalize before lookup.
-            exists = User._default_manager.filter(phone=phone).exists()
+            exists = User._default_manager.filter_by_phone(phone).exists()
 
         if exists:
             # Existing user → request login code
-            view = AllauthRequestLoginCodeView.as_api_view(client=client)
-            return view(request._request, *args, **kwargs)
+            return delegate(REQUEST_LOGIN_CODE_VIEWS, request, client, *args, **kwargs)
         else:
             # New user → signup flow
-            view = AllauthSignupView.as_api_view(client=client)
-            return view(request._request, *args, **kwargs)
+            return delegate(SIGNUP_VIEWS, request, client, *args, **kwargs)
 
 
 @extend_schema_view(
@@ -187,29 +331,25 @@ class StartAuthView(APIView):
         description='Use this endpoint to pass along the received one-time "special" login code.',
     )
 )
-class ConfirmLoginCodeView(APIView):
+class ConfirmLoginCodeView(ThrottleFirstMixin, APIView):
     """
     POST /auth/<client>/code/confirm
     Delegates to allauth.headless.account.views.ConfirmLoginCodeView
     """
 
     permission_classes = [AllowAny]
-    # throttle_classes = [ScopedRateThrottle]
-    # throttle_scope = "auth_code_confirm"
+    throttle_classes = [SlidingWindowThrottle]
+    throttle_scope = "auth_code_confirm"
 
     def post(self, request: Request, client: str, *args, **kwargs):
         # validate for docs + early 400s without consuming DRF request.data
-        try:
-            raw_body = request._request.body or b"{}"
-            payload = json.loads(raw_body.decode("utf-8")) if raw_body else {}
-        except json.JSONDecodeError:
+        payload = parse_json_body(request)
+        if payload is None:
             return Response({"detail": "Invalid JSON."}, status=400)
         CodeConfirmRequestSerializer(data=payload).is_valid(raise_exception=True)
 
-        # delegate to allauth's FBV created by .as_api_view(client=...)
-        allauth_view = AllauthConfirmLoginCodeView.as_api_view(client=client)
-        # IMPORTANT: pass the underlying Django HttpRequest so allauth sees the raw request
-        return allauth_view(request._request, *args, **kwargs)
+        # delegate to allauth's FBV built once per client by .as_api_view(client=...)
+        return delegate(CONFIRM_LOGIN_CODE_VIEWS, request, client, *args, **kwargs)
 
 
 @extend_schema_view(
@@ -271,7 +411,7 @@ class ConfirmLoginCodeView(APIView):
         ),
     )
 )
-class ProviderTokenView(APIView):
+class ProviderTokenView(ThrottleFirstMixin, APIView):
     """
     POST /auth/<client>/provider/token
 
@@ -279,22 +419,18 @@ class ProviderTokenView(APIView):
     """
 
     permission_classes = [AllowAny]
-    # throttle_classes = [ScopedRateThrottle]
-    # throttle_scope = "auth_provider_token"
+    throttle_classes = [SlidingWindowThrottle]
+    throttle_scope = "auth_provider_token"
 
     def post(self, request: Request, client: str, *args, **kwargs):
         # Optional: validate so your API returns clean 400s before delegating, without consuming DRF request.data
-        try:
-            raw_body = request._request.body or b"{}"
-            payload = json.loads(raw_body.decode("utf-8")) if raw_body else {}
-        except json.JSONDecodeError:
+        payload = parse_json_body(request)
+        if payload is None:
             return Response({"detail": "Invalid JSON."}, status=400)
         ProviderTokenRequestSerializer(data=payload).is_valid(raise_exception=True)
 
-        # Delegate to Allauth’s view created with the client bound in
-        allauth_view = AllauthProviderTokenView.as_api_view(client=client)
-        # Pass the underlying Django HttpRequest so Allauth handles cookies/headers/session
-        return allauth_view(request._request, *args, **kwargs)
+        # Delegate to Allauth’s view built with the client bound in
+        return delegate(PROVIDER_TOKEN_VIEWS, request, client, *args, **kwargs)
 
 
 @extend_schema_view(
@@ -316,46 +452,27 @@ class ProvidersListView(APIView):
     GET /auth/providers
 
     Returns the configured Allauth providers and their client IDs for the current site.
+    The response only changes on deploy, so it is publicly cacheable and
+    supports conditional requests (ETag / 304).
     """
 
     permission_classes = [AllowAny]
+    # Public, without reading the session the response doesn't vary on cookies
+    authentication_classes = []
 
     def get(self, request: Request, *args, **kwargs):
-        # Derive providers from settings and installed apps
-        from django.conf import settings
-
-        provider_ids = set()
-        try:
-            cfg = getattr(settings, "SOCIALACCOUNT_PROVIDERS", {})
-            if isinstance(cfg, dict):
-                provider_ids.update(cfg.keys())
-        except Exception:
-            pass
-
-        try:
-            for app in getattr(settings, "INSTALLED_APPS", []) or []:
-                prefix = "allauth.socialaccount.providers."
-                if isinstance(app, str) and app.startswith(prefix):
-                    provider_ids.add(app[len(prefix) :])
-        except Exception:
-            pass
-
-        provider_list = []
-        for provider_id in sorted(provider_ids):
-            client_id = ""
-            try:
-                app_cfg = settings.SOCIALACCOUNT_PROVIDERS.get(provider_id, {})
-                app_cfg_app = (
-                    app_cfg.get("APP", {}) if isinstance(app_cfg, dict) else {}
-                )
-                client_id = app_cfg_app.get("client_id", "")
-            except Exception:
-                client_id = ""
-
-            provider_list.append({"provider": provider_id, "client_id": client_id})
-
-        serializer = ProvidersListResponseSerializer({"providers": provider_list})
-        return Response(serializer.data)
+        # Rendered once when the app is ready (see AuthenticationConfig)
+        providers = apps.get_app_config("authentication").providers_response
+
+        response = get_conditional_response(request, etag=providers.etag)
+        if response is None:
+            response = HttpResponse(providers.body, content_type="application/json")
+        response["ETag"] = providers.etag
+        # The same for everyone, browsers and nginx can store it
+        patch_cache_control(
+            response, public=True, max_age=settings.AUTH_PROVIDERS_CACHE_MAX_AGE
+        )
+        return response
 
 
 @extend_schema_view(
@@ -428,8 +545,7 @@ class SessionView(APIView):
 
     def _delegate(self, request: Request, client: str, *args, **kwargs):
         # Delegate to Allauth FBV bound to the client
-        view = AllauthSessionView.as_api_view(client=client)
-        return view(request._request, *args, **kwargs)
+        return delegate(SESSION_VIEWS, request, client, *args, **kwargs)
 
     def get(self, request: Request, client: str, *args, **kwargs):
         return self._delegate(request, client, *args, **kwargs)
@@ -456,15 +572,16 @@ class UserViewSet(GenericViewSet):
         return UserSerializer
 
     @action(detail=False, methods=["get", "patch"])
+    @conditional_get(user_me_etag_parts)
     def me(self, request):
         if request.method == "GET":
-            return Response(self.get_serializer(request.user).data)
+            return Response(self.get_serializer(get_me_user(request)).data)
 
         partial = request.method == "PATCH"
         serializer = UserSerializer(request.user, data=request.data, partial=partial)
         serializer.is_valid(raise_exception=True)
         serializer.save()
-        return Response(UserMeSerializer(request.user).data)
+        return Response(UserMeSerializer(get_me_user(request)).data)
 
 
 @extend_schema_view(me=extend_schema(tags=["Authentication User Profile"]))
@@ -486,8 +603,9 @@ class UserProfileViewSet(GenericViewSet):
         return UserProfileSerializer
 
     @action(detail=False, methods=["get", "patch"])
+    @conditional_get(profile_me_etag_parts)
     def me(self, request):
-        profile, created = UserProfile.objects.get_or_create(user=request.user)
+        profile = get_or_create_profile(request.user)
 
         if request.method == "GET":
             serializer = UserProfileSerializer(profile, context={"request": request})
@@ -0,0 +1,66 @@
+"""
+auth_delegation.py
+
+Per request overhead of handing an authentication request to allauth: the
+view function built with as_api_view() on every request, as the views used
+to, against a lookup of the view built once at import, and the JSON body
+parsed twice (by our view and by allauth) against once.
+
+Usage (from the backend folder):
+    python -m benchmarks.auth_delegation --iterations 20000
+"""
+
+import argparse
+import json
+import os
+import time
+
+import django
+
+
+def timed(func, iterations: int) -> float:
+    """
+    Microseconds per call of `func`.
+    """
+    start = time.perf_counter()
+    for _ in range(iterations):
+        func()
+    return (time.perf_counter() - start) / iterations * 1_000_000
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.split("\n\n")[1])
+    parser.add_argument("--iterations", type=int, default=20000)
+    args = parser.parse_args()
+
+    os.environ.setdefault("DJANGO_SETTINGS_MODULE", "core.settings")
+    django.setup()
+    from allauth.headless.account.views import ConfirmLoginCodeView
+    from allauth.headless.constants import Client
+
+    from authentication.views import CONFIRM_LOGIN_CODE_VIEWS
+
+    body = json.dumps({"code": "ABC123"}).encode()
+    print(f"{args.iterations} iterations\n")
+
+    built = timed(
+        lambda: ConfirmLoginCodeView.as_api_view(client=Client.BROWSER),
+        args.iterations,
+    )
+    cached = timed(
+        lambda: CONFIRM_LOGIN_CODE_VIEWS[Client.BROWSER.value], args.iterations
+    )
+    print(f"{'view built per request':<24} {built:8.2f} us")
+    print(f"{'view built once':<24} {cached:8.2f} us")
+
+    twice = timed(
+        lambda: (json.loads(body.decode()), json.loads(body.decode())),
+        args.iterations,
+    )
+    once = timed(lambda: json.loads(body.decode()), args.iterations)
+    print(f"{'body parsed twice':<24} {twice:8.2f} us")
+    print(f"{'body parsed once':<24} {once:8.2f} us")
+
+
+if __name__ == "__main__":
+    main()
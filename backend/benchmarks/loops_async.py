@@ -0,0 +1,74 @@
+"""
+loops_async.py
+
+Throughput of a batch of transactional emails sent one call at a time with
+the LoopsClient, as a single task used to, and concurrently with the
+AsyncLoopsClient, against a local stand-in for the Loops API answering
+every request after --latency-ms. The circuit breaker and the rate limits
+are disabled, in production the sends are capped by the Loops rate limit.
+
+Usage (from the backend folder):
+    python -m benchmarks.loops_async --calls 300 --latency-ms 300 --in-flight 50
+"""
+
+import argparse
+import asyncio
+import os
+import threading
+import time
+
+from benchmarks.loops_transport import StandInServer
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.split("\n\n")[1])
+    parser.add_argument("--calls", type=int, default=300)
+    parser.add_argument("--latency-ms", type=float, default=300)
+    parser.add_argument("--handshake-ms", type=float, default=5)
+    parser.add_argument("--in-flight", type=int, default=50)
+    args = parser.parse_args()
+
+    server = StandInServer(args.handshake_ms, args.latency_ms)
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+
+    # The client reads its configuration from the environment on import
+    os.environ["LOOPS_API_URL"] = f"http://127.0.0.1:{server.server_port}/api/v1"
+    os.environ.setdefault("LOOPS_API_KEY", "benchmark")
+    from utils.loops import AsyncLoopsClient, LoopsClient, get_session
+
+    payloads = [
+        {"transactional_id": "benchmark", "email": f"user{i}@example.com"}
+        for i in range(args.calls)
+    ]
+    print(f"{args.calls} calls, {args.latency_ms} ms API latency\n")
+
+    # Sequential calls are slow, measure a sample
+    sample = payloads[: max(1, min(len(payloads), 10))]
+    client = LoopsClient(session=get_session(), circuit=None, rate_limits=None)
+    start = time.perf_counter()
+    for payload in sample:
+        client.send_transactional_email(**payload)
+    elapsed = time.perf_counter() - start
+    print(f"{'sequential':<22} {len(sample) / elapsed:8.1f} sends/s")
+
+    async def send_all():
+        async with AsyncLoopsClient(
+            args.in_flight, circuit=None, rate_limits=None
+        ) as loops:
+            return await loops.send_many("send_transactional_email", payloads)
+
+    start = time.perf_counter()
+    results = asyncio.run(send_all())
+    elapsed = time.perf_counter() - start
+    failed = sum(isinstance(result, Exception) for result in results)
+    print(
+        f"{f'async, {args.in_flight} in flight':<22} "
+        f"{len(payloads) / elapsed:8.1f} sends/s   failed {failed}   "
+        f"connections {server.connections}"
+    )
+
+    server.shutdown()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,118 @@
+"""
+loops_transport.py
+
+Per-call latency of the Loops client with and without connection reuse,
+measured against a local stand-in for the Loops API.
+
+Opening a connection to the real API costs a TCP and a TLS handshake (several
+round trips). The stand-in server simulates it by delaying every new
+connection by --handshake-ms, requests on a kept-alive connection are served
+right away.
+
+Usage (from the backend folder):
+    python -m benchmarks.loops_transport --calls 200 --handshake-ms 30
+"""
+
+import argparse
+import json
+import os
+import statistics
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+import requests
+
+
+class StandInHandler(BaseHTTPRequestHandler):
+    # HTTP/1.1 keeps the connection open between requests
+    protocol_version = "HTTP/1.1"
+    # Headers and body are written separately, avoid the delayed ACK stall
+    disable_nagle_algorithm = True
+
+    def do_POST(self):
+        self.rfile.read(int(self.headers.get("Content-Length", 0)))
+        # Simulated processing time of the API
+        time.sleep(self.server.latency)
+        body = json.dumps({"success": True}).encode()
+        self.send_response(200)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, format, *args):
+        pass
+
+
+class StandInServer(ThreadingHTTPServer):
+    daemon_threads = True
+    # Accept many concurrent connections (the default backlog is 5)
+    request_queue_size = 128
+
+    def __init__(self, handshake_ms: float, latency_ms: float = 0):
+        super().__init__(("127.0.0.1", 0), StandInHandler)
+        self.handshake = handshake_ms / 1000
+        self.latency = latency_ms / 1000
+        self.connections = 0
+
+    def get_request(self):
+        request = super().get_request()
+        # Simulated TCP + TLS handshake, paid once per new connection
+        self.connections += 1
+        time.sleep(self.handshake)
+        return request
+
+
+def run(label: str, send, calls: int, server: StandInServer):
+    connections = server.connections
+    timings = []
+    for _ in range(calls):
+        start = time.perf_counter()
+        send()
+        timings.append((time.perf_counter() - start) * 1000)
+
+    timings.sort()
+    print(
+        f"{label:<22} mean {statistics.mean(timings):7.2f} ms   "
+        f"p50 {timings[len(timings) // 2]:7.2f} ms   "
+        f"p95 {timings[int(len(timings) * 0.95) - 1]:7.2f} ms   "
+        f"connections {server.connections - connections}"
+    )
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.split("\n\n")[1])
+    parser.add_argument("--calls", type=int, default=200)
+    parser.add_argument("--handshake-ms", type=float, default=30)
+    args = parser.parse_args()
+
+    server = StandInServer(args.handshake_ms)
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    url = f"http://127.0.0.1:{server.server_port}/api/v1"
+
+    # The client reads its configuration from the environment on import
+    os.environ["LOOPS_API_URL"] = url
+    os.environ.setdefault("LOOPS_API_KEY", "benchmark")
+    from utils.loops import LoopsClient, get_session
+
+    payload = {"transactionalId": "benchmark", "email": "user@example.com"}
+
+    def send_without_reuse():
+        # What the client did before: a bare requests.post per call
+        requests.post(f"{url}/transactional", json=payload).json()
+
+    client = LoopsClient(session=get_session(), circuit=None, rate_limits=None)
+
+    def send_with_reuse():
+        client.send_transactional_email("benchmark", "user@example.com")
+
+    print(f"{args.calls} calls, {args.handshake_ms} ms simulated handshake\n")
+    run("without reuse", send_without_reuse, args.calls, server)
+    run("pooled session", send_with_reuse, args.calls, server)
+
+    server.shutdown()
+
+
+if __name__ == "__main__":
+    main()
@@ -2,7 +2,16 @@
 
 import os
 from celery import Celery
-from celery.signals import setup_logging
+from celery.signals import (
+    before_task_publish,
+    setup_logging,
+    task_failure,
+    task_postrun,
+    task_prerun,
+    worker_process_shutdown,
+    worker_shutdown,
+)
+from utils.telemetry import telemetry
 
 # Set the default Django settings module for celery
 os.environ.setdefault("DJANGO_SETTINGS_MODULE", "core.settings")
@@ -21,6 +30,46 @@ app.autodiscover_tasks()
 app.conf.broker_connection_retry_on_startup = False
 
 
+# ---------------------------------------------------------------------------- #
+#                                    QUEUES                                    #
+# ---------------------------------------------------------------------------- #
+# Each queue is consumed by its own worker (see docker/entrypoint-worker.sh),
+# so a burst of bulk work can't delay the emails a user is waiting for:
+#   - auth_mail: login and verification codes
+#   - tenant_mail: invitations and the other transactional emails
+#   - sync: Loops contact syncs and bulk maintenance jobs
+#   - celery: everything else
+AUTH_MAIL_QUEUE = "auth_mail"
+TENANT_MAIL_QUEUE = "tenant_mail"
+SYNC_QUEUE = "sync"
+DEFAULT_QUEUE = "celery"
+
+TASK_QUEUES = {
+    "authentication.tasks.resync_loops_contacts_task": SYNC_QUEUE,
+    "emails.tasks.drain_email_outbox_task": TENANT_MAIL_QUEUE,
+    "emails.tasks.purge_email_outbox_task": SYNC_QUEUE,
+    "tenants.tasks.purge_tenant_task": SYNC_QUEUE,
+    "tenants.tasks.purge_pending_tenants_task": SYNC_QUEUE,
+    "utils.loops.update_or_create_contact_task": SYNC_QUEUE,
+    "utils.loops.flush_contact_updates_task": SYNC_QUEUE,
+}
+
+
+def route_task(name, args, kwargs, options, task=None, **kw):
+    """
+    Route the tasks to their queue. Priority email drains (the
+    `priority_only` argument) go to the auth_mail queue.
+    """
+    if kwargs and kwargs.get("priority_only"):
+        if TASK_QUEUES.get(name) == TENANT_MAIL_QUEUE:
+            return {"queue": AUTH_MAIL_QUEUE}
+    return {"queue": TASK_QUEUES.get(name, DEFAULT_QUEUE)}
+
+
+app.conf.task_default_queue = DEFAULT_QUEUE
+app.conf.task_routes = (route_task,)
+
+
 # Add logging to celery
 @setup_logging.connect
 def config_loggers(*args, **kwargs):
@@ -28,3 +77,34 @@ def config_loggers(*args, **kwargs):
     from django.conf import settings
 
     dictConfig(settings.LOGGING)
+
+
+# ---------------------------------------------------------------------------- #
+#                                   TELEMETRY                                  #
+# ---------------------------------------------------------------------------- #
+# Queue wait, run time and outcome of every task, see the celery_stats command
+@before_task_publish.connect
+def on_task_publish(headers=None, **kwargs):
+    telemetry.task_published(headers)
+
+
+@task_prerun.connect
+def on_task_prerun(task=None, **kwargs):
+    telemetry.task_started(task)
+
+
+@task_postrun.connect
+def on_task_postrun(task=None, state=None, **kwargs):
+    telemetry.task_finished(task, state)
+
+
+@task_failure.connect
+def on_task_failure(sender=None, exception=None, **kwargs):
+    telemetry.task_failed(sender, exception)
+
+
+# Prefork pool processes and the main process of the other pools
+@worker_process_shutdown.connect
+@worker_shutdown.connect
+def on_worker_shutdown(**kwargs):
+    telemetry.flush(force=True)
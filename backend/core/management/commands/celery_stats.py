@@ -0,0 +1,89 @@
+import json
+
+# django
+from django.core.management.base import BaseCommand, CommandError
+
+# Utils
+from utils.telemetry import (
+    TELEMETRY_BUCKETS,
+    percentile,
+    read_task_stats,
+    reset_task_stats,
+)
+
+import redis
+
+
+def _format_seconds(seconds: float | None) -> str:
+    if seconds is None:
+        return "-"
+    if seconds == float("inf"):
+        return f"> {TELEMETRY_BUCKETS[-1]}s"
+    if seconds < 1:
+        return f"{seconds * 1000:.0f}ms"
+    return f"{seconds:.1f}s"
+
+
+class Command(BaseCommand):
+    help = (
+        "Show the queue wait, run time and outcome of the Celery tasks, "
+        "aggregated from every worker. Percentiles are bucket upper bounds."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "--json", action="store_true", help="Print the raw counters as JSON"
+        )
+        parser.add_argument(
+            "--reset", action="store_true", help="Delete the collected counters"
+        )
+
+    def handle(self, *args, **options):
+        try:
+            if options["reset"]:
+                reset_task_stats()
+                self.stdout.write(self.style.SUCCESS("Task telemetry reset"))
+                return
+            stats = read_task_stats()
+        except redis.RedisError as e:
+            raise CommandError(f"Task telemetry unavailable: {e}")
+
+        if options["json"]:
+            self.stdout.write(json.dumps(stats, indent=2, sort_keys=True))
+            return
+
+        if not stats:
+            self.stdout.write("No task telemetry collected yet")
+            return
+
+        header = (
+            f"{'Task':<48} {'Runs':>7} {'OK':>7} {'Retry':>6} {'Fail':>6} "
+            f"{'Wait p50':>9} {'Wait p95':>9} {'Run avg':>8} {'Run p95':>8}"
+        )
+        self.stdout.write(header)
+        self.stdout.write("-" * len(header))
+        for name, counters in sorted(stats.items()):
+            runs = counters.get("run:count", 0)
+            run_avg = counters.get("run:sum", 0) / runs if runs else None
+            self.stdout.write(
+                f"{name:<48} {runs:>7.0f} "
+                f"{counters.get('state:SUCCESS', 0):>7.0f} "
+                f"{counters.get('state:RETRY', 0):>6.0f} "
+                f"{counters.get('state:FAILURE', 0):>6.0f} "
+                f"{_format_seconds(percentile(counters, 'wait', 0.5)):>9} "
+                f"{_format_seconds(percentile(counters, 'wait', 0.95)):>9} "
+                f"{_format_seconds(run_avg):>8} "
+                f"{_format_seconds(percentile(counters, 'run', 0.95)):>8}"
+            )
+
+            errors = {
+                field.removeprefix("error:"): count
+                for field, count in counters.items()
+                if field.startswith("error:")
+            }
+            if errors:
+                summary = ", ".join(
+                    f"{error} x{count:.0f}"
+                    for error, count in sorted(errors.items(), key=lambda e: -e[1])
+                )
+                self.stdout.write(f"    errors: {summary}")
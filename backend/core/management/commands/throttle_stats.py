@@ -0,0 +1,58 @@
+import json
+
+# django
+from django.core.management.base import BaseCommand, CommandError
+
+# Utils
+from utils.ratelimit import read_sliding_window_stats, reset_sliding_window_stats
+
+import redis
+
+
+class Command(BaseCommand):
+    help = (
+        "Show the allowed and throttled requests of the rate limited scopes, "
+        "aggregated from every process."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "--json", action="store_true", help="Print the raw counters as JSON"
+        )
+        parser.add_argument(
+            "--reset", action="store_true", help="Delete the collected counters"
+        )
+
+    def handle(self, *args, **options):
+        try:
+            if options["reset"]:
+                reset_sliding_window_stats()
+                self.stdout.write(self.style.SUCCESS("Throttle counters reset"))
+                return
+            stats = read_sliding_window_stats()
+        except redis.RedisError as e:
+            raise CommandError(f"Throttle counters unavailable: {e}")
+
+        if options["json"]:
+            self.stdout.write(json.dumps(stats, indent=2, sort_keys=True))
+            return
+
+        if not stats:
+            self.stdout.write("No throttle counters collected yet")
+            return
+
+        header = (
+            f"{'Scope':<32} {'Key':<12} {'Allowed':>9} {'Throttled':>10} {'Rate':>6}"
+        )
+        self.stdout.write(header)
+        self.stdout.write("-" * len(header))
+        for scope, counters in sorted(stats.items()):
+            keys = sorted({field.rsplit(":", 1)[0] for field in counters})
+            for key in keys:
+                allowed = counters.get(f"{key}:allowed", 0)
+                throttled = counters.get(f"{key}:throttled", 0)
+                total = allowed + throttled
+                rate = f"{throttled / total:.0%}" if total else "-"
+                self.stdout.write(
+                    f"{scope:<32} {key:<12} {allowed:>9} {throttled:>10} {rate:>6}"
+                )
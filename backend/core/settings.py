@@ -11,6 +11,7 @@ https://docs.djangoproject.com/en/5.0/ref/settings/
 """
 
 import os
+from datetime import timedelta
 from pathlib import Path
 from dotenv import load_dotenv
 import logging.config
@@ -200,6 +201,8 @@ INSTALLED_APPS = [
     "allauth.headless",  # REST implementation of allauth
     "allauth.socialaccount",  # Django allauth Social Account
     "authentication",  # Custom authentication app
+    "emails",  # Transactional email outbox
+    "core",  # Project management commands
     # ---------------------------------- CELERY ---------------------------------- #
     "django_celery_beat",  # Celery beat
     # -------------------------------- HEALTHCHECK ------------------------------- #
@@ -232,11 +235,13 @@ if GOOGLE_OAUTH_ENABLED:
 MIDDLEWARE = [
     "django.middleware.security.SecurityMiddleware",
     "whitenoise.middleware.WhiteNoiseMiddleware",  # Whitenoise
+    "utils.dispatch.TaskBatchMiddleware",  # Publish tasks after the response
     "django.contrib.sessions.middleware.SessionMiddleware",
     "corsheaders.middleware.CorsMiddleware",  # Django CORS Headers
     "django.middleware.common.CommonMiddleware",
     "django.middleware.csrf.CsrfViewMiddleware",
     "django.contrib.auth.middleware.AuthenticationMiddleware",
+    "tenants.middleware.TenantContextMiddleware",  # Lazy request.tenant_context
     "django.contrib.messages.middleware.MessageMiddleware",
     "django.middleware.clickjacking.XFrameOptionsMiddleware",
     "allauth.account.middleware.AccountMiddleware",  # Django AllAuth
@@ -305,6 +310,23 @@ REDIS_DB = os.getenv("REDIS_DB")
 
 REDIS_URL = f"redis://{REDIS_HOST}:{REDIS_PORT}/{REDIS_DB}"
 
+# ----------------------------------- CACHE ---------------------------------- #
+# Also used for the state shared by every process (see utils/redis.py)
+CACHE_REDIS_URL = os.getenv("CACHE_REDIS_URL", REDIS_URL)
+
+# Shared by every process (web and workers), unlike the default per-process
+# LocMemCache
+CACHES = {
+    "default": {
+        "BACKEND": "django.core.cache.backends.redis.RedisCache",
+        "LOCATION": CACHE_REDIS_URL,
+        "KEY_PREFIX": "django",
+    }
+}
+
+# Read sessions from the cache, falling back to the database on a miss
+SESSION_ENGINE = "django.contrib.sessions.backends.cached_db"
+
 # ---------------------------------------------------------------------------- #
 #                             Internationalization                             #
 # ---------------------------------------------------------------------------- #
@@ -345,16 +367,29 @@ REST_FRAMEWORK = {
         # "rest_framework.authentication.TokenAuthentication",
     ),
     "DEFAULT_SCHEMA_CLASS": "drf_spectacular.openapi.AutoSchema",
+    "DEFAULT_FILTER_BACKENDS": ("django_filters.rest_framework.DjangoFilterBackend",),
     # Uncomment the following to enable throttling (rate limiting)
     # "DEFAULT_THROTTLE_CLASSES": [
     #     "rest_framework.throttling.AnonRateThrottle",
     #     "rest_framework.throttling.UserRateThrottle",
     #     "rest_framework.throttling.ScopedRateThrottle",
     # ],
-    # "DEFAULT_THROTTLE_RATES": {
-    #     "anon": "10/hour",
-    #     "user": "200/minute",
-    # },
+    "DEFAULT_THROTTLE_RATES": {
+        # "anon": "10/hour",
+        # "user": "200/minute",
+        # Auth endpoints (utils.throttling.SlidingWindowThrottle), per client IP
+        # and, with the "_identifier" suffix, per email or phone
+        "auth_start": os.getenv("THROTTLE_AUTH_START", "20/minute"),
+        "auth_start_identifier": os.getenv(
+            "THROTTLE_AUTH_START_IDENTIFIER", "5/minute"
+        ),
+        "auth_code_confirm": os.getenv("THROTTLE_AUTH_CODE_CONFIRM", "20/minute"),
+        "auth_provider_token": os.getenv("THROTTLE_AUTH_PROVIDER_TOKEN", "20/minute"),
+    },
+    # Proxies in front of Django (1 behind the deployment's nginx), the client
+    # IP is then taken from the X-Forwarded-For header they set. With 0 the
+    # header, which clients can forge, is ignored.
+    "NUM_PROXIES": int(os.getenv("NUM_PROXIES", "0")),
 }
 
 # DRF Spectacular settings
@@ -367,6 +402,9 @@ SPECTACULAR_SETTINGS = {
     "COMPONENT_SPLIT_REQUEST": True,
     "SCHEMA_PATH_PREFIX": r"/my-project/",
     "SERVERS": [{"url": "/", "description": "Current server"}],
+    "ENUM_NAME_OVERRIDES": {
+        "InvitationImportStatusEnum": "tenants.serializers.InvitationImportStatus",
+    },
 }
 
 
@@ -490,6 +528,11 @@ if GOOGLE_OAUTH_ENABLED:
     }
 
 
+# Max age (seconds) of the providers list in browser and proxy caches. It only
+# changes on deploy, after which clients may see the old list until it expires.
+AUTH_PROVIDERS_CACHE_MAX_AGE = 24 * 60 * 60
+
+
 # Site ID is needed for allauth (does nothing in this project)
 SITE_ID = 1
 
@@ -503,13 +546,49 @@ CELERY_ACCEPT_CONTENT = ["application/json"]
 CELERY_RESULT_SERIALIZER = "json"
 CELERY_TASK_SERIALIZER = "json"
 
+# The tasks are fire-and-forget, nobody reads their results: don't store them.
+# A task whose result is read must set ignore_result=False.
+CELERY_TASK_IGNORE_RESULT = True
+
 # Run celery tasks synchronously in DEBUG mode (no separate worker needed)
 CELERY_TASK_ALWAYS_EAGER = DEBUG
 CELERY_TASK_EAGER_PROPAGATES = DEBUG  # Propagate exceptions in eager mode
 
+# Acknowledge the tasks once they are done, so the tasks of a worker that dies
+# are delivered again (the tasks are idempotent). Workers reserve one task per
+# process or thread at a time: a slow task can't hold back queued ones.
+# Queues and routing are defined in core/celery.py.
+CELERY_TASK_ACKS_LATE = True
+CELERY_TASK_REJECT_ON_WORKER_LOST = True
+CELERY_WORKER_PREFETCH_MULTIPLIER = 1
+
+# Unacknowledged tasks are delivered again after this time (seconds), it must
+# be longer than the longest task and retry countdown
+CELERY_BROKER_TRANSPORT_OPTIONS = {"visibility_timeout": 60 * 60}
+
 # Configure Beat Periodic Tasks in the database
 CELERY_BEAT_SCHEDULER = "django_celery_beat.schedulers:DatabaseScheduler"
 
+# Periodic tasks defined in code (synced to the database by the scheduler)
+CELERY_BEAT_SCHEDULE = {
+    "purge-pending-tenants": {
+        "task": "tenants.tasks.purge_pending_tenants_task",
+        "schedule": 60 * 60,  # Every hour
+    },
+    "flush-loops-contacts": {
+        "task": "utils.loops.flush_contact_updates_task",
+        "schedule": 30,  # Every 30 seconds
+    },
+    "drain-email-outbox": {
+        "task": "emails.tasks.drain_email_outbox_task",
+        "schedule": 10,  # Every 10 seconds
+    },
+    "purge-email-outbox": {
+        "task": "emails.tasks.purge_email_outbox_task",
+        "schedule": 5 * 60,  # Every 5 minutes
+    },
+}
+
 
 # ---------------------------------------------------------------------------- #
 #                                     LOOPS                                    #
@@ -518,6 +597,25 @@ LOOPS_VERIFY_EMAIL_TRANSACTIONAL_ID = os.getenv("LOOPS_VERIFY_EMAIL_TRANSACTIONA
 LOOPS_LOGIN_CODE_TRANSACTIONAL_ID = os.getenv("LOOPS_LOGIN_CODE_TRANSACTIONAL_ID")
 LOOPS_INVITATION_TRANSACTIONAL_ID = os.getenv("LOOPS_INVITATION_TRANSACTIONAL_ID")
 
+# Transactional emails are written to an outbox table (emails.EmailOutbox)
+# and sent by drain_email_outbox_task in batches of this size
+EMAIL_OUTBOX_BATCH_SIZE = int(os.getenv("EMAIL_OUTBOX_BATCH_SIZE", "50"))
+
+# Number of sends of an outbox email failing temporarily before giving up
+EMAIL_OUTBOX_MAX_ATTEMPTS = int(os.getenv("EMAIL_OUTBOX_MAX_ATTEMPTS", "10"))
+
+# Time an outbox email claimed by a drainer is hidden from the others, it is
+# sent again after that if the drainer died
+EMAIL_OUTBOX_LEASE = timedelta(minutes=5)
+
+# Sent and failed outbox emails are deleted after this period. Their data
+# variables are cleared as soon as they are sent or failed.
+EMAIL_OUTBOX_RETENTION = timedelta(days=30)
+
+# Sent and failed priority emails (login and verification codes) are deleted
+# after this shorter period
+EMAIL_OUTBOX_PRIORITY_RETENTION = timedelta(minutes=15)
+
 
 # ---------------------------------------------------------------------------- #
 #                                 HEALTH CHECK                                 #
@@ -538,3 +636,28 @@ HEALTH_CHECK = {
 
 # Custom user model
 ENABLE_TENANTS = os.getenv("ENABLE_TENANTS", "True") == "True"
+
+# Max number of members serialized inline in the tenant payload
+# The full member list is served paginated by the tenant-users endpoint
+TENANT_USERS_INLINE_LIMIT = int(os.getenv("TENANT_USERS_INLINE_LIMIT", "25"))
+
+# Seconds the tenant responses and memberships are kept in the cache
+# Entries are invalidated on every change, this only bounds their lifetime
+TENANT_CACHE_TIMEOUT = int(os.getenv("TENANT_CACHE_TIMEOUT", "300"))
+
+# Tenants whose last member left are purged in the background, deleting their
+# TenantModel rows in chunks of this size to keep transactions short
+TENANT_PURGE_CHUNK_SIZE = int(os.getenv("TENANT_PURGE_CHUNK_SIZE", "500"))
+
+# Tenants still pending deletion after this period are picked up again by the
+# periodic purge-pending-tenants task
+TENANT_PURGE_GRACE_PERIOD = timedelta(hours=1)
+
+# Minimum time between two emails of the same invitation
+INVITATION_RESEND_INTERVAL = timedelta(hours=24)
+
+# Bulk invitation imports are read and inserted in batches of this size
+INVITATION_BULK_BATCH_SIZE = int(os.getenv("INVITATION_BULK_BATCH_SIZE", "500"))
+
+# Max number of rows read from a single bulk invitation import
+INVITATION_BULK_MAX_ROWS = int(os.getenv("INVITATION_BULK_MAX_ROWS", "10000"))
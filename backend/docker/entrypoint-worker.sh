@@ -5,6 +5,56 @@ do
     echo "Waiting for server volume..."
 done
 
+# Worker profile, the first argument (see the queues in core/celery.py):
+#   - auth_mail: login and verification codes, many threads so a code never
+#     waits for a free worker
+#   - tenant_mail: invitations and the other transactional emails
+#   - sync: Loops contact syncs and bulk maintenance jobs
+#   - all (default): every queue in a single worker
+# The pool, concurrency and prefetch of a profile can be overridden with the
+# CELERY_POOL, CELERY_CONCURRENCY and CELERY_PREFETCH_MULTIPLIER variables.
+# The email and sync tasks mostly wait on the network, so they run in a
+# threads pool (gevent can be used too, once installed).
+PROFILE=${1:-all}
+
+case "$PROFILE" in
+    auth_mail)
+        QUEUES=auth_mail
+        POOL=threads
+        CONCURRENCY=8
+        PREFETCH=1
+        ;;
+    tenant_mail)
+        QUEUES=tenant_mail
+        POOL=threads
+        CONCURRENCY=4
+        PREFETCH=1
+        ;;
+    sync)
+        QUEUES=sync
+        POOL=threads
+        CONCURRENCY=4
+        PREFETCH=4
+        ;;
+    all)
+        QUEUES=auth_mail,tenant_mail,sync,celery
+        POOL=prefork
+        CONCURRENCY=1
+        PREFETCH=1
+        ;;
+    *)
+        QUEUES=$PROFILE
+        POOL=prefork
+        CONCURRENCY=1
+        PREFETCH=1
+        ;;
+esac
+
 # run a worker
-echo "Starting celery worker..."
-celery -A core worker -l info --concurrency 1 -E
\ No newline at end of file
+echo "Starting celery worker ($PROFILE)..."
+celery -A core worker -l info -E \
+    -n "$PROFILE@%h" \
+    -Q "$QUEUES" \
+    --pool "${CELERY_POOL:-$POOL}" \
+    --concurrency "${CELERY_CONCURRENCY:-$CONCURRENCY}" \
+    --prefetch-multiplier "${CELERY_PREFETCH_MULTIPLIER:-$PREFETCH}"
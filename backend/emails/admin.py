@@ -0,0 +1,40 @@
+# django
+from django.contrib import admin
+
+# Local App
+from .models import EmailOutbox
+
+
+@admin.register(EmailOutbox)
+class EmailOutboxAdmin(admin.ModelAdmin):
+    list_display = [
+        "email",
+        "transactional_id",
+        "status",
+        "priority",
+        "attempts",
+        "next_attempt_at",
+        "sent_at",
+    ]
+    search_fields = ["email", "idempotency_key"]
+    ordering = ["-created_at"]
+    list_filter = ["status", "priority", "transactional_id"]
+    readonly_fields = ["idempotency_key", "attempts", "sent_at", "created_at"]
+    # The data variables (e.g. login codes) are never shown
+    fieldsets = (
+        (None, {"fields": ["transactional_id", "email"]}),
+        (
+            "Delivery",
+            {
+                "fields": [
+                    "status",
+                    "priority",
+                    "next_attempt_at",
+                    "attempts",
+                    "last_error",
+                    "sent_at",
+                ]
+            },
+        ),
+        ("Metadata", {"fields": ["idempotency_key", "created_at"]}),
+    )
@@ -0,0 +1,139 @@
+import uuid
+from django.db import models
+from django.db.models import Q
+from django.utils import timezone
+
+
+class EmailOutboxStatus(models.TextChoices):
+    PENDING = "pending", "Pending"
+    SENT = "sent", "Sent"
+    FAILED = "failed", "Failed"
+
+
+class EmailOutboxManager(models.Manager):
+    def build(
+        self,
+        transactional_id: str,
+        email: str,
+        data_variables: dict | None = None,
+        idempotency_key: str | None = None,
+        priority: bool = False,
+    ) -> "EmailOutbox":
+        """
+        Build an unsaved outbox row, e.g. to insert many with `enqueue_many`.
+        """
+        if not transactional_id:
+            raise ValueError("Transactional ID not set")
+        return self.model(
+            transactional_id=transactional_id,
+            email=email,
+            data_variables=data_variables or {},
+            idempotency_key=idempotency_key or uuid.uuid4().hex,
+            priority=priority,
+        )
+
+    def enqueue(self, transactional_id: str, email: str, **kwargs) -> bool:
+        """
+        Queue a transactional email, in the current transaction: the email is
+        only sent if the change triggering it commits.
+
+        Args:
+            transactional_id (str): The id of the Loops email template
+            email (str): The email address of the recipient
+            data_variables (dict): The data variables of the template
+            idempotency_key (str): Identifies the email, it is queued once
+                per key. Defaults to a random key.
+            priority (bool): Time sensitive email (e.g. a login code), sent
+                first and allowed to use the reserved rate limit
+
+        Returns:
+            bool: False if an email with the same key was already queued
+        """
+        return self.enqueue_many([self.build(transactional_id, email, **kwargs)]) == 1
+
+    def enqueue_many(self, outbox_emails: list["EmailOutbox"]) -> int:
+        """
+        Insert built outbox rows with a single query, skipping the keys
+        already queued. Returns the number of rows inserted.
+        """
+        from emails.tasks import drain_email_outbox_task
+        from utils.dispatch import dispatch
+
+        keys = [outbox_email.idempotency_key for outbox_email in outbox_emails]
+        existing = set(
+            self.filter(idempotency_key__in=keys).values_list(
+                "idempotency_key", flat=True
+            )
+        )
+        new = {
+            outbox_email.idempotency_key: outbox_email
+            for outbox_email in outbox_emails
+            if outbox_email.idempotency_key not in existing
+        }
+        # A concurrent insert of the same key is skipped by the unique index
+        self.bulk_create(new.values(), ignore_conflicts=True)
+
+        # Drain right away rather than at the next periodic run. The rows are
+        # already stored, so if the broker is down they are only delayed.
+        if any(outbox_email.priority for outbox_email in new.values()):
+            dispatch(drain_email_outbox_task, priority_only=True)
+        elif new:
+            dispatch(drain_email_outbox_task)
+        return len(new)
+
+
+class EmailOutbox(models.Model):
+    """
+    Transactional email waiting to be sent (or sent) through Loops.
+
+    Rows are written in the same transaction as the change triggering the
+    email and sent in batches by emails.tasks.drain_email_outbox_task.
+    """
+
+    # Loops template, recipient and template variables (cleared once the email
+    # is sent or failed, they can hold login codes)
+    transactional_id = models.CharField(max_length=100)
+    email = models.EmailField()
+    data_variables = models.JSONField(default=dict, blank=True)
+
+    # Sent as the Loops Idempotency-Key header too, so a retried call can't
+    # send the email twice
+    idempotency_key = models.CharField(max_length=100, unique=True)
+
+    # Priority emails are sent first and can use the reserved rate limit
+    priority = models.BooleanField(default=False)
+
+    status = models.CharField(
+        max_length=10,
+        choices=EmailOutboxStatus.choices,
+        default=EmailOutboxStatus.PENDING,
+    )
+    attempts = models.PositiveSmallIntegerField(default=0)
+    # Pending rows are sent from this date, it is pushed back while a
+    # drainer sends the row and after a temporary failure
+    next_attempt_at = models.DateTimeField(default=timezone.now)
+    last_error = models.TextField(blank=True)
+    sent_at = models.DateTimeField(blank=True, null=True)
+
+    # Meta
+    created_at = models.DateTimeField(auto_now_add=True)
+    updated_at = models.DateTimeField(auto_now=True)
+
+    objects = EmailOutboxManager()
+
+    class Meta:
+        verbose_name = "Outbox email"
+        verbose_name_plural = "Outbox emails"
+        indexes = [
+            # Rows due to be sent, the drainer's query
+            models.Index(
+                fields=["-priority", "next_attempt_at"],
+                name="emailoutbox_pending_due",
+                condition=Q(status=EmailOutboxStatus.PENDING),
+            ),
+            # Purge of old rows
+            models.Index(fields=["status", "updated_at"], name="emailoutbox_status"),
+        ]
+
+    def __str__(self):
+        return f"{self.email} ({self.transactional_id})"
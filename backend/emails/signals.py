@@ -0,0 +1,5 @@
+from django.dispatch import Signal
+
+# Sent with `outbox_emails` (the EmailOutbox rows) when emails failed for good,
+# rejected by Loops or out of attempts, e.g. so they can be sent again
+email_outbox_failed = Signal()
@@ -0,0 +1,235 @@
+import logging
+import time
+import uuid
+from datetime import timedelta
+
+import redis
+from celery import shared_task
+from celery.utils.time import get_exponential_backoff_interval
+from django.conf import settings
+from django.db import transaction
+from django.db.models import F, Q
+from django.utils import timezone
+from emails.models import EmailOutbox, EmailOutboxStatus
+from emails.signals import email_outbox_failed
+from utils.idempotency import DONE, claim_keys, complete_keys, release_keys
+from utils.loops import (
+    LOOPS_CIRCUIT,
+    LOOPS_RETRY_POLICY,
+    LoopsPermanentError,
+    LoopsRetryableError,
+    run_loops_batch,
+)
+
+log = logging.getLogger(__name__)
+
+# The idempotency key of a sent email is kept this long (seconds)
+EMAIL_SENT_KEY_TTL = 24 * 60 * 60
+
+
+def _email_key(outbox_email: EmailOutbox) -> str:
+    return f"idempotency:email:{outbox_email.idempotency_key}"
+
+
+def _claim_batch(batch_size: int, priority_only: bool = False) -> list[EmailOutbox]:
+    """
+    Claim up to `batch_size` pending emails that are due, priority first
+    (only priority ones if `priority_only`).
+
+    Rows locked by a concurrent drainer are skipped, and the claimed rows are
+    leased for EMAIL_OUTBOX_LEASE by pushing back their next attempt, so no
+    other drainer picks them up once the claim commits. If the worker dies
+    the lease expires and the rows are sent again (with the same
+    idempotency key).
+    """
+    now = timezone.now()
+    queryset = EmailOutbox.objects.filter(
+        status=EmailOutboxStatus.PENDING, next_attempt_at__lte=now
+    )
+    if priority_only:
+        queryset = queryset.filter(priority=True)
+    with transaction.atomic():
+        outbox_emails = list(
+            queryset.select_for_update(skip_locked=True).order_by(
+                "-priority", "next_attempt_at"
+            )[:batch_size]
+        )
+        EmailOutbox.objects.filter(
+            pk__in=[outbox_email.pk for outbox_email in outbox_emails]
+        ).update(
+            attempts=F("attempts") + 1,
+            next_attempt_at=now + settings.EMAIL_OUTBOX_LEASE,
+            updated_at=now,
+        )
+    return outbox_emails
+
+
+def _send_batch(outbox_emails: list[EmailOutbox]) -> tuple[int, int]:
+    """
+    Send claimed emails concurrently and record their outcome. Returns the
+    number of emails sent and deferred.
+
+    Each email is sent under a Redis lease on its idempotency key, kept once
+    it is sent. An email already sent by a drainer that died before
+    recording it is marked sent without calling Loops again, and an email
+    still being sent by a drainer whose claim expired is left to it. If
+    Redis is unavailable the emails are sent anyway, Loops dedupes the calls
+    by their Idempotency-Key header.
+    """
+    token = f"drain:{uuid.uuid4().hex}"
+    lease = int(settings.EMAIL_OUTBOX_LEASE.total_seconds())
+    try:
+        states = claim_keys(
+            [_email_key(outbox_email) for outbox_email in outbox_emails], token, lease
+        )
+    except redis.RedisError as e:
+        log.warning(f"Outbox idempotency keys unavailable ({e})")
+        states = {}
+
+    already_sent = []
+    to_send = []
+    for outbox_email in outbox_emails:
+        state = states.get(_email_key(outbox_email))
+        if state == DONE:
+            already_sent.append(outbox_email.pk)
+        elif state is None:
+            to_send.append(outbox_email)
+        else:
+            # Being sent by another drainer, its row stays leased
+            log.info(f"Outbox email {outbox_email.pk} already being sent")
+    outbox_emails = to_send
+
+    results = run_loops_batch(
+        "send_transactional_email",
+        [
+            {
+                "transactional_id": outbox_email.transactional_id,
+                "email": outbox_email.email,
+                "data_variables": outbox_email.data_variables,
+                "priority": outbox_email.priority,
+                "idempotency_key": outbox_email.idempotency_key,
+            }
+            for outbox_email in outbox_emails
+        ],
+    )
+
+    now = timezone.now()
+    sent = []
+    failed = []
+    gave_up = []
+    deferred = 0
+    for outbox_email, result in zip(outbox_emails, results):
+        if not isinstance(result, Exception):
+            sent.append(outbox_email)
+            continue
+
+        failed.append(outbox_email)
+        attempts = outbox_email.attempts + 1
+        if isinstance(result, LoopsPermanentError):
+            log.error(f"Error sending email to {outbox_email.email}: {result}")
+            changes = {"status": EmailOutboxStatus.FAILED, "data_variables": {}}
+            gave_up.append(outbox_email)
+        elif attempts >= settings.EMAIL_OUTBOX_MAX_ATTEMPTS:
+            log.error(
+                f"Giving up sending email to {outbox_email.email} after "
+                f"{attempts} attempts: {result}"
+            )
+            changes = {"status": EmailOutboxStatus.FAILED, "data_variables": {}}
+            gave_up.append(outbox_email)
+        else:
+            if not isinstance(result, LoopsRetryableError):
+                log.error(
+                    f"Unexpected error sending email to {outbox_email.email}",
+                    exc_info=result,
+                )
+            # Same backoff as the tasks retrying Loops calls
+            countdown = get_exponential_backoff_interval(
+                factor=LOOPS_RETRY_POLICY["retry_backoff"],
+                retries=attempts - 1,
+                maximum=LOOPS_RETRY_POLICY["retry_backoff_max"],
+                full_jitter=True,
+            )
+            countdown = max(countdown, getattr(result, "retry_after", None) or 0)
+            changes = {"next_attempt_at": now + timedelta(seconds=countdown)}
+            deferred += 1
+
+        EmailOutbox.objects.filter(pk=outbox_email.pk).update(
+            last_error=str(result)[:1000], updated_at=now, **changes
+        )
+
+    # Keep the keys of the sent emails, release the others so they can be
+    # sent again
+    complete_keys(
+        [_email_key(outbox_email) for outbox_email in sent], EMAIL_SENT_KEY_TTL
+    )
+    release_keys([_email_key(outbox_email) for outbox_email in failed], token)
+    if gave_up:
+        email_outbox_failed.send(sender=EmailOutbox, outbox_emails=gave_up)
+
+    # The data variables (e.g. login codes) aren't kept once the email is
+    # sent or failed
+    sent = [outbox_email.pk for outbox_email in sent] + already_sent
+    EmailOutbox.objects.filter(pk__in=sent).update(
+        status=EmailOutboxStatus.SENT,
+        sent_at=now,
+        data_variables={},
+        last_error="",
+        updated_at=now,
+    )
+    return len(sent), deferred
+
+
+@shared_task
+def drain_email_outbox_task(priority_only: bool = False):
+    """
+    Send the pending emails of the outbox in batches of
+    EMAIL_OUTBOX_BATCH_SIZE, until none is due.
+
+    Runs periodically and is also queued when emails are added, with
+    `priority_only` for priority emails so it is routed to the auth_mail
+    queue and never waits behind the others. Concurrent runs claim different
+    rows. The run stops before the lease of its rows
+    could expire, or when Loops is unavailable.
+    """
+    deadline = time.monotonic() + settings.EMAIL_OUTBOX_LEASE.total_seconds() / 2
+
+    sent = 0
+    while time.monotonic() < deadline:
+        outbox_emails = _claim_batch(settings.EMAIL_OUTBOX_BATCH_SIZE, priority_only)
+        if not outbox_emails:
+            break
+
+        batch_sent, deferred = _send_batch(outbox_emails)
+        sent += batch_sent
+        if deferred and LOOPS_CIRCUIT.retry_after():
+            log.warning("Loops is unavailable, stopping the outbox drain")
+            break
+
+    if sent:
+        log.info(f"Sent {sent} outbox emails")
+    return sent
+
+
+@shared_task
+def purge_email_outbox_task():
+    """
+    Periodic task deleting the sent and failed emails older than
+    EMAIL_OUTBOX_RETENTION (EMAIL_OUTBOX_PRIORITY_RETENTION for priority
+    emails), in chunks.
+    """
+    now = timezone.now()
+    queryset = EmailOutbox.objects.filter(
+        Q(updated_at__lt=now - settings.EMAIL_OUTBOX_RETENTION)
+        | Q(
+            priority=True, updated_at__lt=now - settings.EMAIL_OUTBOX_PRIORITY_RETENTION
+        ),
+        status__in=[EmailOutboxStatus.SENT, EmailOutboxStatus.FAILED],
+    )
+
+    deleted = 0
+    while pks := list(queryset.values_list("pk", flat=True)[:1000]):
+        EmailOutbox.objects.filter(pk__in=pks).delete()
+        deleted += len(pks)
+
+    log.info(f"Purged {deleted} outbox emails")
+    return deleted
@@ -0,0 +1,328 @@
+import time
+import uuid
+from datetime import timedelta
+from unittest import mock, skipUnless
+
+import redis
+
+from django.conf import settings
+from django.test import TestCase
+from django.utils import timezone
+
+# Utils
+from utils.circuit import CircuitBreaker
+from utils.idempotency import DONE
+from utils.loops import (
+    LoopsClient,
+    LoopsPermanentError,
+    LoopsRetryableError,
+    update_or_create_contact_task,
+)
+from utils.ratelimit import TokenBucket
+from utils.redis import get_redis
+
+# Local App
+from .models import EmailOutbox, EmailOutboxStatus
+from .tasks import (
+    _claim_batch,
+    _email_key,
+    _send_batch,
+    drain_email_outbox_task,
+    purge_email_outbox_task,
+)
+
+
+def redis_available() -> bool:
+    try:
+        return get_redis().ping()
+    except redis.RedisError:
+        return False
+
+
+REDIS_AVAILABLE = redis_available()
+
+
+def create_outbox_email(**fields) -> EmailOutbox:
+    fields = {
+        "transactional_id": "template",
+        "email": "user@example.com",
+        "data_variables": {"code": "123456"},
+        "idempotency_key": uuid.uuid4().hex,
+        **fields,
+    }
+    return EmailOutbox.objects.create(**fields)
+
+
+class EmailOutboxDrainTests(TestCase):
+    """
+    Claiming and sending the outbox rows, with Loops and the Redis
+    idempotency keys mocked.
+    """
+
+    def setUp(self):
+        self.run_loops_batch = self.patch("run_loops_batch")
+        self.claim_keys = self.patch("claim_keys", return_value={})
+        self.complete_keys = self.patch("complete_keys")
+        self.release_keys = self.patch("release_keys")
+
+    def patch(self, name, **kwargs):
+        patcher = mock.patch(f"emails.tasks.{name}", **kwargs)
+        self.addCleanup(patcher.stop)
+        return patcher.start()
+
+    def test_claim_skips_leased_and_done_rows(self):
+        now = timezone.now()
+        due = create_outbox_email()
+        create_outbox_email(next_attempt_at=now + timedelta(minutes=1))
+        create_outbox_email(status=EmailOutboxStatus.SENT)
+        create_outbox_email(status=EmailOutboxStatus.FAILED)
+
+        self.assertEqual(_claim_batch(10), [due])
+
+        # The claimed row is leased, the next claim skips it
+        due.refresh_from_db()
+        self.assertEqual(due.attempts, 1)
+        self.assertGreaterEqual(due.next_attempt_at, now + settings.EMAIL_OUTBOX_LEASE)
+        self.assertEqual(_claim_batch(10), [])
+
+    def test_claim_priority_rows_first(self):
+        bulk = create_outbox_email()
+        priority = create_outbox_email(priority=True)
+
+        self.assertEqual(_claim_batch(10, priority_only=True), [priority])
+        EmailOutbox.objects.update(next_attempt_at=timezone.now())
+        self.assertEqual(_claim_batch(10), [priority, bulk])
+
+    def test_sent_row(self):
+        outbox_email = create_outbox_email()
+        self.run_loops_batch.return_value = [True]
+
+        self.assertEqual(drain_email_outbox_task(), 1)
+
+        outbox_email.refresh_from_db()
+        self.assertEqual(outbox_email.status, EmailOutboxStatus.SENT)
+        self.assertIsNotNone(outbox_email.sent_at)
+        self.assertEqual(outbox_email.data_variables, {})
+        self.complete_keys.assert_called_once_with([_email_key(outbox_email)], mock.ANY)
+
+    def test_row_sent_by_a_dead_drainer_is_not_sent_again(self):
+        outbox_email = create_outbox_email()
+        self.claim_keys.return_value = {_email_key(outbox_email): DONE}
+        self.run_loops_batch.return_value = []
+
+        _send_batch(_claim_batch(10))
+
+        self.assertEqual(self.run_loops_batch.call_args.args[1], [])
+        outbox_email.refresh_from_db()
+        self.assertEqual(outbox_email.status, EmailOutboxStatus.SENT)
+
+    def test_temporary_failure_defers_the_row(self):
+        outbox_email = create_outbox_email()
+        self.run_loops_batch.return_value = [
+            LoopsRetryableError("Timeout", retry_after=120)
+        ]
+        start = timezone.now()
+
+        self.assertEqual(_send_batch(_claim_batch(10)), (0, 1))
+
+        outbox_email.refresh_from_db()
+        self.assertEqual(outbox_email.status, EmailOutboxStatus.PENDING)
+        self.assertEqual(outbox_email.attempts, 1)
+        self.assertGreaterEqual(
+            outbox_email.next_attempt_at, start + timedelta(seconds=120)
+        )
+        self.assertEqual(outbox_email.last_error, "Timeout")
+        # Kept for the next attempt
+        self.assertEqual(outbox_email.data_variables, {"code": "123456"})
+        self.release_keys.assert_called_once_with([_email_key(outbox_email)], mock.ANY)
+
+    def test_permanent_error_fails_the_row(self):
+        outbox_email = create_outbox_email()
+        self.run_loops_batch.return_value = [LoopsPermanentError("Invalid email")]
+
+        self.assertEqual(_send_batch(_claim_batch(10)), (0, 0))
+
+        outbox_email.refresh_from_db()
+        self.assertEqual(outbox_email.status, EmailOutboxStatus.FAILED)
+        self.assertEqual(outbox_email.last_error, "Invalid email")
+        self.assertEqual(outbox_email.data_variables, {})
+
+    def test_last_attempt_fails_the_row(self):
+        outbox_email = create_outbox_email(
+            attempts=settings.EMAIL_OUTBOX_MAX_ATTEMPTS - 1
+        )
+        self.run_loops_batch.return_value = [LoopsRetryableError("Timeout")]
+
+        _send_batch(_claim_batch(10))
+
+        outbox_email.refresh_from_db()
+        self.assertEqual(outbox_email.status, EmailOutboxStatus.FAILED)
+        self.assertEqual(outbox_email.data_variables, {})
+
+
+class EmailOutboxPurgeTests(TestCase):
+    def test_purges_old_terminal_rows_only(self):
+        now = timezone.now()
+        old = now - settings.EMAIL_OUTBOX_RETENTION - timedelta(minutes=1)
+        recent = now - settings.EMAIL_OUTBOX_PRIORITY_RETENTION - timedelta(minutes=1)
+        rows = {
+            "old sent": (EmailOutboxStatus.SENT, False, old),
+            "old failed": (EmailOutboxStatus.FAILED, False, old),
+            "old pending": (EmailOutboxStatus.PENDING, False, old),
+            "recent sent": (EmailOutboxStatus.SENT, False, recent),
+            "recent priority sent": (EmailOutboxStatus.SENT, True, recent),
+            "recent priority pending": (EmailOutboxStatus.PENDING, True, recent),
+            "new priority sent": (EmailOutboxStatus.SENT, True, now),
+        }
+        for name, (status, priority, updated_at) in rows.items():
+            outbox_email = create_outbox_email(
+                transactional_id=name, status=status, priority=priority
+            )
+            # updated_at is set on save, not on update()
+            EmailOutbox.objects.filter(pk=outbox_email.pk).update(updated_at=updated_at)
+
+        self.assertEqual(purge_email_outbox_task(), 3)
+        self.assertEqual(
+            set(EmailOutbox.objects.values_list("transactional_id", flat=True)),
+            {
+                "old pending",
+                "recent sent",
+                "recent priority pending",
+                "new priority sent",
+            },
+        )
+
+
+@skipUnless(REDIS_AVAILABLE, "Redis unavailable")
+class CircuitBreakerTests(TestCase):
+    def setUp(self):
+        self.circuit = CircuitBreaker(
+            f"test-{uuid.uuid4().hex}", failure_threshold=3, reset_timeout=1
+        )
+
+    def test_opens_after_the_failure_threshold(self):
+        for _ in range(2):
+            self.circuit.record_failure()
+        self.assertEqual(self.circuit.retry_after(), 0)
+
+        self.circuit.record_failure()
+        retry_after = self.circuit.retry_after()
+        self.assertGreater(retry_after, 0)
+        self.assertLessEqual(retry_after, 1)
+
+    def test_half_open_after_the_reset_timeout(self):
+        for _ in range(3):
+            self.circuit.record_failure()
+        time.sleep(self.circuit.retry_after())
+
+        # Calls go through again, but a single failure opens it again
+        self.assertEqual(self.circuit.retry_after(), 0)
+        self.circuit.record_failure()
+        self.assertGreater(self.circuit.retry_after(), 0)
+
+    def test_success_closes_it(self):
+        for _ in range(3):
+            self.circuit.record_failure()
+        time.sleep(self.circuit.retry_after())
+
+        self.circuit.record_success()
+        self.circuit.record_failure()
+        self.assertEqual(self.circuit.retry_after(), 0)
+
+
+class LoopsClientTests(TestCase):
+    """
+    The Loops responses are mapped to retryable or permanent errors and
+    recorded by the circuit breaker.
+    """
+
+    def setUp(self):
+        self.session = mock.Mock()
+        self.circuit = mock.Mock()
+        self.circuit.retry_after.return_value = 0
+        self.loops = LoopsClient(
+            "key", session=self.session, circuit=self.circuit, rate_limits=None
+        )
+
+    def respond(self, status_code: int, body: dict | None = None, headers=None):
+        response = mock.Mock(status_code=status_code, headers=headers or {})
+        response.json.return_value = body or {}
+        self.session.post.return_value = response
+
+    def send(self):
+        return self.loops.send_transactional_email("template", "user@example.com")
+
+    def test_sent(self):
+        self.respond(200, {"success": True})
+        self.assertTrue(self.send())
+        self.circuit.record_success.assert_called_once()
+
+    def test_server_error_is_retryable(self):
+        self.respond(503)
+        with self.assertRaises(LoopsRetryableError):
+            self.send()
+        self.circuit.record_failure.assert_called_once()
+
+    def test_rate_limited_is_retried_after_the_header(self):
+        self.respond(429, headers={"Retry-After": "12"})
+        with self.assertRaises(LoopsRetryableError) as raised:
+            self.send()
+        self.assertEqual(raised.exception.retry_after, 12)
+
+    def test_rejected_is_permanent(self):
+        self.respond(400, {"message": "Invalid email"})
+        with self.assertRaises(LoopsPermanentError):
+            self.send()
+        # Loops answered, the circuit isn't affected
+        self.circuit.record_failure.assert_not_called()
+
+    def test_open_circuit_fails_fast(self):
+        self.circuit.retry_after.return_value = 20
+        with self.assertRaises(LoopsRetryableError) as raised:
+            self.send()
+        self.assertEqual(raised.exception.retry_after, 20)
+        self.session.post.assert_not_called()
+
+    def test_task_retry_waits_for_the_retry_after(self):
+        error = LoopsRetryableError("Rate limited", retry_after=30)
+        with mock.patch("celery.app.task.Task.retry") as retry:
+            update_or_create_contact_task.retry(exc=error, countdown=5)
+        self.assertGreaterEqual(retry.call_args.kwargs["countdown"], 30)
+
+
+@skipUnless(REDIS_AVAILABLE, "Redis unavailable")
+class TokenBucketTests(TestCase):
+    def bucket(self, **kwargs) -> TokenBucket:
+        return TokenBucket(f"test-{uuid.uuid4().hex}", **kwargs)
+
+    def test_refills_over_time(self):
+        bucket = self.bucket(rate=10, capacity=2)
+        self.assertEqual(bucket.acquire(), 0)
+        self.assertEqual(bucket.acquire(), 0)
+
+        wait = bucket.acquire()
+        self.assertGreater(wait, 0)
+        self.assertLessEqual(wait, 0.1)
+        time.sleep(wait)
+        self.assertEqual(bucket.acquire(), 0)
+
+    def test_reserve_is_left_to_priority_calls(self):
+        bucket = self.bucket(rate=1, capacity=2, reserve=1)
+        self.assertEqual(bucket.acquire(), 0)
+        self.assertGreater(bucket.acquire(), 0)
+        self.assertEqual(bucket.acquire(priority=True), 0)
+
+    def test_wait_is_capped(self):
+        bucket = self.bucket(rate=1)
+        self.assertEqual(bucket.acquire(), 0)
+
+        start = time.monotonic()
+        retry_after = bucket.wait(max_wait=0.1)
+        # Gives up right away rather than sleeping past max_wait
+        self.assertLess(time.monotonic() - start, 0.1)
+        self.assertGreater(retry_after, 0.1)
+
+    def test_wait_for_a_token_within_max_wait(self):
+        bucket = self.bucket(rate=10, capacity=1)
+        self.assertEqual(bucket.acquire(), 0)
+        self.assertEqual(bucket.wait(max_wait=1), 0)
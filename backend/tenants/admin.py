@@ -16,14 +16,14 @@ class TenantUserInline(admin.TabularInline):
 # Register the Tenant model
 @admin.register(Tenant)
 class TenantAdmin(admin.ModelAdmin):
-    list_display = ["name", "created_at"]
+    list_display = ["name", "created_at", "deletion_requested_at"]
     search_fields = ["name"]
     ordering = ["-created_at"]
-    list_filter = ["created_at"]
-    readonly_fields = ["created_at"]
+    list_filter = ["created_at", "deletion_requested_at"]
+    readonly_fields = ["created_at", "deletion_requested_at"]
     fieldsets = (
         (None, {"fields": ["name", "slug", "website", "phone", "email"]}),
-        ("Metadata", {"fields": ["created_at"]}),
+        ("Metadata", {"fields": ["created_at", "deletion_requested_at"]}),
     )
     add_fieldsets = ((None, {"fields": ["name"]}),)
 
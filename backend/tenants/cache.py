@@ -0,0 +1,132 @@
+import hashlib
+import time
+from functools import wraps
+
+# django
+from django.conf import settings
+from django.core.cache import cache
+from django.db import transaction
+from django.utils.cache import get_conditional_response, patch_cache_control
+
+# Django Rest Framework
+from rest_framework.response import Response
+
+# Local App
+from .context import get_tenant_context, membership_cache_key
+
+
+# ---------------------------------------------------------------------------- #
+#                                 INVALIDATION                                 #
+# ---------------------------------------------------------------------------- #
+def _version_key(tenant_id) -> str:
+    return f"tenants:{tenant_id}:version"
+
+
+def get_tenant_cache_version(tenant_id) -> int:
+    """
+    Return the current cache version of a tenant. Every cached response of
+    the tenant is stored under this version, so bumping it invalidates all of
+    them at once without scanning keys.
+    """
+    key = _version_key(tenant_id)
+    version = cache.get(key)
+    if version is None:
+        # Start from the current time so that, if the version key gets evicted,
+        # entries stored under an older version can't be served again
+        cache.add(key, time.time_ns(), timeout=None)
+        version = cache.get(key)
+    return version
+
+
+def bump_tenant_cache_version(tenant_id):
+    """
+    Invalidate every cached response of a tenant once the current
+    transaction commits (right away if there is none), so a concurrent
+    request can't cache data read before the commit under the new version.
+    """
+
+    def bump():
+        try:
+            cache.incr(_version_key(tenant_id))
+        except ValueError:
+            # The key doesn't exist (never read or evicted)
+            cache.set(_version_key(tenant_id), time.time_ns(), timeout=None)
+
+    transaction.on_commit(bump)
+
+
+def invalidate_membership(user_id):
+    """
+    Drop the cached tenant membership (ids and role) of a user on commit.
+    """
+    transaction.on_commit(lambda: cache.delete(membership_cache_key(user_id)))
+
+
+# ---------------------------------------------------------------------------- #
+#                                RESPONSE CACHE                                #
+# ---------------------------------------------------------------------------- #
+def cache_tenant_response(namespace: str, per_member: bool = False):
+    """
+    Decorator for read-heavy tenant endpoints caching the response data in the
+    tenant's cache namespace.
+
+    Cache hits are answered from the cache alone: the tenant comes from the
+    cached membership and the stored ETag (if the wrapped handler sets one)
+    is used to answer conditional requests with a 304.
+
+    Args:
+        namespace (str): The name of the cached resource, e.g. "tenant_users"
+        per_member (bool): Cache one entry per member instead of one per tenant,
+            for payloads including data of the caller (e.g. its role)
+    """
+
+    def decorator(handler):
+        @wraps(handler)
+        def wrapper(view, request, *args, **kwargs):
+            if request.method != "GET":
+                return handler(view, request, *args, **kwargs)
+
+            membership = get_tenant_context(request).membership
+            if membership is None:
+                return handler(view, request, *args, **kwargs)
+
+            # The full URI covers the query string (filters, cursors) and the
+            # host used to build the pagination links
+            renderer = getattr(request, "accepted_renderer", None)
+            variant = hashlib.sha1(
+                f"{getattr(renderer, 'format', '')}:{request.build_absolute_uri()}".encode()
+            ).hexdigest()
+            key = ":".join(
+                [
+                    "tenants",
+                    str(membership.tenant_id),
+                    f"v{get_tenant_cache_version(membership.tenant_id)}",
+                    namespace,
+                    str(membership.tenant_user_id) if per_member else "all",
+                    variant,
+                ]
+            )
+
+            cached = cache.get(key)
+            if cached is not None:
+                data, etag = cached
+                response = get_conditional_response(request, etag=etag) or Response(
+                    data
+                )
+                if etag:
+                    response["ETag"] = etag
+                    patch_cache_control(response, private=True, no_cache=True)
+                return response
+
+            response = handler(view, request, *args, **kwargs)
+            if response.status_code == 200 and hasattr(response, "data"):
+                cache.set(
+                    key,
+                    (response.data, response.get("ETag")),
+                    settings.TENANT_CACHE_TIMEOUT,
+                )
+            return response
+
+        return wrapper
+
+    return decorator
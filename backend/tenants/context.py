@@ -0,0 +1,116 @@
+from functools import cached_property
+from typing import NamedTuple
+
+# django
+from django.conf import settings
+from django.core.cache import cache
+
+# Local App
+from .models import TenantUser, TenantUserRole
+
+
+class Membership(NamedTuple):
+    """
+    The ids and role of a user's membership, small enough to be cached.
+    """
+
+    tenant_user_id: int
+    tenant_id: int
+    role: str
+
+
+def membership_cache_key(user_id) -> str:
+    return f"tenants:membership:{user_id}"
+
+
+class TenantContext:
+    """
+    Per-request tenant information for the authenticated user.
+
+    The membership (ids and role) is read from the cache, which is enough for
+    permission checks, tenant filtering and cache lookups. The TenantUser and
+    its Tenant are only loaded, with a single joined query, when a view needs
+    the model instances. The loaded TenantUser is also stored on `request.user`
+    so legacy `request.user.tenant_user.tenant` chains don't hit the database.
+    """
+
+    def __init__(self, request):
+        self._request = request
+
+    @property
+    def _user(self):
+        # Use the request's current user: DRF propagates the authenticated
+        # user back to the underlying Django request, so this also works
+        # for users authenticated by DRF instead of the session middleware
+        user = getattr(self._request, "user", None)
+        if user is None or not user.is_authenticated:
+            return None
+        return user
+
+    @cached_property
+    def tenant_user(self) -> TenantUser | None:
+        user = self._user
+        if user is None:
+            return None
+
+        tenant_user = (
+            TenantUser.objects.select_related("tenant").filter(user_id=user.pk).first()
+        )
+        if tenant_user is not None:
+            # Seed the reverse relation cache on the user object
+            user.tenant_user = tenant_user
+        return tenant_user
+
+    @cached_property
+    def membership(self) -> Membership | None:
+        user = self._user
+        if user is None:
+            return None
+
+        key = membership_cache_key(user.pk)
+        membership = cache.get(key)
+        if membership is None:
+            tenant_user = self.tenant_user
+            # Users without a tenant are cached as an empty tuple
+            membership = (
+                (tenant_user.pk, tenant_user.tenant_id, tenant_user.role)
+                if tenant_user
+                else ()
+            )
+            cache.set(key, membership, settings.TENANT_CACHE_TIMEOUT)
+        return Membership(*membership) if membership else None
+
+    @property
+    def tenant(self):
+        tenant_user = self.tenant_user
+        return tenant_user.tenant if tenant_user else None
+
+    @property
+    def tenant_id(self) -> int | None:
+        membership = self.membership
+        return membership.tenant_id if membership else None
+
+    @property
+    def role(self) -> str | None:
+        membership = self.membership
+        return membership.role if membership else None
+
+    @property
+    def is_owner_or_admin(self) -> bool:
+        return self.role in (TenantUserRole.OWNER, TenantUserRole.ADMIN)
+
+
+def get_tenant_context(request) -> TenantContext:
+    """
+    Return the tenant context attached to the request by the
+    TenantContextMiddleware, creating it if the middleware didn't run
+    (e.g. requests built with DRF's APIRequestFactory).
+    """
+    context = getattr(request, "tenant_context", None)
+    if context is None:
+        # DRF's Request proxies attribute reads to the Django request, so
+        # store the context on the underlying request when there is one
+        target = getattr(request, "_request", request)
+        context = TenantContext(target)
+        target.tenant_context = context
+    return context
@@ -0,0 +1,39 @@
+import django_filters
+
+# Local App
+from .models import Invitation, TenantUser
+
+
+class TenantUserFilter(django_filters.FilterSet):
+    """
+    Filters for the tenant users listing.
+
+    `role` is served by the (tenant, role, created_at) index and `email` is a
+    case-sensitive prefix match served by the email pattern index.
+    """
+
+    email = django_filters.CharFilter(
+        field_name="user__email", lookup_expr="startswith"
+    )
+
+    class Meta:
+        model = TenantUser
+        fields = ["role", "email"]
+
+
+class InvitationFilter(django_filters.FilterSet):
+    """
+    Filters for the invitations listing.
+
+    `accepted=false` returns the pending invitations, `accepted=true` the
+    accepted ones, both served by the (tenant, accepted_at, created_at) index.
+    """
+
+    email = django_filters.CharFilter(lookup_expr="startswith")
+    accepted = django_filters.BooleanFilter(
+        field_name="accepted_at", lookup_expr="isnull", exclude=True
+    )
+
+    class Meta:
+        model = Invitation
+        fields = ["email", "accepted"]
@@ -0,0 +1,19 @@
+# Local App
+from .context import TenantContext
+
+
+class TenantContextMiddleware:
+    """
+    Attach a lazily evaluated TenantContext to every request as
+    `request.tenant_context`.
+
+    Must be placed after django.contrib.auth's AuthenticationMiddleware.
+    Nothing is queried unless a view, permission or serializer reads from it.
+    """
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+
+    def __call__(self, request):
+        request.tenant_context = TenantContext(request)
+        return self.get_response(request)
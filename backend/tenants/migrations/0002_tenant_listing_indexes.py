@@ -0,0 +1,48 @@
+# Generated by Django 5.2.18 on 2026-10-17 23:40
+
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("tenants", "0001_initial"),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name="invitation",
+            index=models.Index(
+                fields=["tenant", "created_at", "id"], name="invitation_tenant_created"
+            ),
+        ),
+        migrations.AddIndex(
+            model_name="invitation",
+            index=models.Index(
+                fields=["tenant", "accepted_at", "created_at"],
+                name="invitation_tenant_accepted",
+            ),
+        ),
+        migrations.AddIndex(
+            model_name="invitation",
+            index=models.Index(
+                fields=["email"],
+                name="invitation_email_prefix",
+                opclasses=["varchar_pattern_ops"],
+            ),
+        ),
+        migrations.AddIndex(
+            model_name="tenantuser",
+            index=models.Index(
+                fields=["tenant", "created_at", "id"], name="tenantuser_tenant_created"
+            ),
+        ),
+        migrations.AddIndex(
+            model_name="tenantuser",
+            index=models.Index(
+                fields=["tenant", "role", "created_at"], name="tenantuser_tenant_role"
+            ),
+        ),
+    ]
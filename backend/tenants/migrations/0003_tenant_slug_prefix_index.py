@@ -0,0 +1,21 @@
+# Generated by Django 5.2.18 on 2026-10-17 23:41
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("tenants", "0002_tenant_listing_indexes"),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name="tenant",
+            index=models.Index(
+                fields=["slug"],
+                name="tenant_slug_prefix",
+                opclasses=["varchar_pattern_ops"],
+            ),
+        ),
+    ]
@@ -0,0 +1,18 @@
+# Generated by Django 5.2.18 on 2026-10-17 23:44
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("tenants", "0003_tenant_slug_prefix_index"),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name="tenant",
+            name="deletion_requested_at",
+            field=models.DateTimeField(blank=True, null=True),
+        ),
+    ]
@@ -0,0 +1,23 @@
+# Generated by Django 5.2.18 on 2026-10-18 00:33
+
+import django.db.models.functions.text
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("tenants", "0004_tenant_deletion_requested_at"),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name="invitation",
+            index=models.Index(
+                django.db.models.functions.text.Lower("email"),
+                name="invitation_email_lower",
+            ),
+        ),
+    ]
@@ -1,5 +1,8 @@
 from rest_framework.exceptions import PermissionDenied
 
+# Local App
+from .context import get_tenant_context
+
 
 class TenantAwareMixin:
     def get_queryset(self):
@@ -8,17 +11,19 @@ class TenantAwareMixin:
         # queryset = super().get_queryset()  # This applies tenant filtering
         # Then do whatever you need with the queryset
         return (
-            super().get_queryset().filter(tenant=self.request.user.tenant_user.tenant)
+            super()
+            .get_queryset()
+            .filter(tenant_id=get_tenant_context(self.request).tenant_id)
         )
 
     def perform_create(self, serializer):
         # Set the tenant automatically on create
         # IMPORTANT: If this function is overridden, the tenant must be set manually
-        serializer.save(tenant=self.request.user.tenant_user.tenant)
+        serializer.save(tenant=get_tenant_context(self.request).tenant)
 
     def perform_update(self, serializer):
         # Prevent tenant changes
         # IMPORTANT: If this function is overridden, the tenant must be set manually
-        if serializer.instance.tenant != self.request.user.tenant_user.tenant:
+        if serializer.instance.tenant_id != get_tenant_context(self.request).tenant_id:
             raise PermissionDenied("You cannot change the tenant of this object")
         serializer.save()
@@ -1,9 +1,15 @@
-import random
+import re
 from django.conf import settings
-from django.db import models
+from django.db import IntegrityError, models, transaction
+from django.db.models import BigIntegerField, Count, Max, Q
+from django.db.models.functions import Cast, Lower, Substr
 from django.forms import ValidationError
 from django.utils.text import slugify
 
+# Max number of times a new tenant is saved with a freshly allocated slug
+# before giving up, only reached if concurrent signups keep taking the slug
+SLUG_ALLOCATION_ATTEMPTS = 5
+
 
 class Tenant(models.Model):
     name = models.CharField(max_length=100, unique=False)
@@ -14,20 +20,75 @@ class Tenant(models.Model):
     phone = models.CharField(max_length=20, blank=True)
     email = models.EmailField(blank=True)
 
+    # Set when the last member leaves, the tenant is then purged in the
+    # background by tenants.tasks.purge_tenant_task
+    deletion_requested_at = models.DateTimeField(blank=True, null=True)
+
     # Meta
     created_at = models.DateTimeField(auto_now_add=True)
     updated_at = models.DateTimeField(auto_now=True)
 
+    class Meta:
+        indexes = [
+            # Prefix lookups (LIKE 'base-%') used to allocate slugs
+            models.Index(
+                fields=["slug"],
+                name="tenant_slug_prefix",
+                opclasses=["varchar_pattern_ops"],
+            ),
+        ]
+
     def __str__(self):
         return self.name
 
+    @property
+    def is_pending_deletion(self) -> bool:
+        return self.deletion_requested_at is not None
+
+    @classmethod
+    def allocate_slug(cls, name: str) -> str:
+        """
+        Return a free slug for the given name with a single query.
+
+        The slug is `<base>` if it is free, otherwise `<base>-<n>` where `n`
+        is one more than the highest numeric suffix already in use.
+        """
+        # Leave room for the numeric suffix within the field's max length
+        base = slugify(name)[:90].strip("-") or "tenant"
+        prefix = f"{base}-"
+
+        suffixed = Q(
+            slug__startswith=prefix, slug__regex=rf"^{re.escape(prefix)}[0-9]{{1,18}}$"
+        )
+        result = cls.objects.filter(Q(slug=base) | suffixed).aggregate(
+            base_taken=Count("pk", filter=Q(slug=base)),
+            max_suffix=Max(
+                Cast(Substr("slug", len(prefix) + 1), BigIntegerField()),
+                filter=suffixed,
+            ),
+        )
+
+        if not result["base_taken"] and result["max_suffix"] is None:
+            return base
+        return f"{prefix}{(result['max_suffix'] or 0) + 1}"
+
     def save(self, *args, **kwargs):
         # Code to create the unique slug for the tenant upon save
-        if not self.pk:
-            self.slug = slugify(self.name)
-            while Tenant.objects.filter(slug=self.slug).exists():
-                self.slug = f"{slugify(self.name)}-{random.randint(0, 1000)}"
-        super().save(*args, **kwargs)
+        if self.pk:
+            super().save(*args, **kwargs)
+            return
+
+        # A concurrent signup may take the allocated slug between the lookup
+        # and the insert, the unique constraint catches it and we retry
+        for attempt in range(SLUG_ALLOCATION_ATTEMPTS):
+            self.slug = Tenant.allocate_slug(self.name)
+            try:
+                with transaction.atomic():
+                    super().save(*args, **kwargs)
+                return
+            except IntegrityError:
+                if attempt == SLUG_ALLOCATION_ATTEMPTS - 1:
+                    raise
 
 
 class TenantLogo(models.Model):
@@ -57,12 +118,42 @@ class TenantUserRole(models.TextChoices):
     USER = "user", "User"
 
 
+class TenantUserQuerySet(models.QuerySet):
+    """
+    Bulk writes don't send post_save, so they invalidate the cached
+    memberships of the users and the cached responses of their tenants here
+    (see tenants.signals for the single object writes). bulk_update goes
+    through update().
+    """
+
+    def _invalidate(self, members):
+        from tenants.cache import bump_tenant_cache_version, invalidate_membership
+
+        for user_id in {user_id for user_id, _ in members}:
+            invalidate_membership(user_id)
+        for tenant_id in {tenant_id for _, tenant_id in members}:
+            bump_tenant_cache_version(tenant_id)
+
+    def update(self, **kwargs):
+        members = list(self.values_list("user_id", "tenant_id"))
+        rows = super().update(**kwargs)
+        self._invalidate(members)
+        return rows
+
+    def bulk_create(self, objs, *args, **kwargs):
+        created = super().bulk_create(objs, *args, **kwargs)
+        self._invalidate([(obj.user_id, obj.tenant_id) for obj in created])
+        return created
+
+
 class TenantUser(models.Model):
     """
     Model to store the relationship between a user and a tenant
     with the role of the user in the tenant.
     """
 
+    objects = TenantUserQuerySet.as_manager()
+
     user = models.OneToOneField(
         settings.AUTH_USER_MODEL, on_delete=models.CASCADE, related_name="tenant_user"
     )
@@ -77,6 +168,18 @@ class TenantUser(models.Model):
     created_at = models.DateTimeField(auto_now_add=True)
     updated_at = models.DateTimeField(auto_now=True)
 
+    class Meta:
+        indexes = [
+            # Keyset pagination of the members of a tenant
+            models.Index(
+                fields=["tenant", "created_at", "id"], name="tenantuser_tenant_created"
+            ),
+            # Members of a tenant filtered by role
+            models.Index(
+                fields=["tenant", "role", "created_at"], name="tenantuser_tenant_role"
+            ),
+        ]
+
     def save(self, *args, **kwargs):
         if not self.pk:
             self.email = self.user.email
@@ -107,6 +210,27 @@ class Invitation(TenantModel):
     created_at = models.DateTimeField(auto_now_add=True)
     updated_at = models.DateTimeField(auto_now=True)
 
+    class Meta:
+        indexes = [
+            # Keyset pagination of the invitations of a tenant
+            models.Index(
+                fields=["tenant", "created_at", "id"], name="invitation_tenant_created"
+            ),
+            # Pending / accepted invitations of a tenant
+            models.Index(
+                fields=["tenant", "accepted_at", "created_at"],
+                name="invitation_tenant_accepted",
+            ),
+            # Email prefix filtering (LIKE 'prefix%')
+            models.Index(
+                fields=["email"],
+                name="invitation_email_prefix",
+                opclasses=["varchar_pattern_ops"],
+            ),
+            # Case-insensitive lookups of the bulk import
+            models.Index(Lower("email"), name="invitation_email_lower"),
+        ]
+
     def __str__(self):
         return self.email
 
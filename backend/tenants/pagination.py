@@ -0,0 +1,16 @@
+from rest_framework.pagination import CursorPagination
+
+
+class TenantCursorPagination(CursorPagination):
+    """
+    Keyset pagination for tenant scoped listings.
+
+    Pages are resolved with `WHERE created_at > <cursor> ORDER BY created_at, pk
+    LIMIT <page_size>`, so the cost of a page does not depend on how many rows
+    the tenant has or how deep the client has scrolled.
+    """
+
+    page_size = 50
+    page_size_query_param = "page_size"
+    max_page_size = 200
+    ordering = ("created_at", "pk")
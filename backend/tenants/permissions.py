@@ -1,5 +1,8 @@
 from rest_framework.permissions import BasePermission
 
+# Local App
+from .context import get_tenant_context
+
 
 class IsOwnerOrAdmin(BasePermission):
     """
@@ -7,11 +10,7 @@ class IsOwnerOrAdmin(BasePermission):
     """
 
     def has_permission(self, request, view):
-        if request.user.tenant_user.role.lower() in ["owner", "admin"]:
-            return True
-        return False
+        return get_tenant_context(request).is_owner_or_admin
 
     def has_object_permission(self, request, view, obj):
-        if request.user.tenant_user.role.lower() in ["owner", "admin"]:
-            return True
-        return False
+        return get_tenant_context(request).is_owner_or_admin
@@ -1,10 +1,22 @@
+import csv
+import io
+
 # django REST framework
 from rest_framework import serializers
 from drf_spectacular.utils import extend_schema_field
 from django.conf import settings
+from django.core.exceptions import ValidationError as DjangoValidationError
+from django.core.validators import validate_email
+from django.db import models, transaction
+from django.db.models import Prefetch
+from django.db.models.functions import Lower
+from django.utils.translation import gettext_lazy as _
 
 # Local App
+from .cache import bump_tenant_cache_version
+from .context import get_tenant_context
 from .models import Invitation, Tenant, TenantLogo, TenantUser
+from .tasks import queue_invitation_emails
 
 
 # ---------------------------------------------------------------------------- #
@@ -78,12 +90,38 @@ class TenantSerializer(serializers.ModelSerializer):
             "updated_at",
         ]
 
+    @classmethod
+    def prefetch_queryset(cls, queryset):
+        """
+        Load everything the serializer reads in a fixed number of queries:
+        the tenant and its logo in one joined query, plus one query for the
+        capped inline member preview, whatever the member count.
+        """
+        inline_tenant_users = (
+            TenantUser.objects.select_related("user")
+            .filter(user__is_superuser=False)
+            .order_by("created_at", "pk")
+        )
+        return queryset.select_related("logo").prefetch_related(
+            Prefetch(
+                "tenant_users",
+                queryset=inline_tenant_users[: settings.TENANT_USERS_INLINE_LIMIT],
+                to_attr="inline_tenant_users",
+            )
+        )
+
     @extend_schema_field(TenantUserListSerializer(many=True))
     def get_tenant_users(self, obj):
-        # Filter out tenant users linked to superusers
-        tenant_users = obj.tenant_users.select_related("user").filter(
-            user__is_superuser=False
-        )
+        # Capped preview of the members, the full list is served paginated
+        # by the tenant-users endpoint
+        tenant_users = getattr(obj, "inline_tenant_users", None)
+        if tenant_users is None:
+            # Filter out tenant users linked to superusers
+            tenant_users = (
+                obj.tenant_users.select_related("user")
+                .filter(user__is_superuser=False)
+                .order_by("created_at", "pk")[: settings.TENANT_USERS_INLINE_LIMIT]
+            )
         return TenantUserListSerializer(tenant_users, many=True).data
 
     @extend_schema_field(serializers.BooleanField())
@@ -94,8 +132,9 @@ class TenantSerializer(serializers.ModelSerializer):
     def get_me(self, obj):
         request = self.context.get("request")
         if request and request.user.is_authenticated:
-            tenant_user = obj.tenant_users.filter(user=request.user).first()
-            if tenant_user:
+            # Already loaded by the tenant context, no extra query
+            tenant_user = get_tenant_context(request).tenant_user
+            if tenant_user and tenant_user.tenant_id == obj.pk:
                 return TenantUserSimpleSerializer(tenant_user).data
         return None
 
@@ -131,3 +170,187 @@ class InvitationSerializer(serializers.ModelSerializer):
             "created_at",
             "updated_at",
         ]
+
+
+# ---------------------------------------------------------------------------- #
+#                                 BULK IMPORT                                  #
+# ---------------------------------------------------------------------------- #
+class InvitationImportStatus(models.TextChoices):
+    INVITED = "invited", _("Invited")
+    INVALID = "invalid", _("Invalid email")
+    DUPLICATE = "duplicate", _("Duplicated in the import")
+    MEMBER = "member", _("Already a member of a tenant")
+    ALREADY_INVITED = "already_invited", _("Already invited")
+
+
+class InvitationImportRowSerializer(serializers.Serializer):
+    row = serializers.IntegerField()
+    email = serializers.CharField()
+    status = serializers.ChoiceField(choices=InvitationImportStatus.choices)
+
+
+class InvitationImportResultSerializer(serializers.Serializer):
+    invited = serializers.IntegerField()
+    results = InvitationImportRowSerializer(many=True)
+
+
+class InvitationImportSerializer(serializers.Serializer):
+    """
+    Bulk invitation import from either a CSV file (one email per row, or an
+    `email` column if the first row is a header) or a JSON list of emails.
+    """
+
+    file = serializers.FileField(required=False)
+    emails = serializers.ListField(
+        child=serializers.CharField(allow_blank=True),
+        required=False,
+        max_length=settings.INVITATION_BULK_MAX_ROWS,
+    )
+
+    def validate(self, attrs):
+        if ("file" in attrs) == ("emails" in attrs):
+            raise serializers.ValidationError(
+                _("Provide either a CSV file or a list of emails.")
+            )
+        return attrs
+
+    def _iter_rows(self, validated_data):
+        """
+        Yield `(row number, raw email)` pairs without loading the file in memory.
+        """
+        if "emails" in validated_data:
+            yield from enumerate(validated_data["emails"], start=1)
+            return
+
+        upload = validated_data["file"]
+        upload.seek(0)
+        stream = io.TextIOWrapper(upload.file, encoding="utf-8-sig", newline="")
+        try:
+            reader = csv.reader(stream)
+            column = 0
+            for row in reader:
+                if reader.line_num == 1:
+                    header = [cell.strip().lower() for cell in row]
+                    if "email" in header:
+                        column = header.index("email")
+                        continue
+                if not any(cell.strip() for cell in row):
+                    # Skip empty lines
+                    continue
+                yield reader.line_num, row[column] if column < len(row) else ""
+        except (UnicodeDecodeError, csv.Error):
+            raise serializers.ValidationError(
+                {"file": _("The file is not a valid UTF-8 CSV file.")}
+            )
+        finally:
+            # Don't let the wrapper close the uploaded file
+            stream.detach()
+
+    def _import_batch(self, batch, tenant, invited_by, seen, results):
+        """
+        Validate a batch of rows with set-based queries, bulk insert the new
+        invitations and queue their emails. Returns the created invitation
+        pks.
+        """
+        pending = []
+        for row, raw in batch:
+            email = raw.strip().lower()
+            try:
+                validate_email(email)
+            except DjangoValidationError:
+                results.append(
+                    {"row": row, "email": raw, "status": InvitationImportStatus.INVALID}
+                )
+                continue
+            if email in seen:
+                results.append(
+                    {
+                        "row": row,
+                        "email": email,
+                        "status": InvitationImportStatus.DUPLICATE,
+                    }
+                )
+                continue
+            seen.add(email)
+            pending.append((row, email))
+
+        # The emails are lowercased, compare them with LOWER(email), served by
+        # the user_email_lower_unique and invitation_email_lower indexes
+        emails = [email for row, email in pending]
+        members = set(
+            TenantUser.objects.annotate(email_lower=Lower("user__email"))
+            .filter(email_lower__in=emails)
+            .values_list("email_lower", flat=True)
+        )
+        invited = set(
+            Invitation.objects.annotate(email_lower=Lower("email"))
+            .filter(email_lower__in=emails)
+            .values_list("email_lower", flat=True)
+        )
+
+        new_invitations = []
+        for row, email in pending:
+            if email in members:
+                status = InvitationImportStatus.MEMBER
+            elif email in invited:
+                status = InvitationImportStatus.ALREADY_INVITED
+            else:
+                status = InvitationImportStatus.INVITED
+                new_invitations.append(
+                    Invitation(tenant=tenant, invited_by=invited_by, email=email)
+                )
+            results.append({"row": row, "email": email, "status": status})
+
+        # bulk_create doesn't send the post_save signal, the emails of the
+        # batch are queued together instead
+        invitation_pks = [
+            invitation.pk
+            for invitation in Invitation.objects.bulk_create(new_invitations)
+        ]
+        queue_invitation_emails(invitation_pks)
+        return invitation_pks
+
+    def create(self, validated_data):
+        """
+        The rows are read as a stream and processed in batches: each batch is
+        checked against the existing members and invitations with two queries
+        and its new invitations are inserted with a single `bulk_create`.
+        The emails of each batch are written to the email outbox. The whole
+        import runs in one transaction, so it is either fully applied, emails
+        included, or not at all.
+        """
+        tenant = validated_data["tenant"]
+        invited_by = validated_data["invited_by"]
+        batch_size = settings.INVITATION_BULK_BATCH_SIZE
+
+        results = []
+        invitation_pks = []
+        seen = set()
+        with transaction.atomic():
+            batch = []
+            for count, row in enumerate(self._iter_rows(validated_data), start=1):
+                if count > settings.INVITATION_BULK_MAX_ROWS:
+                    raise serializers.ValidationError(
+                        {
+                            "file": _("The import is limited to %(max)d rows.")
+                            % {"max": settings.INVITATION_BULK_MAX_ROWS}
+                        }
+                    )
+                batch.append(row)
+                if len(batch) == batch_size:
+                    invitation_pks.extend(
+                        self._import_batch(batch, tenant, invited_by, seen, results)
+                    )
+                    batch = []
+            if batch:
+                invitation_pks.extend(
+                    self._import_batch(batch, tenant, invited_by, seen, results)
+                )
+
+            if invitation_pks:
+                # No signal was sent either for the tenant's cached responses
+                bump_tenant_cache_version(tenant.pk)
+
+        # Invalid and duplicated rows are reported before the rest of their batch
+        results.sort(key=lambda result: result["row"])
+        return {"invited": len(invitation_pks), "results": results}
@@ -3,40 +3,96 @@ import logging
 
 from django.db.models.signals import post_delete, post_save
 from django.dispatch import receiver
-from tenants.models import Tenant, TenantUser, Invitation, TenantUserRole
-from tenants.tasks import send_invitation_email_task
+from tenants.cache import bump_tenant_cache_version, invalidate_membership
+from tenants.models import Tenant, TenantLogo, TenantUser, Invitation, TenantUserRole
+from tenants.tasks import (
+    purge_tenant_task,
+    queue_invitation_emails,
+    release_invitation_emails,
+)
+from emails.signals import email_outbox_failed
 from allauth.account.signals import user_signed_up
 from django.utils import timezone
+from utils.dispatch import dispatch
 
 log = logging.getLogger(__name__)
 
 
+@receiver(post_save, sender=Tenant)
+@receiver(post_delete, sender=Tenant)
+def on_tenant_changed(sender, instance, **kwargs):
+    """
+    Invalidate the cached responses of a tenant when it changes.
+    """
+    bump_tenant_cache_version(instance.pk)
+
+
+@receiver(post_save, sender=TenantLogo)
+@receiver(post_delete, sender=TenantLogo)
+@receiver(post_save, sender=Invitation)
+@receiver(post_delete, sender=Invitation)
+def on_tenant_data_changed(sender, instance, **kwargs):
+    """
+    Invalidate the cached responses of a tenant when its logo or
+    invitations change.
+    """
+    bump_tenant_cache_version(instance.tenant_id)
+
+
+@receiver(post_save, sender=TenantUser)
+@receiver(post_delete, sender=TenantUser)
+def on_tenant_user_changed(sender, instance, **kwargs):
+    """
+    Invalidate the cached responses of the tenant and the cached membership
+    of the user when a member joins, leaves or changes role.
+    """
+    bump_tenant_cache_version(instance.tenant_id)
+    invalidate_membership(instance.user_id)
+
+
 @receiver(post_delete, sender=TenantUser)
 def on_tenant_user_deleted(sender, instance, **kwargs):
     """
     When a TenantUser is deleted, check if the tenant has any remaining users.
-    If not, delete the tenant as well.
+    If not, mark the tenant as pending deletion and purge it in the background.
     """
-    tenant = instance.tenant
-    if not tenant:
+    tenant_id = instance.tenant_id
+    if not tenant_id:
         return
 
     # If there are no remaining users for this tenant, remove the tenant.
     # Using post_delete ensures the current TenantUser is already gone.
-    if not tenant.tenant_users.exists():
-        tenant.delete()
+    if TenantUser.objects.filter(tenant_id=tenant_id).exists():
+        return
+
+    marked = Tenant.objects.filter(
+        pk=tenant_id, deletion_requested_at__isnull=True
+    ).update(deletion_requested_at=timezone.now())
+    if marked:
+        dispatch(purge_tenant_task, tenant_id)
 
 
 # Function to send an invitation email to a user
 @receiver(post_save, sender=Invitation)
 def on_invitation_saved(sender, instance, created, **kwargs):
     """
-    When an Invitation is saved, send an invitation email to the user.
+    When an Invitation is created, queue its email in the email outbox, in
+    the same transaction.
     """
     if not created:
         return
 
-    send_invitation_email_task.delay(instance.pk)
+    queue_invitation_emails([instance.pk])
+
+
+@receiver(email_outbox_failed)
+def on_outbox_email_failed(sender, outbox_emails, **kwargs):
+    """
+    When invitation emails fail for good, let the invitations be resent.
+    """
+    release_invitation_emails(
+        [outbox_email.idempotency_key for outbox_email in outbox_emails]
+    )
 
 
 @receiver(user_signed_up)
@@ -49,7 +105,11 @@ def on_user_signed_up(sender, request, user, **kwargs):
 
     # Check if there's an existing invitation for this user's email
     try:
-        invitation = Invitation.objects.get(email=user.email, accepted_at__isnull=True)
+        invitation = Invitation.objects.get(
+            email=user.email,
+            accepted_at__isnull=True,
+            tenant__deletion_requested_at__isnull=True,
+        )
 
         # Create a tenant user for the invited tenant
         TenantUser.objects.create(
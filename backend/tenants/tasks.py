@@ -1,42 +1,174 @@
 import logging
+import operator
+from datetime import datetime
+from functools import reduce
+from django.apps import apps
 from django.conf import settings
+from django.db import transaction
+from django.db.models import Q
 from django.utils import timezone
-from tenants.models import Invitation
-from utils.loops import send_transactional_email_task
+from tenants.cache import bump_tenant_cache_version
+from tenants.models import Invitation, Tenant, TenantLogo, TenantModel
+from emails.models import EmailOutbox
 from celery import shared_task
 
 log = logging.getLogger(__name__)
 
 
-@shared_task
-def send_invitation_email_task(invitation_pk: int):
+def _can_be_sent(now) -> Q:
     """
-    Send an invitation email to a user.
+    Invitations never sent, or not sent within INVITATION_RESEND_INTERVAL.
     """
+    return Q(last_sent_at__isnull=True) | Q(
+        last_sent_at__lte=now - settings.INVITATION_RESEND_INTERVAL
+    )
 
-    # Set the template ID
-    transactional_id = settings.LOOPS_INVITATION_TRANSACTIONAL_ID
 
-    # Get the email of the invitation
-    email = Invitation.objects.get(pk=invitation_pk).email
-    if not email:
-        log.error(f"Email not found for invitation {invitation_pk}")
-        return False
+def _invitation_email_key(pk, sent_at) -> str:
+    """
+    Idempotency key of the outbox email of one send of an invitation.
+    """
+    return f"invitation:{pk}:{sent_at.isoformat()}"
+
+
+def queue_invitation_emails(invitation_pks: list[int]) -> int:
+    """
+    Queue the emails of the given invitations in the email outbox, in the
+    current transaction. Returns the number of emails queued.
+
+    The invitations are locked and only those not sent within
+    INVITATION_RESEND_INTERVAL are claimed (their `last_sent_at` is set), so
+    concurrent calls can't queue the same invitation twice. Invitations
+    locked by a concurrent call are skipped. If an email then fails for
+    good, its `last_sent_at` is cleared again (see release_invitation_emails).
+    """
+    now = timezone.now()
+    with transaction.atomic():
+        invitations = list(
+            Invitation.objects.select_for_update(skip_locked=True)
+            .filter(_can_be_sent(now), pk__in=invitation_pks)
+            .values_list("pk", "email", "tenant_id")
+        )
+        if not invitations:
+            return 0
 
-    # Send the invitation email
-    success = send_transactional_email_task(
-        transactional_id=transactional_id,
-        email=email,
+        Invitation.objects.filter(pk__in=[pk for pk, *_ in invitations]).update(
+            last_sent_at=now, updated_at=now
+        )
+
+        # The key identifies this send of the invitation
+        transactional_id = settings.LOOPS_INVITATION_TRANSACTIONAL_ID
+        EmailOutbox.objects.enqueue_many(
+            [
+                EmailOutbox.objects.build(
+                    transactional_id,
+                    email,
+                    idempotency_key=_invitation_email_key(pk, now),
+                )
+                for pk, email, _ in invitations
+            ]
+        )
+
+        # update() doesn't send post_save, invalidate the cached invitation lists
+        for tenant_id in {tenant_id for *_, tenant_id in invitations}:
+            bump_tenant_cache_version(tenant_id)
+
+    return len(invitations)
+
+
+def release_invitation_emails(idempotency_keys: list[str]) -> int:
+    """
+    Clear the `last_sent_at` of the invitations whose email failed for good,
+    given the idempotency keys of their outbox emails (other keys are
+    ignored), so they can be resent right away instead of after
+    INVITATION_RESEND_INTERVAL. An invitation sent again since is left as
+    is. Returns the number of invitations released.
+    """
+    sends = []
+    for key in idempotency_keys:
+        if key.startswith("invitation:"):
+            _, pk, sent_at = key.split(":", 2)
+            sends.append(Q(pk=int(pk), last_sent_at=datetime.fromisoformat(sent_at)))
+    if not sends:
+        return 0
+
+    invitations = list(
+        Invitation.objects.filter(reduce(operator.or_, sends)).values_list(
+            "pk", "tenant_id"
+        )
+    )
+    Invitation.objects.filter(pk__in=[pk for pk, _ in invitations]).update(
+        last_sent_at=None, updated_at=timezone.now()
     )
 
-    if not success:
-        log.error(f"Error sending invitation email to {email}")
+    # update() doesn't send post_save, invalidate the cached invitation lists
+    for tenant_id in {tenant_id for _, tenant_id in invitations}:
+        bump_tenant_cache_version(tenant_id)
+    return len(invitations)
+
+
+def _delete_in_chunks(queryset, chunk_size: int) -> int:
+    """
+    Delete the rows of a queryset in chunks of `chunk_size`, each chunk in its
+    own short transaction, so no lock is held for long.
+    """
+    deleted = 0
+    while True:
+        pks = list(queryset.values_list("pk", flat=True)[:chunk_size])
+        if not pks:
+            return deleted
+        with transaction.atomic():
+            # delete() still sends the model signals, so django_cleanup
+            # removes any media files once each chunk commits
+            queryset.model.objects.filter(pk__in=pks).delete()
+        deleted += len(pks)
+
+
+@shared_task
+def purge_tenant_task(tenant_pk: int):
+    """
+    Delete a tenant marked as pending deletion and all its data.
+
+    TenantModel rows are deleted first in bounded chunks, then the logo and
+    finally the (by then almost empty) tenant row.
+    """
+    tenant = Tenant.objects.filter(
+        pk=tenant_pk, deletion_requested_at__isnull=False
+    ).first()
+    if not tenant:
+        log.info(f"Tenant {tenant_pk} is not pending deletion, nothing to purge")
+        return False
+
+    # Someone joined the tenant since the deletion was requested
+    if tenant.tenant_users.exists():
+        Tenant.objects.filter(pk=tenant_pk).update(deletion_requested_at=None)
+        log.info(f"Tenant {tenant_pk} has members again, purge cancelled")
         return False
 
-    # Set the invitation as sent
-    invitation = Invitation.objects.get(pk=invitation_pk)
-    invitation.last_sent_at = timezone.now()
-    invitation.save()
+    chunk_size = settings.TENANT_PURGE_CHUNK_SIZE
+    for model in apps.get_models():
+        if issubclass(model, TenantModel):
+            deleted = _delete_in_chunks(
+                model.objects.filter(tenant_id=tenant_pk), chunk_size
+            )
+            log.debug(f"Deleted {deleted} {model.__name__} of tenant {tenant_pk}")
 
-    # Return the invitation
+    # The logo file is removed by django_cleanup after the delete commits
+    TenantLogo.objects.filter(tenant_id=tenant_pk).delete()
+    tenant.delete()
+
+    log.info(f"Tenant {tenant_pk} purged")
     return True
+
+
+@shared_task
+def purge_pending_tenants_task():
+    """
+    Periodic safety net purging tenants whose purge task was never run
+    (e.g. the broker was down when the deletion was requested).
+    """
+    tenant_pks = Tenant.objects.filter(
+        deletion_requested_at__lt=timezone.now() - settings.TENANT_PURGE_GRACE_PERIOD
+    ).values_list("pk", flat=True)
+    for tenant_pk in tenant_pks:
+        purge_tenant_task.delay(tenant_pk)
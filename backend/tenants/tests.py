@@ -0,0 +1,478 @@
+from types import SimpleNamespace
+from unittest import mock
+
+from django.core.cache import cache
+from django.utils import timezone
+from django.db import DatabaseError, IntegrityError, connection, transaction
+from django.http import HttpResponse
+from django.db.models.query import QuerySet
+from django.test import RequestFactory, TestCase, override_settings
+from django.test.utils import CaptureQueriesContext
+from django.urls import reverse
+
+# Django Rest Framework
+from rest_framework.test import APIClient
+
+# Authentication App
+from authentication.models import User
+
+# Emails App
+from emails.models import EmailOutbox, EmailOutboxStatus
+from emails.tasks import _claim_batch, _send_batch
+
+# Utils
+from utils.dispatch import TaskBatchMiddleware, dispatch
+from utils.loops import LoopsPermanentError
+
+# Local App
+from .context import TenantContext
+from .models import (
+    SLUG_ALLOCATION_ATTEMPTS,
+    Invitation,
+    Tenant,
+    TenantUser,
+    TenantUserRole,
+)
+from .serializers import InvitationImportStatus
+from .tasks import purge_tenant_task, queue_invitation_emails
+
+
+class TenantSlugTests(TestCase):
+    """
+    New tenants get the slug of their name, or the next free numeric suffix.
+    """
+
+    def existing(self, *slugs: str):
+        # bulk_create skips save(), which would allocate a new slug
+        Tenant.objects.bulk_create(Tenant(name=slug, slug=slug) for slug in slugs)
+
+    def test_free_name_gets_the_base_slug(self):
+        self.assertEqual(Tenant.objects.create(name="Acme").slug, "acme")
+
+    def test_collisions_get_the_next_suffix(self):
+        slugs = [Tenant.objects.create(name="Acme").slug for _ in range(3)]
+        self.assertEqual(slugs, ["acme", "acme-1", "acme-2"])
+
+    def test_suffix_follows_the_highest_one(self):
+        self.existing("acme", "acme-7")
+        self.assertEqual(Tenant.allocate_slug("Acme"), "acme-8")
+
+    def test_suffixed_slug_without_the_base(self):
+        self.existing("acme-2")
+        self.assertEqual(Tenant.allocate_slug("Acme"), "acme-3")
+
+    def test_non_numeric_suffixes_are_ignored(self):
+        self.existing("acme", "acme-2x", "acme-beta", "acme-corp-5")
+        self.assertEqual(Tenant.allocate_slug("Acme"), "acme-1")
+
+    def test_suffixes_longer_than_a_bigint_are_ignored(self):
+        self.existing("acme", "acme-1", f"acme-{'9' * 25}")
+        self.assertEqual(Tenant.allocate_slug("Acme"), "acme-2")
+
+    def test_taken_slug_is_allocated_again(self):
+        self.existing("acme")
+        # A concurrent signup took the slug between the lookup and the insert
+        with mock.patch.object(
+            Tenant, "allocate_slug", side_effect=["acme", "acme-1"]
+        ) as allocate:
+            tenant = Tenant.objects.create(name="Acme")
+
+        self.assertEqual(tenant.slug, "acme-1")
+        self.assertEqual(allocate.call_count, 2)
+        self.assertEqual(Tenant.objects.filter(name="Acme").count(), 1)
+
+    def test_gives_up_after_the_attempts(self):
+        self.existing("acme")
+        with mock.patch.object(
+            Tenant, "allocate_slug", return_value="acme"
+        ) as allocate:
+            with self.assertRaises(IntegrityError):
+                Tenant.objects.create(name="Acme")
+
+        self.assertEqual(allocate.call_count, SLUG_ALLOCATION_ATTEMPTS)
+
+
+class MembershipCacheTests(TestCase):
+    """
+    The cached membership of a user is dropped whenever it changes, including
+    bulk writes that don't send signals.
+    """
+
+    def setUp(self):
+        cache.clear()
+        self.tenant = Tenant.objects.create(name="Acme")
+        self.user = User.objects.create_user(email="member@example.com")
+        self.tenant_user = TenantUser.objects.create(
+            user=self.user, tenant=self.tenant, role=TenantUserRole.USER
+        )
+
+    def role(self) -> str | None:
+        # A new context per call, as for a new request
+        return TenantContext(SimpleNamespace(user=self.user)).role
+
+    def assertRoleAfter(self, write, role):
+        self.assertEqual(self.role(), TenantUserRole.USER)
+        with self.captureOnCommitCallbacks(execute=True):
+            write()
+        self.assertEqual(self.role(), role)
+
+    def test_save(self):
+        def write():
+            self.tenant_user.role = TenantUserRole.ADMIN
+            self.tenant_user.save()
+
+        self.assertRoleAfter(write, TenantUserRole.ADMIN)
+
+    def test_delete(self):
+        self.assertRoleAfter(self.tenant_user.delete, None)
+
+    def test_queryset_update(self):
+        self.assertRoleAfter(
+            lambda: TenantUser.objects.filter(user=self.user).update(
+                role=TenantUserRole.OWNER
+            ),
+            TenantUserRole.OWNER,
+        )
+
+    def test_bulk_update(self):
+        def write():
+            self.tenant_user.role = TenantUserRole.ADMIN
+            TenantUser.objects.bulk_update([self.tenant_user], ["role"])
+
+        self.assertRoleAfter(write, TenantUserRole.ADMIN)
+
+    def test_bulk_create(self):
+        user = User.objects.create_user(email="new@example.com")
+        context = SimpleNamespace(user=user)
+        self.assertIsNone(TenantContext(context).role)
+
+        with self.captureOnCommitCallbacks(execute=True):
+            TenantUser.objects.bulk_create(
+                [TenantUser(user=user, tenant=self.tenant, role=TenantUserRole.USER)]
+            )
+        self.assertEqual(TenantContext(context).role, TenantUserRole.USER)
+
+
+@override_settings(INVITATION_BULK_BATCH_SIZE=2)
+class InvitationImportTests(TestCase):
+    """
+    The bulk import processes the rows in batches, within one transaction.
+    """
+
+    def setUp(self):
+        self.tenant = Tenant.objects.create(name="Acme")
+        self.owner = User.objects.create_user(email="owner@example.com")
+        TenantUser.objects.create(
+            user=self.owner, tenant=self.tenant, role=TenantUserRole.OWNER
+        )
+        self.client = APIClient()
+        self.client.force_authenticate(self.owner)
+        self.url = reverse("invitations-bulk")
+
+    def test_rows_across_batches(self):
+        member = User.objects.create_user(email="Member@example.com")
+        TenantUser.objects.create(user=member, tenant=self.tenant)
+        Invitation.objects.bulk_create(
+            [
+                Invitation(
+                    tenant=self.tenant,
+                    invited_by=self.owner,
+                    email="Invited@Example.com",
+                )
+            ]
+        )
+        emails = [
+            "new@example.com",
+            "not an email",
+            # Duplicate of a row of the previous batch
+            " NEW@example.com",
+            "member@EXAMPLE.com",
+            "invited@example.com",
+            "other@example.com",
+            "Other@Example.com",
+        ]
+
+        response = self.client.post(self.url, {"emails": emails}, format="json")
+
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.data["invited"], 2)
+        self.assertEqual(
+            [(row["row"], row["status"]) for row in response.data["results"]],
+            [
+                (1, InvitationImportStatus.INVITED),
+                (2, InvitationImportStatus.INVALID),
+                (3, InvitationImportStatus.DUPLICATE),
+                (4, InvitationImportStatus.MEMBER),
+                (5, InvitationImportStatus.ALREADY_INVITED),
+                (6, InvitationImportStatus.INVITED),
+                (7, InvitationImportStatus.DUPLICATE),
+            ],
+        )
+        self.assertEqual(
+            set(
+                Invitation.objects.filter(last_sent_at__isnull=False).values_list(
+                    "email", flat=True
+                )
+            ),
+            {"new@example.com", "other@example.com"},
+        )
+        self.assertEqual(EmailOutbox.objects.count(), 2)
+
+    def test_conflict_rolls_back_the_whole_import(self):
+        bulk_create = Invitation.objects.bulk_create
+
+        def concurrent_invite(invitations, *args, **kwargs):
+            # Another request invites an email of the second batch between
+            # its check and its insert
+            if any(invitation.email == "c@example.com" for invitation in invitations):
+                bulk_create(
+                    [
+                        Invitation(
+                            tenant=self.tenant,
+                            invited_by=self.owner,
+                            email="c@example.com",
+                        )
+                    ]
+                )
+            return bulk_create(invitations, *args, **kwargs)
+
+        emails = ["a@example.com", "b@example.com", "c@example.com"]
+        with mock.patch.object(
+            Invitation.objects, "bulk_create", side_effect=concurrent_invite
+        ):
+            response = self.client.post(self.url, {"emails": emails}, format="json")
+
+        self.assertEqual(response.status_code, 409)
+        # The first batch was inserted and its emails queued, then rolled back
+        self.assertFalse(Invitation.objects.exists())
+        self.assertFalse(EmailOutbox.objects.exists())
+
+
+class InvitationEmailFailureTests(TestCase):
+    """
+    An invitation whose email fails for good can be resent right away.
+    """
+
+    def setUp(self):
+        self.tenant = Tenant.objects.create(name="Acme")
+        self.owner = User.objects.create_user(email="owner@example.com")
+        for name in ["claim_keys", "complete_keys", "release_keys"]:
+            patcher = mock.patch(f"emails.tasks.{name}", return_value={})
+            self.addCleanup(patcher.stop)
+            patcher.start()
+
+    def send_outbox(self, result):
+        with mock.patch("emails.tasks.run_loops_batch", return_value=[result]):
+            _send_batch(_claim_batch(10))
+
+    def test_failed_email_releases_the_invitation(self):
+        # Queued on create
+        invitation = Invitation.objects.create(
+            tenant=self.tenant, invited_by=self.owner, email="new@example.com"
+        )
+        invitation.refresh_from_db()
+        self.assertIsNotNone(invitation.last_sent_at)
+        self.assertEqual(queue_invitation_emails([invitation.pk]), 0)
+
+        self.send_outbox(LoopsPermanentError("Invalid email"))
+
+        self.assertEqual(EmailOutbox.objects.get().status, EmailOutboxStatus.FAILED)
+        invitation.refresh_from_db()
+        self.assertIsNone(invitation.last_sent_at)
+        self.assertEqual(queue_invitation_emails([invitation.pk]), 1)
+
+    def test_sent_email_keeps_the_invitation_sent(self):
+        invitation = Invitation.objects.create(
+            tenant=self.tenant, invited_by=self.owner, email="new@example.com"
+        )
+
+        self.send_outbox(True)
+
+        invitation.refresh_from_db()
+        self.assertIsNotNone(invitation.last_sent_at)
+        self.assertEqual(queue_invitation_emails([invitation.pk]), 0)
+
+
+class InvitationCreateTests(TestCase):
+    def setUp(self):
+        self.tenant = Tenant.objects.create(name="Acme")
+        self.owner = User.objects.create_user(email="owner@example.com")
+        TenantUser.objects.create(
+            user=self.owner, tenant=self.tenant, role=TenantUserRole.OWNER
+        )
+        self.client = APIClient()
+        self.client.force_authenticate(self.owner)
+        self.url = reverse("invitations-list")
+
+    def test_invitation_and_email_are_written_together(self):
+        response = self.client.post(self.url, {"email": "new@example.com"})
+
+        self.assertEqual(response.status_code, 201)
+        self.assertEqual(EmailOutbox.objects.get().email, "new@example.com")
+
+    def test_failed_enqueue_rolls_back_the_invitation(self):
+        with mock.patch(
+            "tenants.signals.queue_invitation_emails", side_effect=RuntimeError
+        ):
+            with self.assertRaises(RuntimeError):
+                self.client.post(self.url, {"email": "new@example.com"})
+
+        self.assertFalse(Invitation.objects.exists())
+
+
+class TenantConditionalGetTests(TestCase):
+    """
+    GET /tenants/tenant/me/ answers a matching If-None-Match with a 304.
+    """
+
+    def setUp(self):
+        cache.clear()
+        self.tenant = Tenant.objects.create(name="Acme")
+        self.owner = User.objects.create_user(email="owner@example.com")
+        TenantUser.objects.create(
+            user=self.owner, tenant=self.tenant, role=TenantUserRole.OWNER
+        )
+        self.client = APIClient()
+        self.client.force_authenticate(self.owner)
+        self.url = reverse("tenant-me")
+
+    def test_matching_etag_is_not_modified(self):
+        response = self.client.get(self.url)
+        self.assertEqual(response.status_code, 200)
+        etag = response["ETag"]
+
+        response = self.client.get(self.url, HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, 304)
+        self.assertEqual(response["ETag"], etag)
+        self.assertFalse(response.content)
+
+    def test_changed_tenant_is_sent_again(self):
+        etag = self.client.get(self.url)["ETag"]
+
+        with self.captureOnCommitCallbacks(execute=True):
+            self.tenant.name = "Acme Corp"
+            self.tenant.save()
+
+        response = self.client.get(self.url, HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, 200)
+        self.assertNotEqual(response["ETag"], etag)
+        self.assertEqual(response.data["name"], "Acme Corp")
+
+
+@override_settings(TENANT_PURGE_CHUNK_SIZE=2)
+class PurgeTenantTests(TestCase):
+    """
+    A tenant pending deletion is deleted with its data in chunks, and an
+    interrupted purge can run again.
+    """
+
+    def setUp(self):
+        self.owner = User.objects.create_user(email="owner@example.com")
+        self.tenant = self.tenant_with_invitations("Acme", 5)
+        self.other = self.tenant_with_invitations("Other", 1)
+        Tenant.objects.filter(pk=self.tenant.pk).update(
+            deletion_requested_at=timezone.now()
+        )
+
+    def tenant_with_invitations(self, name: str, count: int) -> Tenant:
+        tenant = Tenant.objects.create(name=name)
+        # bulk_create doesn't queue the invitation emails
+        Invitation.objects.bulk_create(
+            Invitation(
+                tenant=tenant, invited_by=self.owner, email=f"{name}{i}@example.com"
+            )
+            for i in range(count)
+        )
+        return tenant
+
+    def test_deletes_in_chunks(self):
+        with CaptureQueriesContext(connection) as queries:
+            self.assertTrue(purge_tenant_task(self.tenant.pk))
+
+        deletes = [
+            query
+            for query in queries.captured_queries
+            if query["sql"].startswith('DELETE FROM "tenants_invitation"')
+        ]
+        self.assertEqual(len(deletes), 3)
+        self.assertFalse(Tenant.objects.filter(pk=self.tenant.pk).exists())
+        self.assertEqual(Invitation.objects.get().tenant_id, self.other.pk)
+
+    def test_interrupted_purge_resumes(self):
+        delete = QuerySet.delete
+        chunks = []
+
+        def delete_until_second_chunk(queryset):
+            if queryset.model is Invitation:
+                chunks.append(queryset)
+                if len(chunks) == 2:
+                    raise DatabaseError("Connection lost")
+            return delete(queryset)
+
+        with mock.patch.object(QuerySet, "delete", delete_until_second_chunk):
+            with self.assertRaises(DatabaseError):
+                purge_tenant_task(self.tenant.pk)
+
+        # The first chunk stays deleted, the rest is left for the next run
+        self.assertEqual(Invitation.objects.filter(tenant=self.tenant).count(), 3)
+        self.assertTrue(Tenant.objects.filter(pk=self.tenant.pk).exists())
+
+        self.assertTrue(purge_tenant_task(self.tenant.pk))
+        self.assertFalse(Tenant.objects.filter(pk=self.tenant.pk).exists())
+        self.assertEqual(Invitation.objects.get().tenant_id, self.other.pk)
+
+    def test_tenant_not_pending_deletion_is_kept(self):
+        self.assertFalse(purge_tenant_task(self.other.pk))
+        self.assertTrue(Tenant.objects.filter(pk=self.other.pk).exists())
+
+
+class TaskBatchMiddlewareTests(TestCase):
+    """
+    Tasks dispatched during a request are published once its response has
+    been sent, and only if their transaction commits.
+    """
+
+    def setUp(self):
+        self.task = mock.Mock()
+        self.task.name = "tenants.tasks.purge_tenant_task"
+        patcher = mock.patch("utils.dispatch.publish")
+        self.addCleanup(patcher.stop)
+        self.publish = patcher.start()
+
+    def published(self) -> list:
+        return [
+            published
+            for call in self.publish.call_args_list
+            for published in call.args[0]
+        ]
+
+    def handle(self, view):
+        with self.captureOnCommitCallbacks(execute=True):
+            return TaskBatchMiddleware(view)(RequestFactory().get("/"))
+
+    def test_published_once_the_response_is_closed(self):
+        def view(request):
+            with transaction.atomic():
+                dispatch(self.task, 1)
+                dispatch(self.task, 1)
+                dispatch(self.task, 2)
+            return HttpResponse()
+
+        response = self.handle(view)
+        self.assertEqual(self.published(), [])
+
+        # Sends request_finished, as the server does once the response is sent
+        response.close()
+        self.assertEqual(
+            self.published(), [(self.task, (1,), {}), (self.task, (2,), {})]
+        )
+
+    def test_rolled_back_tasks_are_dropped(self):
+        def view(request):
+            with transaction.atomic():
+                dispatch(self.task, 1)
+                raise ValueError
+
+        with self.assertRaises(ValueError):
+            self.handle(view)
+        self.assertEqual(self.published(), [])
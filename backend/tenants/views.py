@@ -1,22 +1,26 @@
 # django
-from datetime import timedelta
-from django.utils import timezone
+from django.conf import settings
+from django.db import IntegrityError, transaction
+from django.db.models import Count, Max
 from django.utils.translation import gettext_lazy as _
+from django.shortcuts import get_object_or_404
 from drf_spectacular.utils import extend_schema, extend_schema_view
 
 # Django Rest Framework
 from rest_framework import mixins, status, viewsets
 from rest_framework.decorators import action
-from rest_framework.parsers import MultiPartParser
+from rest_framework.parsers import JSONParser, MultiPartParser
 from rest_framework.permissions import IsAuthenticated
 from rest_framework.response import Response
 from rest_framework.generics import GenericAPIView
 
 # Local App
-from .models import Invitation, TenantLogo, TenantUser
-from .tasks import send_invitation_email_task
+from .models import Invitation, Tenant, TenantLogo, TenantUser
+from .tasks import queue_invitation_emails
 from .permissions import IsOwnerOrAdmin
 from .serializers import (
+    InvitationImportResultSerializer,
+    InvitationImportSerializer,
     InvitationSerializer,
     TenantLogoSerializer,
     TenantSerializer,
@@ -24,6 +28,40 @@ from .serializers import (
     TenantUserUpdateSerializer,
 )
 from .mixins import TenantAwareMixin
+from .pagination import TenantCursorPagination
+from .filters import InvitationFilter, TenantUserFilter
+from .context import get_tenant_context
+from .cache import cache_tenant_response
+
+# Utils
+from utils.conditional import conditional_get
+
+
+def tenant_etag_parts(view, request):
+    """
+    Validator values for the tenant payload: the tenant and the caller's
+    membership are already loaded by the tenant context, the members and the
+    logo are summarized by a single aggregate query.
+    """
+    context = get_tenant_context(request)
+    if context.tenant is None:
+        return None
+
+    members = TenantUser.objects.filter(tenant=context.tenant).aggregate(
+        count=Count("pk"),
+        updated_at=Max("updated_at"),
+        users_updated_at=Max("user__updated_at"),
+        logo_updated_at=Max("tenant__logo__updated_at"),
+    )
+    return [
+        context.tenant.pk,
+        context.tenant.updated_at,
+        context.tenant_user.pk,
+        context.tenant_user.role,
+        settings.ENABLE_TENANTS,
+        settings.TENANT_USERS_INLINE_LIMIT,
+        *members.values(),
+    ]
 
 
 @extend_schema_view(me=extend_schema(tags=["Tenant Info"]))
@@ -37,9 +75,18 @@ class TenantInfoViewset(viewsets.GenericViewSet):
             permission_classes = [IsAuthenticated, IsOwnerOrAdmin]
         return [permission() for permission in permission_classes]
 
+    def get_object(self):
+        # Load the caller's tenant with everything the serializer needs
+        queryset = TenantSerializer.prefetch_queryset(Tenant.objects.all())
+        return get_object_or_404(
+            queryset, pk=get_tenant_context(self.request).tenant_id
+        )
+
     @action(detail=False, methods=["get", "put"])
+    @cache_tenant_response("tenant", per_member=True)
+    @conditional_get(tenant_etag_parts)
     def me(self, request):
-        tenant = request.user.tenant_user.tenant
+        tenant = self.get_object()
         if request.method == "GET":
             serializer = self.get_serializer(tenant)
             return Response(serializer.data)
@@ -68,10 +115,13 @@ class TenantLogoView(GenericAPIView):
 
     def get_object(self):
         try:
-            return TenantLogo.objects.get(tenant=self.request.user.tenant_user.tenant)
+            return TenantLogo.objects.get(
+                tenant_id=get_tenant_context(self.request).tenant_id
+            )
         except TenantLogo.DoesNotExist:
             return None
 
+    @cache_tenant_response("logo")
     def get(self, request):
         instance = self.get_object()
         if not instance:
@@ -89,7 +139,7 @@ class TenantLogoView(GenericAPIView):
 
         serializer = TenantLogoSerializer(data=request.data)
         serializer.is_valid(raise_exception=True)
-        serializer.save(tenant=request.user.tenant_user.tenant)
+        serializer.save(tenant=get_tenant_context(request).tenant)
         return Response(serializer.data, status=status.HTTP_201_CREATED)
 
     def delete(self, request):
@@ -119,9 +169,17 @@ class TenantUserViewSet(
 
     queryset = TenantUser.objects.none()  # Empty queryset just for type information
     http_method_names = ["get", "put", "delete", "head", "options"]
+    pagination_class = TenantCursorPagination
+    filterset_class = TenantUserFilter
 
     def get_queryset(self):
-        return self.request.user.tenant_user.tenant.tenant_users.all()
+        return TenantUser.objects.select_related("user").filter(
+            tenant_id=get_tenant_context(self.request).tenant_id
+        )
+
+    @cache_tenant_response("tenant_users")
+    def list(self, request, *args, **kwargs):
+        return super().list(request, *args, **kwargs)
 
     def get_serializer_class(self):
         if self.action == "update":
@@ -137,7 +195,7 @@ class TenantUserViewSet(
 
     def update(self, request, *args, **kwargs):
         instance = self.get_object()
-        current_user_tenant = request.user.tenant_user
+        current_user_tenant = get_tenant_context(request).tenant_user
         new_role = request.data.get("role")
 
         # Prevent changing the owner's role (only owner can transfer ownership)
@@ -204,10 +262,10 @@ class TenantUserViewSet(
     resend=extend_schema(tags=["Tenant Invitations"]),
 )
 class InvitationViewSet(
+    TenantAwareMixin,
     mixins.CreateModelMixin,
     mixins.ListModelMixin,
     viewsets.GenericViewSet,
-    TenantAwareMixin,
 ):
     """
     A viewset that provides the `create` and `list` actions.
@@ -216,11 +274,57 @@ class InvitationViewSet(
     queryset = Invitation.objects.all()
     serializer_class = InvitationSerializer
     permission_classes = [IsAuthenticated, IsOwnerOrAdmin]
+    pagination_class = TenantCursorPagination
+    filterset_class = InvitationFilter
+
+    @cache_tenant_response("invitations")
+    def list(self, request, *args, **kwargs):
+        return super().list(request, *args, **kwargs)
 
     def perform_create(self, serializer):
-        serializer.save(
-            tenant=self.request.user.tenant_user.tenant, invited_by=self.request.user
-        )
+        # The invitation and its outbox email (queued by the post_save
+        # signal) are written in one transaction, one never exists without
+        # the other
+        with transaction.atomic():
+            serializer.save(
+                tenant=get_tenant_context(self.request).tenant,
+                invited_by=self.request.user,
+            )
+
+    @extend_schema(
+        request={
+            "multipart/form-data": InvitationImportSerializer,
+            "application/json": InvitationImportSerializer,
+        },
+        responses=InvitationImportResultSerializer,
+    )
+    @action(
+        detail=False,
+        methods=["post"],
+        url_path="bulk",
+        parser_classes=[MultiPartParser, JSONParser],
+    )
+    def bulk(self, request):
+        """
+        Invite many users at once from a CSV file or a list of emails.
+        Returns the outcome of every row; the invitation emails are sent in
+        the background.
+        """
+        serializer = InvitationImportSerializer(data=request.data)
+        serializer.is_valid(raise_exception=True)
+        try:
+            result = serializer.save(
+                tenant=get_tenant_context(request).tenant,
+                invited_by=request.user,
+            )
+        except IntegrityError:
+            # Some of the emails were invited concurrently, nothing was imported
+            return Response(
+                {"detail": _("The invitations changed during the import, retry.")},
+                status=status.HTTP_409_CONFLICT,
+            )
+
+        return Response(InvitationImportResultSerializer(result).data)
 
     @extend_schema(request=None)
     @action(detail=True, methods=["post"])
@@ -231,21 +335,13 @@ class InvitationViewSet(
         """
         invitation = self.get_object()
 
-        # Check if the last invitation was sent less than 24 hours ago
-        if invitation.last_sent_at:
-            time_since_last_sent = timezone.now() - invitation.last_sent_at
-            if time_since_last_sent < timedelta(hours=24):
-                return Response(
-                    {
-                        "detail": _(
-                            "Invitation was already sent within the last 24 hours."
-                        )
-                    },
-                    status=status.HTTP_403_FORBIDDEN,
-                )
-
-        # Trigger the celery task to send the invitation email
-        send_invitation_email_task.delay(invitation.pk)
+        # Queue the email, unless the invitation was sent less than 24 hours
+        # ago (or is being resent by a concurrent request)
+        if not queue_invitation_emails([invitation.pk]):
+            return Response(
+                {"detail": _("Invitation was already sent within the last 24 hours.")},
+                status=status.HTTP_403_FORBIDDEN,
+            )
 
         return Response(
             {"detail": _("Invitation email has been queued for resending.")},
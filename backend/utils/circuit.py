@@ -0,0 +1,91 @@
+import logging
+
+import redis
+
+# Utils
+from utils.redis import get_redis
+
+log = logging.getLogger(__name__)
+
+
+class CircuitBreaker:
+    """
+    Circuit breaker whose state lives in Redis, so every web and worker
+    process stops calling an unhealthy service at the same time.
+
+    - Closed: calls go through. `failure_threshold` failures within
+      `failure_window` seconds open the circuit.
+    - Open: `retry_after()` returns the seconds left and callers fail fast
+      (and defer their work) instead of calling the service.
+    - After `reset_timeout` seconds calls go through again. Until a call
+      succeeds, a single failure opens the circuit again.
+
+    If Redis is unavailable the circuit behaves as closed.
+
+    Usage:
+        breaker = CircuitBreaker("loops")
+        if breaker.retry_after():
+            raise ...
+        try:
+            call()
+        except ...:
+            breaker.record_failure()
+        else:
+            breaker.record_success()
+    """
+
+    def __init__(
+        self,
+        name: str,
+        failure_threshold: int = 5,
+        failure_window: int = 60,
+        reset_timeout: int = 30,
+    ):
+        self.name = name
+        self.failure_threshold = failure_threshold
+        self.failure_window = failure_window
+        self.reset_timeout = reset_timeout
+
+    def _key(self, suffix: str) -> str:
+        return f"circuit:{self.name}:{suffix}"
+
+    def retry_after(self) -> float:
+        """
+        Return the seconds until the circuit closes, 0 if it is closed.
+        """
+        try:
+            ttl = get_redis().pttl(self._key("open"))
+        except redis.RedisError as e:
+            log.warning(f"Circuit {self.name}: state unavailable ({e})")
+            return 0
+        return ttl / 1000 if ttl > 0 else 0
+
+    def record_success(self):
+        try:
+            get_redis().delete(self._key("failures"), self._key("tripped"))
+        except redis.RedisError as e:
+            log.warning(f"Circuit {self.name}: state unavailable ({e})")
+
+    def record_failure(self):
+        try:
+            client = get_redis()
+            pipe = client.pipeline()
+            pipe.incr(self._key("failures"))
+            pipe.exists(self._key("tripped"))
+            failures, tripped = pipe.execute()
+            if failures == 1:
+                # First failure of the window
+                client.expire(self._key("failures"), self.failure_window)
+
+            if failures >= self.failure_threshold or tripped:
+                pipe = client.pipeline()
+                pipe.set(self._key("open"), 1, ex=self.reset_timeout)
+                # Remembers the circuit was open until a call succeeds
+                pipe.set(self._key("tripped"), 1, ex=self.reset_timeout * 10)
+                pipe.delete(self._key("failures"))
+                pipe.execute()
+                log.warning(
+                    f"Circuit {self.name} opened for {self.reset_timeout} seconds"
+                )
+        except redis.RedisError as e:
+            log.warning(f"Circuit {self.name}: state unavailable ({e})")
@@ -0,0 +1,63 @@
+import hashlib
+from functools import wraps
+
+# django
+from django.utils.cache import get_conditional_response, patch_cache_control
+
+
+def compute_etag(parts) -> str:
+    """
+    Build a quoted ETag from a sequence of cheap validator values
+    (timestamps, ids, counters...).
+    """
+    digest = hashlib.sha1(repr(tuple(parts)).encode("utf-8")).hexdigest()
+    return f'"{digest}"'
+
+
+def conditional_get(validator):
+    """
+    Decorator for viewset actions and APIView handlers adding ETag based
+    conditional GET support.
+
+    `validator(view, request)` must return the values the response depends on,
+    or None to skip the conditional handling. It has to be much cheaper than
+    building the response (no serialization, at most a small aggregate query).
+    If the client's `If-None-Match` matches, a `304 Not Modified` is returned
+    without calling the handler.
+
+    Non safe methods (PUT, PATCH...) are passed straight to the handler.
+
+    Usage:
+        @action(detail=False, methods=["get", "put"])
+        @conditional_get(lambda view, request: [request.user.pk, ...])
+        def me(self, request):
+            ...
+    """
+
+    def decorator(handler):
+        @wraps(handler)
+        def wrapper(view, request, *args, **kwargs):
+            if request.method not in ("GET", "HEAD"):
+                return handler(view, request, *args, **kwargs)
+
+            parts = validator(view, request)
+            if parts is None:
+                return handler(view, request, *args, **kwargs)
+
+            # The same data renders differently as JSON or browsable API
+            renderer = getattr(request, "accepted_renderer", None)
+            etag = compute_etag([getattr(renderer, "format", None), *parts])
+
+            response = get_conditional_response(request, etag=etag)
+            if response is None:
+                response = handler(view, request, *args, **kwargs)
+
+            if response.status_code in (200, 304):
+                response["ETag"] = etag
+                # Let browsers store it, but always revalidate
+                patch_cache_control(response, private=True, no_cache=True)
+            return response
+
+        return wrapper
+
+    return decorator
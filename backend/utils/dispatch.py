@@ -0,0 +1,144 @@
+import logging
+from contextlib import contextmanager
+from contextvars import ContextVar
+
+# django
+from django.core.signals import request_finished
+from django.db import transaction
+from django.dispatch import receiver
+
+log = logging.getLogger(__name__)
+
+
+def publish(calls):
+    """
+    Publish a list of `(task, args, kwargs)` calls over a single broker
+    connection and producer, instead of acquiring one per call.
+    A failing call is logged and doesn't prevent the others from being sent.
+    """
+    if not calls:
+        return
+
+    app = calls[0][0].app
+    with app.producer_or_acquire() as producer:
+        for task, args, kwargs in calls:
+            try:
+                task.apply_async(args, kwargs, producer=producer)
+            except Exception:
+                log.exception(f"Error publishing task {task.name}")
+
+
+class TaskBatch:
+    """
+    Task calls collected during a request or a `task_batch()` block.
+
+    Identical calls (same task and arguments) are only published once.
+    Calls added after the batch was flushed are published right away.
+    """
+
+    def __init__(self):
+        self._calls = {}
+        self.flushed = False
+
+    def add(self, task, args, kwargs):
+        if self.flushed:
+            publish([(task, args, kwargs)])
+            return
+
+        key = (task.name, repr(args), repr(sorted(kwargs.items())))
+        self._calls.setdefault(key, (task, args, kwargs))
+
+    def flush(self):
+        self.flushed = True
+        calls = list(self._calls.values())
+        self._calls.clear()
+        if calls:
+            log.debug(f"Publishing {len(calls)} batched tasks")
+        publish(calls)
+
+
+_current_batch: ContextVar[TaskBatch | None] = ContextVar(
+    "current_task_batch", default=None
+)
+# The batch of the request being handled, until its response is closed
+_request_batch: ContextVar[TaskBatch | None] = ContextVar(
+    "request_task_batch", default=None
+)
+
+
+def dispatch(task, *args, **kwargs):
+    """
+    Queue a Celery task once the current transaction commits (right away if
+    there is none), so the worker never runs before the data it needs is
+    visible. Calls made in a rolled back transaction are dropped.
+
+    Inside a request handled by the TaskBatchMiddleware (or a `task_batch()`
+    block), the calls are collected and published together afterwards.
+
+    Usage:
+        dispatch(purge_tenant_task, tenant.pk)
+    """
+    batch = _current_batch.get()
+
+    def enqueue():
+        if batch is None:
+            publish([(task, args, kwargs)])
+        else:
+            batch.add(task, args, kwargs)
+
+    transaction.on_commit(enqueue)
+
+
+@contextmanager
+def task_batch():
+    """
+    Collect the tasks dispatched within the block and publish them together
+    when it exits.
+    """
+    batch = TaskBatch()
+    token = _current_batch.set(batch)
+    try:
+        yield batch
+    finally:
+        _current_batch.reset(token)
+        batch.flush()
+
+
+@receiver(request_finished)
+def flush_request_batch(**kwargs):
+    """
+    Publish the tasks of the current request. The server closes the response
+    once it has been sent, which sends the request_finished signal in the
+    thread that handled the request.
+    """
+    batch = _request_batch.get()
+    if batch is not None:
+        _request_batch.set(None)
+        batch.flush()
+
+
+class TaskBatchMiddleware:
+    """
+    Collect the tasks dispatched while handling a request and publish them
+    once the response has been sent to the client (see
+    flush_request_batch), so the broker round trips are not part of the
+    response time.
+    """
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+
+    def __call__(self, request):
+        # Left over by a request whose response was never closed
+        flush_request_batch()
+
+        batch = TaskBatch()
+        _request_batch.set(batch)
+        token = _current_batch.set(batch)
+        try:
+            return self.get_response(request)
+        except Exception:
+            flush_request_batch()
+            raise
+        finally:
+            _current_batch.reset(token)
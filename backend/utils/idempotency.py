@@ -0,0 +1,79 @@
+import logging
+
+import redis
+
+# Utils
+from utils.redis import get_redis
+
+log = logging.getLogger(__name__)
+
+# Delete the key only if it still holds our token (the lease may have expired
+# and been taken by another run)
+RELEASE_SCRIPT = """
+if redis.call("GET", KEYS[1]) == ARGV[1] then
+    return redis.call("DEL", KEYS[1])
+end
+return 0
+"""
+
+DONE = b"done"
+
+
+# ---------------------------------------------------------------------------- #
+#                                     KEYS                                     #
+# ---------------------------------------------------------------------------- #
+def claim_keys(keys: list[str], token: str, lease: int) -> dict[str, bytes | None]:
+    """
+    Take a lease of `lease` seconds on each key (Redis SET NX), in a single
+    round trip.
+
+    Returns the state of each key: None if the lease was taken, DONE if the
+    work was already done, otherwise the token of the run holding the lease.
+
+    Raises:
+        redis.RedisError: If Redis is unavailable
+    """
+    if not keys:
+        return {}
+    client = get_redis()
+    pipe = client.pipeline(transaction=False)
+    for key in keys:
+        pipe.set(key, token, nx=True, ex=lease)
+    acquired = dict(zip(keys, pipe.execute()))
+
+    # A key that expired in between reads as None, the caller runs
+    held = [key for key in keys if not acquired[key]]
+    states = dict(zip(held, client.mget(held))) if held else {}
+    return {key: None if acquired[key] else states[key] for key in keys}
+
+
+def complete_keys(keys: list[str], ttl: int):
+    """
+    Mark the work of the keys done for `ttl` seconds. Failures are logged.
+    """
+    if not keys:
+        return
+    try:
+        pipe = get_redis().pipeline(transaction=False)
+        for key in keys:
+            pipe.set(key, DONE, ex=ttl)
+        pipe.execute()
+    except redis.RedisError as e:
+        log.warning(f"Idempotency keys not saved ({e})")
+
+
+def release_keys(keys: list[str], token: str):
+    """
+    Release the leases taken with `token`, so the work can run again.
+    Failures are logged, the leases then expire.
+    """
+    if not keys:
+        return
+    try:
+        client = get_redis()
+        pipe = client.pipeline(transaction=False)
+        for key in keys:
+            pipe.eval(RELEASE_SCRIPT, 1, key, token)
+        pipe.execute()
+    except redis.RedisError as e:
+        log.warning(f"Idempotency keys not released ({e})")
@@ -1,19 +1,252 @@
 import os
+import json
+import asyncio
+import random
+import threading
+import time
 import requests
 import logging
+from concurrent.futures import ThreadPoolExecutor
+from functools import partial
+from itertools import islice
+from requests.adapters import HTTPAdapter
 
 log = logging.getLogger(__name__)
 
 # celery
-from celery import shared_task
+from celery import Task, shared_task
+
+# django
+from django.db import transaction
+
+# Utils
+from utils.circuit import CircuitBreaker
+from utils.dispatch import dispatch
+from utils.ratelimit import TokenBucket
+from utils.redis import get_redis
+
+import redis
+
+# Base URL of the Loops API, can point to a stand-in server in tests
+LOOPS_API_URL = os.getenv("LOOPS_API_URL", "https://app.loops.so/api/v1")
+
+# (connect, read) timeouts in seconds, so a slow Loops response can't pin a
+# worker forever
+LOOPS_TIMEOUT = (
+    float(os.getenv("LOOPS_CONNECT_TIMEOUT", "3.05")),
+    float(os.getenv("LOOPS_READ_TIMEOUT", "10")),
+)
+
+# Max number of keep-alive connections to Loops kept open per process
+LOOPS_POOL_MAXSIZE = int(os.getenv("LOOPS_POOL_MAXSIZE", "10"))
+
+# Buffered contact updates are flushed in batches of this size, with at most
+# this many calls to Loops in flight
+LOOPS_CONTACT_SYNC_BATCH_SIZE = int(os.getenv("LOOPS_CONTACT_SYNC_BATCH_SIZE", "100"))
+LOOPS_CONTACT_SYNC_CONCURRENCY = int(os.getenv("LOOPS_CONTACT_SYNC_CONCURRENCY", "4"))
+
+# Max number of calls in flight for the batch sends of the AsyncLoopsClient.
+# It only needs to cover the Loops latency at the rate limits below: more
+# calls in flight just wait for their token.
+LOOPS_ASYNC_CONCURRENCY = int(os.getenv("LOOPS_ASYNC_CONCURRENCY", "10"))
+
+# Requests per second to Loops allowed by all the processes together, for
+# transactional emails and for contact updates. Their sum must stay below the
+# Loops API rate limit.
+LOOPS_TRANSACTIONAL_RATE_LIMIT = float(os.getenv("LOOPS_TRANSACTIONAL_RATE_LIMIT", "7"))
+LOOPS_CONTACTS_RATE_LIMIT = float(os.getenv("LOOPS_CONTACTS_RATE_LIMIT", "3"))
+
+# Seconds a call waits for its rate limit before being rescheduled
+LOOPS_RATE_LIMIT_MAX_WAIT = float(os.getenv("LOOPS_RATE_LIMIT_MAX_WAIT", "2"))
+
+
+# Shared by every process: after repeated failures, calls to Loops fail fast
+# for a while instead of waiting for timeouts
+LOOPS_CIRCUIT = CircuitBreaker("loops")
+
+# Shared by every process, one bucket per kind of endpoint (the first part of
+# its path). A fifth of the transactional bucket is reserved for priority
+# emails (e.g. login codes), so bulk sends can't starve them.
+LOOPS_RATE_LIMITS = {
+    "transactional": TokenBucket(
+        "loops:transactional",
+        rate=LOOPS_TRANSACTIONAL_RATE_LIMIT,
+        reserve=LOOPS_TRANSACTIONAL_RATE_LIMIT / 5,
+    ),
+    "contacts": TokenBucket("loops:contacts", rate=LOOPS_CONTACTS_RATE_LIMIT),
+}
+
+
+# ---------------------------------------------------------------------------- #
+#                                    ERRORS                                    #
+# ---------------------------------------------------------------------------- #
+class LoopsError(Exception):
+    """
+    A Loops API call failed.
+    """
+
+
+class LoopsRetryableError(LoopsError):
+    """
+    A temporary failure (network error, timeout, rate limit, 5xx or open
+    circuit): the call can be retried later, after `retry_after` seconds if
+    it is known.
+    """
+
+    def __init__(self, message: str, retry_after: float | None = None):
+        super().__init__(message)
+        self.retry_after = retry_after
+
+
+class LoopsPermanentError(LoopsError):
+    """
+    The request was rejected (4xx): retrying it won't help.
+    """
+
+
+class LoopsConflictError(LoopsPermanentError):
+    """
+    The request conflicts with a previous one (409), e.g. its idempotency key
+    was already used.
+    """
+
+
+# ---------------------------------------------------------------------------- #
+#                                   TRANSPORT                                  #
+# ---------------------------------------------------------------------------- #
+_session = None
+_session_pid = None
+_session_lock = threading.Lock()
+
+
+def build_session(pool_maxsize: int = LOOPS_POOL_MAXSIZE) -> requests.Session:
+    """
+    Build an HTTP session keeping up to `pool_maxsize` keep-alive connections
+    to Loops. Retries are handled by the tasks, not by the transport.
+    """
+    session = requests.Session()
+    adapter = HTTPAdapter(
+        pool_connections=1,
+        pool_maxsize=pool_maxsize,
+        pool_block=False,
+        max_retries=0,
+    )
+    session.mount("https://", adapter)
+    session.mount("http://", adapter)
+    session.headers["Content-Type"] = "application/json"
+    return session
+
+
+def get_session() -> requests.Session:
+    """
+    Return the process-wide HTTP session used to call Loops.
+
+    The session keeps a pool of keep-alive connections, so consecutive calls
+    reuse the same TCP+TLS connection instead of doing a handshake each time.
+    A new session is created after a fork (e.g. celery prefork workers), as
+    pooled sockets can't be shared between processes.
+    """
+    global _session, _session_pid
+
+    pid = os.getpid()
+    if _session is None or _session_pid != pid:
+        with _session_lock:
+            if _session is None or _session_pid != pid:
+                _session = build_session()
+                _session_pid = pid
+    return _session
 
 
 class LoopsClient:
     # Constructor
-    def __init__(self):
-        self.api_key = os.getenv("LOOPS_API_KEY", "")
+    def __init__(
+        self,
+        api_key: str | None = None,
+        session=None,
+        circuit=LOOPS_CIRCUIT,
+        rate_limits=LOOPS_RATE_LIMITS,
+        max_wait: float = LOOPS_RATE_LIMIT_MAX_WAIT,
+    ):
+        self.api_key = api_key or os.getenv("LOOPS_API_KEY", "")
         if not self.api_key:
             raise ValueError("Loops API key not set")
+        self.session = session or get_session()
+        self.circuit = circuit
+        self.rate_limits = rate_limits
+        self.max_wait = max_wait
+
+    def _post(
+        self,
+        path: str,
+        payload: dict,
+        priority: bool = False,
+        headers: dict | None = None,
+    ) -> dict:
+        """
+        POST a JSON payload to a Loops API endpoint through the pooled session
+        and return the response body.
+
+        The call waits up to `max_wait` seconds for the rate limit of the
+        endpoint, priority calls can use the reserved part of it.
+
+        Raises:
+            LoopsRetryableError: Temporary failure, rate limited, or the
+                circuit is open
+            LoopsPermanentError: The request was rejected
+        """
+        if self.circuit and (retry_after := self.circuit.retry_after()):
+            raise LoopsRetryableError(
+                f"Loops is unavailable, circuit open for {retry_after:.0f}s",
+                retry_after=retry_after,
+            )
+
+        bucket = self.rate_limits and self.rate_limits.get(path.split("/")[0])
+        if bucket and (retry_after := bucket.wait(self.max_wait, priority)):
+            raise LoopsRetryableError(
+                f"{path}: rate limit reached", retry_after=retry_after
+            )
+
+        try:
+            response = self.session.post(
+                f"{LOOPS_API_URL}/{path}",
+                headers={"Authorization": f"Bearer {self.api_key}", **(headers or {})},
+                json=payload,
+                timeout=LOOPS_TIMEOUT,
+            )
+        except requests.exceptions.RequestException as e:
+            if self.circuit:
+                self.circuit.record_failure()
+            raise LoopsRetryableError(f"{path}: {e}") from e
+
+        if response.status_code >= 500:
+            if self.circuit:
+                self.circuit.record_failure()
+            raise LoopsRetryableError(f"{path}: HTTP {response.status_code}")
+
+        # Loops answered, it is healthy even if it rejects the request
+        if self.circuit:
+            self.circuit.record_success()
+
+        if response.status_code == 429:
+            try:
+                retry_after = float(response.headers.get("Retry-After", ""))
+            except ValueError:
+                retry_after = None
+            raise LoopsRetryableError(
+                f"{path}: rate limited by Loops", retry_after=retry_after
+            )
+
+        try:
+            body = response.json()
+        except ValueError:
+            body = {"message": response.text[:200]}
+        if response.status_code == 409:
+            raise LoopsConflictError(f"{path}: HTTP 409 {body.get('message', '')}")
+        if response.status_code >= 400:
+            raise LoopsPermanentError(
+                f"{path}: HTTP {response.status_code} {body.get('message', '')}"
+            )
+        return body
 
     # ---------------------------------------------------------------------------- #
     #                             TRANSACTIONAL EMAILS                             #
@@ -22,7 +255,9 @@ class LoopsClient:
         self,
         transactional_id: str,
         email: str,
-        data_variables: dict = {},
+        data_variables: dict | None = None,
+        priority: bool = False,
+        idempotency_key: str | None = None,
     ) -> bool:
         """
         https://loops.so/docs/transactional
@@ -32,43 +267,40 @@ class LoopsClient:
             transactional_id (str): The id of the transactional email template
             email (str): The email address of the recipient
             data_variables (dict): The data variables to be used in the email template
+            priority (bool): Time sensitive email (e.g. a login code), allowed
+                to use the rate limit reserved for them
+            idempotency_key (str): Loops sends the email once per key (within
+                24 hours), a retried call with the same key is not sent again
 
-        # Returns:
-        #     bool: True if the email was sent successfully, False otherwise
-        """
-        endpoint = "https://app.loops.so/api/v1/transactional"
+        Returns:
+            bool: True if the email was sent successfully, or already sent
+                with the same idempotency key
 
+        Raises:
+            LoopsRetryableError, LoopsPermanentError
+        """
         payload = {
             "transactionalId": transactional_id,
             "email": email,
-            "dataVariables": data_variables,
+            "dataVariables": data_variables or {},
         }
 
+        headers = {"Idempotency-Key": idempotency_key} if idempotency_key else None
         try:
-            response = requests.post(
-                endpoint,
-                headers={
-                    "Authorization": f"Bearer {self.api_key}",
-                    "Content-Type": "application/json",
-                },
-                json=payload,
-            )
+            body = self._post("transactional", payload, priority, headers)
+        except LoopsConflictError:
+            if not idempotency_key:
+                raise
+            log.info(f"Transactional email {idempotency_key} already sent")
+            return True
 
-            # Parse the response's success
-            # {'success': False}
-            success = response.json().get("success", False)
+        # Parse the response's success
+        # {'success': False}
+        if not body.get("success", False):
+            raise LoopsPermanentError(f"transactional: {body}")
 
-            if success:
-                log.info(f"Transactional email sent to {email}")
-            else:
-                log.error(f"Error sending transactional email to {email}")
-                log.error(response.json())
-
-            return success
-        except requests.exceptions.RequestException as e:
-            log.error(f"Error sending transactional email to {email}")
-            log.error(e)
-            return False
+        log.info(f"Transactional email sent to {email}")
+        return True
 
     def create_contact(
         self,
@@ -79,7 +311,7 @@ class LoopsClient:
         subscribed: bool = True,
         userGroup: str | None = None,
         userId: str | None = None,
-        mailingList: dict = {},
+        mailingList: dict | None = None,
         tenantId: str | None = None,
     ):
         """
@@ -89,8 +321,6 @@ class LoopsClient:
         Args:
             See https://loops.so/docs/api-reference/create-contact#request
         """
-        endpoint = "https://app.loops.so/api/v1/contacts/create"
-
         payload = {
             "email": email,
             "firstName": firstName,
@@ -99,25 +329,13 @@ class LoopsClient:
             "subscribed": subscribed,
             "userGroup": userGroup,
             "userId": userId,
-            "mailingList": mailingList,
+            "mailingList": mailingList or {},
             "tenantId": tenantId,
         }
 
-        try:
-            response = requests.post(
-                endpoint,
-                headers={
-                    "Authorization": f"Bearer {self.api_key}",
-                    "Content-Type": "application/json",
-                },
-                json=payload,
-            )
-
-            log.debug(response.json())
-
-            return response
-        except requests.exceptions.RequestException as e:
-            return {"error": str(e)}
+        body = self._post("contacts/create", payload)
+        log.debug(body)
+        return body
 
     def update_or_create_contact(
         self,
@@ -125,10 +343,10 @@ class LoopsClient:
         firstName: str | None = None,
         lastName: str | None = None,
         source: str = "app",
-        subscribed: bool = True,
+        subscribed: bool | None = True,
         userGroup: str | None = None,
         userId: str | None = None,
-        mailingList: dict = {},
+        mailingList: dict | None = None,
         tenantId: str | None = None,
     ):
         """
@@ -137,9 +355,9 @@ class LoopsClient:
 
         Args:
             See https://loops.so/docs/api-reference/update-contact
+            The fields left to None are not sent, Loops keeps their value
+            (e.g. `subscribed=None` doesn't resubscribe a contact).
         """
-        endpoint = "https://app.loops.so/api/v1/contacts/update"
-
         payload = {
             "email": email,
             "firstName": firstName,
@@ -148,65 +366,209 @@ class LoopsClient:
             "subscribed": subscribed,
             "userGroup": userGroup,
             "userId": userId,
-            "mailingList": mailingList,
+            "mailingList": mailingList or {},
             "tenantId": tenantId,
         }
+        payload = {key: value for key, value in payload.items() if value is not None}
 
-        try:
-            response = requests.post(
-                endpoint,
-                headers={
-                    "Authorization": f"Bearer {self.api_key}",
-                    "Content-Type": "application/json",
-                },
-                json=payload,
-            )
+        body = self._post("contacts/update", payload)
+        log.debug(body)
+        return body
 
-            log.debug(response.json())
 
-            return response
-        except requests.exceptions.RequestException as e:
-            return {"error": str(e)}
+# ---------------------------------------------------------------------------- #
+#                                 ASYNC CLIENT                                 #
+# ---------------------------------------------------------------------------- #
+# Seconds a call of a batch send waits for its rate limit before failing
+LOOPS_ASYNC_RATE_LIMIT_MAX_WAIT = 30
 
 
-@shared_task
-def send_transactional_email_task(
-    transactional_id: str,
-    email: str,
-    data_variables: dict = {},
-) -> bool:
-    loops = LoopsClient()
-    success = loops.send_transactional_email(transactional_id, email, data_variables)
-    return success
+class AsyncLoopsClient:
+    """
+    Asyncio variant of LoopsClient for large sends, with the same methods as
+    coroutines and the same errors.
 
+    Up to `max_in_flight` calls run concurrently over a dedicated pool of
+    as many keep-alive connections. The blocking HTTP calls run in a thread
+    pool of that size (there is no asyncio HTTP client in the dependencies),
+    which bounds the number in flight. The client isn't tied to an event
+    loop, so it can be kept between sends (see get_async_client) and reuse
+    its connections.
 
-@shared_task
-def create_contact_task(
-    email: str,
-    firstName: str,
-    lastName: str,
-    source: str = "app",
-    subscribed: bool = True,
-    userGroup: str | None = None,
-    userId: str | None = None,
-    mailingList: dict = {},
-    tenantId: str | None = None,
-):
-    loops = LoopsClient()
-    loops.create_contact(
-        email,
-        firstName,
-        lastName,
-        source,
-        subscribed,
-        userGroup,
-        userId,
-        mailingList,
-        tenantId,
-    )
+    The throughput is still bounded by the LOOPS_RATE_LIMITS token buckets
+    shared by every process (by default 7 transactional emails per second,
+    a fifth of them reserved for priority emails, and 3 contact calls per
+    second). The concurrency only overlaps the latency of the calls up to
+    that rate, it doesn't raise it: a batch of 1000 emails takes at least
+    1000 / 5.6 seconds whatever `max_in_flight` is.
 
+    Usage:
+        async with AsyncLoopsClient(max_in_flight=10) as loops:
+            results = await loops.send_many("send_transactional_email", payloads)
+    """
 
-@shared_task
+    def __init__(
+        self,
+        max_in_flight: int = LOOPS_ASYNC_CONCURRENCY,
+        api_key: str | None = None,
+        circuit=LOOPS_CIRCUIT,
+        rate_limits=LOOPS_RATE_LIMITS,
+    ):
+        self.max_in_flight = max_in_flight
+        # Bulk sends wait for the rate limit rather than being rescheduled
+        self._client = LoopsClient(
+            api_key,
+            session=build_session(max_in_flight),
+            circuit=circuit,
+            rate_limits=rate_limits,
+            max_wait=LOOPS_ASYNC_RATE_LIMIT_MAX_WAIT,
+        )
+        self._executor = ThreadPoolExecutor(max_in_flight, thread_name_prefix="loops")
+
+    async def __aenter__(self):
+        return self
+
+    async def __aexit__(self, *exc_info):
+        self.close()
+
+    def close(self):
+        self._executor.shutdown(wait=False)
+        self._client.session.close()
+
+    async def _call(self, method, *args, **kwargs):
+        return await asyncio.get_running_loop().run_in_executor(
+            self._executor, partial(method, *args, **kwargs)
+        )
+
+    async def send_transactional_email(
+        self,
+        transactional_id: str,
+        email: str,
+        data_variables: dict | None = None,
+        priority: bool = False,
+        idempotency_key: str | None = None,
+    ) -> bool:
+        return await self._call(
+            self._client.send_transactional_email,
+            transactional_id,
+            email,
+            data_variables,
+            priority,
+            idempotency_key,
+        )
+
+    async def create_contact(self, email: str, **fields):
+        return await self._call(self._client.create_contact, email, **fields)
+
+    async def update_or_create_contact(self, email: str, **fields):
+        return await self._call(self._client.update_or_create_contact, email, **fields)
+
+    async def send_many(self, method: str, payloads: list[dict]) -> list:
+        """
+        Call `method` (e.g. "send_transactional_email") once per payload of
+        keyword arguments, concurrently.
+
+        Returns:
+            list: The result, or the raised exception, of every payload in order
+        """
+        call = getattr(self, method)
+        return await asyncio.gather(
+            *(call(**payload) for payload in payloads), return_exceptions=True
+        )
+
+
+LOOPS_BATCH_METHODS = (
+    "send_transactional_email",
+    "create_contact",
+    "update_or_create_contact",
+)
+
+
+_async_client = None
+_async_client_pid = None
+_async_client_lock = threading.Lock()
+
+
+def get_async_client() -> AsyncLoopsClient:
+    """
+    Return the process-wide AsyncLoopsClient of the batch sends, so every
+    batch (e.g. each outbox drain, even of a single login code) reuses its
+    keep-alive connections and threads instead of a new handshake. A new
+    client is created after a fork, like get_session.
+    """
+    global _async_client, _async_client_pid
+
+    pid = os.getpid()
+    if _async_client is None or _async_client_pid != pid:
+        with _async_client_lock:
+            if _async_client is None or _async_client_pid != pid:
+                _async_client = AsyncLoopsClient()
+                _async_client_pid = pid
+    return _async_client
+
+
+def run_loops_batch(method: str, payloads: list[dict]) -> list:
+    """
+    Blocking helper for tasks: run `send_many` of the process-wide
+    AsyncLoopsClient in a new event loop and return its results.
+    """
+    if method not in LOOPS_BATCH_METHODS:
+        raise ValueError(f"Unknown Loops batch method {method}")
+
+    if not payloads:
+        return []
+    return asyncio.run(get_async_client().send_many(method, payloads))
+
+
+# ---------------------------------------------------------------------------- #
+#                                     TASKS                                    #
+# ---------------------------------------------------------------------------- #
+_client = None
+_client_pid = None
+
+
+def get_loops_client() -> LoopsClient:
+    """
+    Return the LoopsClient shared by the tasks of this process, built on the
+    pooled session.
+    """
+    global _client, _client_pid
+
+    pid = os.getpid()
+    if _client is None or _client_pid != pid:
+        _client = LoopsClient()
+        _client_pid = pid
+    return _client
+
+
+class LoopsTask(Task):
+    """
+    Task base class rescheduling retries no earlier than the `retry_after`
+    of the Loops error (rate limit or open circuit), instead of burning
+    retries on calls bound to fail.
+    """
+
+    def retry(self, *args, exc=None, countdown=None, eta=None, **kwargs):
+        retry_after = getattr(exc, "retry_after", None)
+        if retry_after and eta is None and (countdown or 0) < retry_after:
+            countdown = retry_after + random.uniform(0, 1)
+        return super().retry(*args, exc=exc, countdown=countdown, eta=eta, **kwargs)
+
+
+# Temporary failures are retried with an exponential backoff (5s, 10s, 20s...
+# up to 10 minutes) and full jitter, so the retries of many tasks failing at
+# the same time are spread out. Permanent failures are not retried.
+LOOPS_RETRY_POLICY = {
+    "base": LoopsTask,
+    "autoretry_for": (LoopsRetryableError,),
+    "retry_backoff": 5,
+    "retry_backoff_max": 600,
+    "retry_jitter": True,
+    "max_retries": 8,
+}
+
+
+@shared_task(**LOOPS_RETRY_POLICY)
 def update_or_create_contact_task(
     email: str,
     firstName: str,
@@ -215,18 +577,140 @@ def update_or_create_contact_task(
     subscribed: bool = True,
     userGroup: str | None = None,
     userId: str | None = None,
-    mailingList: dict = {},
+    mailingList: dict | None = None,
     tenantId: str | None = None,
 ):
-    loops = LoopsClient()
-    loops.update_or_create_contact(
-        email,
-        firstName,
-        lastName,
-        source,
-        subscribed,
-        userGroup,
-        userId,
-        mailingList,
-        tenantId,
-    )
+    loops = get_loops_client()
+    try:
+        loops.update_or_create_contact(
+            email,
+            firstName,
+            lastName,
+            source,
+            subscribed,
+            userGroup,
+            userId,
+            mailingList,
+            tenantId,
+        )
+    except LoopsPermanentError as e:
+        log.error(f"Error syncing the Loops contact {email}: {e}")
+        return False
+    return True
+
+
+# ---------------------------------------------------------------------------- #
+#                                 CONTACT SYNC                                 #
+# ---------------------------------------------------------------------------- #
+# Pending contact updates, a Redis hash of email -> JSON update
+CONTACT_SYNC_KEY = "loops:contact_sync:pending"
+# Updates taken by the running (or an interrupted) flush
+CONTACT_SYNC_FLUSHING_KEY = "loops:contact_sync:flushing"
+CONTACT_SYNC_LOCK_KEY = "loops:contact_sync:lock"
+# The lock expires after this time (seconds) unless the flush extends it
+CONTACT_SYNC_LOCK_TIMEOUT = 10 * 60
+# A flush stops after this time (seconds), the updates left wait for the next
+# one. At the contacts rate limit (shared with the resync) a large buffer
+# takes several runs.
+CONTACT_SYNC_TIME_LIMIT = 2 * 60
+
+
+def queue_contact_update(email: str, **fields):
+    """
+    Buffer a Loops contact update (the update_or_create_contact arguments)
+    until the next flush_contact_updates_task, once the current transaction
+    commits.
+
+    Updates are keyed by email and the last one wins, so a burst of changes
+    of the same user results in a single call to Loops. If Redis is
+    unavailable, the update is sent by its own task instead.
+    """
+
+    def buffer():
+        try:
+            get_redis().hset(CONTACT_SYNC_KEY, email, json.dumps(fields))
+        except redis.RedisError as e:
+            log.warning(f"Contact sync buffer unavailable ({e}), sending {email}")
+            dispatch(update_or_create_contact_task, email=email, **fields)
+
+    transaction.on_commit(buffer)
+
+
+@shared_task
+def flush_contact_updates_task():
+    """
+    Periodic task sending the buffered contact updates to Loops with the
+    AsyncLoopsClient, in batches of LOOPS_CONTACT_SYNC_BATCH_SIZE with
+    LOOPS_CONTACT_SYNC_CONCURRENCY calls in flight.
+
+    The pending hash is renamed before being read, so updates buffered during
+    the flush wait for the next one. Updates that fail temporarily, or that
+    weren't sent within CONTACT_SYNC_TIME_LIMIT, stay in the flushing hash
+    and are sent by the next flush, before the newer pending ones. The lock
+    is extended after every batch so a concurrent flush can't send the same
+    updates.
+    """
+    client = get_redis()
+    lock = client.lock(CONTACT_SYNC_LOCK_KEY, timeout=CONTACT_SYNC_LOCK_TIMEOUT)
+    if not lock.acquire(blocking=False):
+        log.info("A contact sync flush is already running")
+        return 0
+
+    deadline = time.monotonic() + CONTACT_SYNC_TIME_LIMIT
+    synced = 0
+    try:
+        # Take the pending updates, unless an interrupted flush left some
+        if not client.exists(CONTACT_SYNC_FLUSHING_KEY):
+            try:
+                client.rename(CONTACT_SYNC_KEY, CONTACT_SYNC_FLUSHING_KEY)
+            except redis.ResponseError:
+                # No pending updates
+                return 0
+
+        items = client.hscan_iter(
+            CONTACT_SYNC_FLUSHING_KEY, count=LOOPS_CONTACT_SYNC_BATCH_SIZE
+        )
+
+        async def flush():
+            nonlocal synced
+            async with AsyncLoopsClient(LOOPS_CONTACT_SYNC_CONCURRENCY) as loops:
+                while batch := list(islice(items, LOOPS_CONTACT_SYNC_BATCH_SIZE)):
+                    payloads = [
+                        {"email": email.decode(), **json.loads(update)}
+                        for email, update in batch
+                    ]
+                    emails = [payload["email"] for payload in payloads]
+                    results = await loops.send_many(
+                        "update_or_create_contact", payloads
+                    )
+
+                    done = []
+                    for email, result in zip(emails, results):
+                        if isinstance(result, LoopsRetryableError):
+                            log.warning(f"Contact sync of {email} deferred: {result}")
+                            continue
+                        if isinstance(result, LoopsPermanentError):
+                            log.error(
+                                f"Error syncing the Loops contact {email}: {result}"
+                            )
+                        elif isinstance(result, Exception):
+                            raise result
+                        done.append(email)
+                    if done:
+                        client.hdel(CONTACT_SYNC_FLUSHING_KEY, *done)
+                    synced += len(done)
+                    lock.extend(CONTACT_SYNC_LOCK_TIMEOUT, replace_ttl=True)
+
+                    if len(done) < len(batch) and LOOPS_CIRCUIT.retry_after():
+                        # Loops is down, keep the rest for the next flush
+                        break
+                    if time.monotonic() > deadline:
+                        log.info("Contact sync flush time limit reached")
+                        break
+
+        asyncio.run(flush())
+    finally:
+        lock.release()
+
+    log.info(f"Synced {synced} Loops contacts")
+    return synced
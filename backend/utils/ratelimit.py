@@ -0,0 +1,227 @@
+import logging
+import time
+
+import redis
+
+# Utils
+from utils.redis import get_redis
+
+log = logging.getLogger(__name__)
+
+# Refill the bucket for the time elapsed since the last call, then take a
+# token if there is one above the floor (the tokens reserved for priority
+# callers). Returns 0 if a token was taken, otherwise the milliseconds until
+# there will be one. The Redis clock is used, so every process agrees on it.
+TOKEN_BUCKET_SCRIPT = """
+if redis.replicate_commands then redis.replicate_commands() end
+
+local rate = tonumber(ARGV[1])
+local capacity = tonumber(ARGV[2])
+local floor = tonumber(ARGV[3])
+
+local time = redis.call("TIME")
+local now = tonumber(time[1]) * 1000 + math.floor(tonumber(time[2]) / 1000)
+
+local state = redis.call("HMGET", KEYS[1], "tokens", "ts")
+local tokens = tonumber(state[1]) or capacity
+local ts = tonumber(state[2]) or now
+tokens = math.min(capacity, tokens + math.max(0, now - ts) * rate / 1000)
+
+local wait = 0
+if tokens >= floor + 1 then
+    tokens = tokens - 1
+else
+    wait = math.ceil((floor + 1 - tokens) * 1000 / rate)
+end
+
+redis.call("HSET", KEYS[1], "tokens", tokens, "ts", now)
+redis.call("PEXPIRE", KEYS[1], math.ceil(capacity * 1000 / rate) + 1000)
+return wait
+"""
+
+
+class TokenBucket:
+    """
+    Token bucket rate limiter shared by every process through Redis, updated
+    atomically by a Lua script.
+
+    The bucket holds up to `capacity` tokens and is refilled at `rate` tokens
+    per second. The last `reserve` tokens can only be taken by priority
+    callers, so they still get through when the bucket is drained by bulk
+    work.
+
+    If Redis is unavailable calls are not limited.
+
+    Usage:
+        bucket = TokenBucket("loops:transactional", rate=7)
+        if retry_after := bucket.wait(max_wait=2):
+            # No token within 2 seconds, try again in retry_after seconds
+            ...
+    """
+
+    def __init__(
+        self,
+        name: str,
+        rate: float,
+        capacity: float | None = None,
+        reserve: float = 0,
+    ):
+        self.key = f"ratelimit:{name}"
+        self.rate = rate
+        self.capacity = capacity or rate
+        self.reserve = reserve
+        self._script = None
+
+    def acquire(self, priority: bool = False) -> float:
+        """
+        Take a token. Returns 0 on success, otherwise the seconds until one
+        will be available.
+        """
+        try:
+            if self._script is None:
+                self._script = get_redis().register_script(TOKEN_BUCKET_SCRIPT)
+            wait = self._script(
+                keys=[self.key],
+                args=[self.rate, self.capacity, 0 if priority else self.reserve],
+            )
+        except redis.RedisError as e:
+            log.warning(f"Rate limit {self.key}: state unavailable ({e})")
+            return 0
+        return wait / 1000
+
+    def wait(self, max_wait: float, priority: bool = False) -> float:
+        """
+        Take a token, waiting up to `max_wait` seconds for one. Returns 0 on
+        success, otherwise the seconds until one will be available.
+        """
+        deadline = time.monotonic() + max_wait
+        while wait := self.acquire(priority):
+            if time.monotonic() + wait > deadline:
+                return wait
+            time.sleep(wait)
+        return 0
+
+
+# Sliding window counter: the hits of the current fixed window plus those of
+# the previous one, weighted by how much of it the sliding window still
+# covers. If there is room the hit is counted and 0 returned, otherwise the
+# milliseconds until there will be room. Allowed and rejected hits are counted
+# in the stats hash (KEYS[2]) under ARGV[3].
+SLIDING_WINDOW_SCRIPT = """
+if redis.replicate_commands then redis.replicate_commands() end
+
+local limit = tonumber(ARGV[1])
+local period = tonumber(ARGV[2])
+
+local time = redis.call("TIME")
+local now = tonumber(time[1]) * 1000 + math.floor(tonumber(time[2]) / 1000)
+local window = math.floor(now / period)
+local elapsed = now - window * period
+
+local state = redis.call("HMGET", KEYS[1], "window", "current", "previous")
+local current = tonumber(state[2]) or 0
+local previous = tonumber(state[3]) or 0
+if tonumber(state[1]) ~= window then
+    if tonumber(state[1]) == window - 1 then
+        previous = current
+    else
+        previous = 0
+    end
+    current = 0
+end
+
+local wait = 0
+if previous * (period - elapsed) / period + current + 1 > limit then
+    if current + 1 > limit then
+        -- Full until the next window, and until the weight of this one
+        -- (then the previous) drops enough
+        wait = period - elapsed + math.ceil(period * (current + 1 - limit) / math.max(current, 1))
+    else
+        wait = math.ceil(period * (previous + current + 1 - limit) / previous) - elapsed
+    end
+    wait = math.max(wait, 1)
+    redis.call("HINCRBY", KEYS[2], ARGV[3] .. ":throttled", 1)
+else
+    current = current + 1
+    redis.call("HINCRBY", KEYS[2], ARGV[3] .. ":allowed", 1)
+end
+
+redis.call("HSET", KEYS[1], "window", window, "current", current, "previous", previous)
+redis.call("PEXPIRE", KEYS[1], 2 * period)
+return wait
+"""
+
+# One hash of allowed / throttled counters per sliding window name
+SLIDING_WINDOW_STATS_PREFIX = "ratelimit:stats:"
+
+
+class SlidingWindow:
+    """
+    Sliding window rate limiter: at most `limit` hits per key in any
+    `period` seconds, shared by every process through Redis and updated
+    atomically by a Lua script (a single round trip, no read-modify-write
+    race between processes).
+
+    The window is approximated from the counts of the current and previous
+    fixed windows, so the state of a key is a small hash whatever the
+    limit. Rejected hits aren't counted, a client retrying too fast is let
+    through again once its earlier hits leave the window.
+
+    The allowed and throttled hits of each `counter` are counted per window
+    name, see `read_sliding_window_stats`.
+
+    If Redis is unavailable hits are not limited.
+
+    Usage:
+        window = SlidingWindow("auth_start", limit=10, period=60)
+        if retry_after := window.hit(ip):
+            # Over the limit, try again in retry_after seconds
+            ...
+    """
+
+    def __init__(self, name: str, limit: int, period: float):
+        self.name = name
+        self.limit = limit
+        self.period = period
+        self._script = None
+
+    def hit(self, key: str, counter: str = "hits") -> float:
+        """
+        Count a hit of `key`. Returns 0 if it is allowed, otherwise the
+        seconds until it would be.
+        """
+        try:
+            if self._script is None:
+                self._script = get_redis().register_script(SLIDING_WINDOW_SCRIPT)
+            wait = self._script(
+                keys=[
+                    f"ratelimit:window:{self.name}:{key}",
+                    f"{SLIDING_WINDOW_STATS_PREFIX}{self.name}",
+                ],
+                args=[self.limit, int(self.period * 1000), counter],
+            )
+        except redis.RedisError as e:
+            log.warning(f"Rate limit {self.name}: state unavailable ({e})")
+            return 0
+        return wait / 1000
+
+
+def read_sliding_window_stats() -> dict[str, dict[str, int]]:
+    """
+    Return the allowed and throttled hit counters, per sliding window name.
+    """
+    client = get_redis()
+    stats = {}
+    for key in client.scan_iter(f"{SLIDING_WINDOW_STATS_PREFIX}*"):
+        name = key.decode().removeprefix(SLIDING_WINDOW_STATS_PREFIX)
+        stats[name] = {
+            field.decode(): int(value) for field, value in client.hgetall(key).items()
+        }
+    return stats
+
+
+def reset_sliding_window_stats():
+    client = get_redis()
+    keys = list(client.scan_iter(f"{SLIDING_WINDOW_STATS_PREFIX}*"))
+    if keys:
+        client.delete(*keys)
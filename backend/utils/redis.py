@@ -0,0 +1,26 @@
+import redis
+
+# django
+from django.conf import settings
+
+_client = None
+
+
+def get_redis() -> redis.Redis:
+    """
+    Return the process-wide Redis client used for state shared by every web
+    and worker process (circuit breakers, rate limits...), on the cache Redis.
+
+    Timeouts are short: callers are expected to degrade gracefully on
+    `redis.RedisError` rather than wait for Redis.
+    """
+    global _client
+
+    if _client is None:
+        _client = redis.Redis.from_url(
+            settings.CACHE_REDIS_URL,
+            socket_connect_timeout=1,
+            socket_timeout=1,
+            health_check_interval=30,
+        )
+    return _client
@@ -0,0 +1,168 @@
+import logging
+import threading
+import time
+from collections import Counter, defaultdict
+from datetime import datetime
+
+import redis
+
+# Utils
+from utils.redis import get_redis
+
+log = logging.getLogger(__name__)
+
+# One Redis hash of counters per task name
+TELEMETRY_KEY_PREFIX = "celery:telemetry:"
+
+# Counters not updated for this long are dropped (seconds)
+TELEMETRY_TTL = 7 * 24 * 60 * 60
+
+# Each process flushes its counters to Redis at most this often (seconds)
+TELEMETRY_FLUSH_INTERVAL = 10
+
+# Upper bounds (seconds) of the histogram buckets of the durations
+TELEMETRY_BUCKETS = (0.01, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10, 30, 60, 300)
+
+# Header set on every task message when it is published
+PUBLISHED_AT_HEADER = "published_at"
+
+
+class TaskTelemetry:
+    """
+    Per task name counters of the Celery tasks run by this process: outcome,
+    errors, and histograms of the queue wait (publish or ETA to start) and of
+    the run time.
+
+    The counters are aggregated in memory and added to Redis every
+    TELEMETRY_FLUSH_INTERVAL seconds, so the counters of every worker process
+    are merged there. See the `celery_stats` command.
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._counters = defaultdict(Counter)
+        self._last_flush = time.monotonic()
+
+    # ---------------------------------------------------------------------------- #
+    #                                 SIGNAL HOOKS                                 #
+    # ---------------------------------------------------------------------------- #
+    def task_published(self, headers: dict | None):
+        if headers is not None:
+            headers[PUBLISHED_AT_HEADER] = time.time()
+
+    def task_started(self, task):
+        request = task.request
+        request.telemetry_started_at = time.monotonic()
+
+        # Not set when the task is called directly or eagerly
+        published_at = getattr(request, PUBLISHED_AT_HEADER, None)
+        if published_at is None:
+            return
+
+        # A task scheduled for later (countdown, retry) only waits from its ETA
+        queued_at = published_at
+        if request.eta:
+            try:
+                queued_at = max(
+                    queued_at, datetime.fromisoformat(request.eta).timestamp()
+                )
+            except (TypeError, ValueError):
+                pass
+        self.observe(task.name, "wait", time.time() - queued_at)
+
+    def task_finished(self, task, state: str | None):
+        started_at = getattr(task.request, "telemetry_started_at", None)
+        if started_at is not None:
+            self.observe(task.name, "run", time.monotonic() - started_at)
+        self.count(task.name, f"state:{state or 'UNKNOWN'}")
+        self.flush()
+
+    def task_failed(self, task, exception: BaseException):
+        self.count(task.name, f"error:{type(exception).__name__}")
+
+    # ---------------------------------------------------------------------------- #
+    #                                   COUNTERS                                   #
+    # ---------------------------------------------------------------------------- #
+    def count(self, name: str, field: str, value: float = 1):
+        with self._lock:
+            self._counters[name][field] += value
+
+    def observe(self, name: str, metric: str, seconds: float):
+        """
+        Add a duration to the `metric` histogram of a task.
+        """
+        seconds = max(seconds, 0)
+        bucket = next((b for b in TELEMETRY_BUCKETS if seconds <= b), "inf")
+        with self._lock:
+            counters = self._counters[name]
+            counters[f"{metric}:count"] += 1
+            counters[f"{metric}:sum"] += seconds
+            counters[f"{metric}:le:{bucket}"] += 1
+
+    def flush(self, force: bool = False):
+        """
+        Add the counters to Redis if TELEMETRY_FLUSH_INTERVAL elapsed since the
+        last flush (or if `force`). The counters are lost if Redis is
+        unavailable.
+        """
+        with self._lock:
+            if not self._counters:
+                return
+            now = time.monotonic()
+            if not force and now - self._last_flush < TELEMETRY_FLUSH_INTERVAL:
+                return
+            counters, self._counters = self._counters, defaultdict(Counter)
+            self._last_flush = now
+
+        try:
+            pipe = get_redis().pipeline(transaction=False)
+            for name, fields in counters.items():
+                key = f"{TELEMETRY_KEY_PREFIX}{name}"
+                for field, value in fields.items():
+                    pipe.hincrbyfloat(key, field, value)
+                pipe.expire(key, TELEMETRY_TTL)
+            pipe.execute()
+        except redis.RedisError as e:
+            log.warning(f"Task telemetry unavailable ({e})")
+
+
+telemetry = TaskTelemetry()
+
+
+def read_task_stats() -> dict[str, dict[str, float]]:
+    """
+    Return the counters flushed to Redis by every process, per task name.
+    """
+    client = get_redis()
+    stats = {}
+    for key in client.scan_iter(f"{TELEMETRY_KEY_PREFIX}*"):
+        name = key.decode().removeprefix(TELEMETRY_KEY_PREFIX)
+        stats[name] = {
+            field.decode(): float(value) for field, value in client.hgetall(key).items()
+        }
+    return stats
+
+
+def reset_task_stats():
+    client = get_redis()
+    keys = list(client.scan_iter(f"{TELEMETRY_KEY_PREFIX}*"))
+    if keys:
+        client.delete(*keys)
+
+
+def percentile(counters: dict[str, float], metric: str, q: float) -> float | None:
+    """
+    Estimate the `q` (0-1) percentile of a histogram as the upper bound of
+    the bucket it falls into. Returns None if there is no data, inf if it is
+    above the last bucket.
+    """
+    total = counters.get(f"{metric}:count", 0)
+    if not total:
+        return None
+
+    seen = 0
+    for bucket in (*TELEMETRY_BUCKETS, "inf"):
+        seen += counters.get(f"{metric}:le:{bucket}", 0)
+        if seen >= q * total:
+            return float(bucket)
+    return float("inf")
@@ -0,0 +1,95 @@
+import hashlib
+
+# Django Rest Framework
+from rest_framework.settings import api_settings
+from rest_framework.throttling import BaseThrottle
+
+# Utils
+from utils.ratelimit import SlidingWindow
+
+# Seconds of the period units of a rate ("10/minute", "100/h"...)
+RATE_PERIODS = {"s": 1, "m": 60, "h": 60 * 60, "d": 24 * 60 * 60}
+
+
+def parse_rate(rate: str) -> tuple[int, int]:
+    """
+    Parse a DRF rate ("<hits>/<second|minute|hour|day>") into the number of
+    hits and the period in seconds.
+    """
+    hits, period = rate.split("/")
+    return int(hits), RATE_PERIODS[period[0]]
+
+
+class SlidingWindowThrottle(BaseThrottle):
+    """
+    Scoped throttle backed by Redis sliding windows (see
+    utils.ratelimit.SlidingWindow), instead of DRF's cache based throttles
+    whose read-modify-write races between processes.
+
+    The view's `throttle_scope` selects the rates in DEFAULT_THROTTLE_RATES:
+        - "<scope>": hits per client IP
+        - "<scope>_identifier": hits per identifier (e.g. the email an auth
+          code is sent to), for views defining
+          `get_throttle_identifier(request)`
+    A scope without a rate isn't limited. The allowed and throttled hits are
+    counted per scope, see the `throttle_stats` command.
+
+    Pair it with ThrottleFirstMixin so throttled requests are rejected before
+    any other work.
+    """
+
+    # Built once per scope and rate, they hold no per request state
+    windows: dict[tuple[str, str], SlidingWindow] = {}
+
+    def get_window(self, scope: str) -> SlidingWindow | None:
+        rate = api_settings.DEFAULT_THROTTLE_RATES.get(scope)
+        if not rate:
+            return None
+        window = self.windows.get((scope, rate))
+        if window is None:
+            window = SlidingWindow(scope, *parse_rate(rate))
+            self.windows[(scope, rate)] = window
+        return window
+
+    def allow_request(self, request, view) -> bool:
+        self.retry_after = None
+        scope = getattr(view, "throttle_scope", None)
+        if not scope:
+            return True
+
+        checks = [(scope, "ip", self.get_ident(request))]
+        get_identifier = getattr(view, "get_throttle_identifier", None)
+        if get_identifier and (identifier := get_identifier(request)):
+            # Don't keep the identifiers in Redis
+            digest = hashlib.sha256(identifier.encode()).hexdigest()
+            checks.append((f"{scope}_identifier", "identifier", digest))
+
+        for rate_scope, counter, key in checks:
+            window = self.get_window(rate_scope)
+            if window and (retry_after := window.hit(key, counter)):
+                self.retry_after = retry_after
+                return False
+        return True
+
+    def wait(self) -> float | None:
+        return self.retry_after
+
+
+class ThrottleFirstMixin:
+    """
+    APIView mixin checking the throttles before the authentication and the
+    permissions (DRF checks them last), so throttled requests are rejected
+    before any database query. Only for throttles that don't depend on
+    request.user.
+    """
+
+    throttles_checked = False
+
+    def initial(self, request, *args, **kwargs):
+        self.check_throttles(request)
+        self.throttles_checked = True
+        super().initial(request, *args, **kwargs)
+
+    def check_throttles(self, request):
+        if not self.throttles_checked:
+            super().check_throttles(request)
@@ -36,6 +36,46 @@ export interface Invitation {
   readonly updated_at: string;
 }
 
+/**
+ * Bulk invitation import from either a CSV file (one email per row, or an
+`email` column if the first row is a header) or a JSON list of emails.
+ */
+export interface InvitationImportRequest {
+  file?: Blob;
+  /** @maxItems 10000 */
+  emails?: string[];
+}
+
+export interface InvitationImportResult {
+  invited: number;
+  results: InvitationImportRow[];
+}
+
+export interface InvitationImportRow {
+  row: number;
+  email: string;
+  status: InvitationImportStatusEnum;
+}
+
+/**
+ * * `invited` - Invited
+ * `invalid` - Invalid email
+ * `duplicate` - Duplicated in the import
+ * `member` - Already a member of a tenant
+ * `already_invited` - Already invited
+ */
+export type InvitationImportStatusEnum =
+  (typeof InvitationImportStatusEnum)[keyof typeof InvitationImportStatusEnum];
+
+// eslint-disable-next-line @typescript-eslint/no-redeclare
+export const InvitationImportStatusEnum = {
+  invited: "invited",
+  invalid: "invalid",
+  duplicate: "duplicate",
+  member: "member",
+  already_invited: "already_invited",
+} as const;
+
 export interface InvitationRequest {
   /**
    * @minLength 1
@@ -47,6 +87,22 @@ export interface InvitationRequest {
 /**
  * Serializer for user profile data (avatar, etc.).
  */
+export interface PaginatedInvitationList {
+  /** @nullable */
+  next?: string | null;
+  /** @nullable */
+  previous?: string | null;
+  results: Invitation[];
+}
+
+export interface PaginatedTenantUserListList {
+  /** @nullable */
+  next?: string | null;
+  /** @nullable */
+  previous?: string | null;
+  results: TenantUserList[];
+}
+
 export interface PatchedUserProfileRequest {
   /** @nullable */
   avatar?: Blob | null;
@@ -245,6 +301,47 @@ export interface TenantUserUpdateRequest {
   role?: RoleEnum;
 }
 
+export type TenantsInvitationsListParams = {
+  accepted?: boolean;
+  /**
+   * The pagination cursor value.
+   */
+  cursor?: string;
+  email?: string;
+  /**
+   * Number of results to return per page.
+   */
+  page_size?: number;
+};
+
+export type TenantsTenantUsersListRole =
+  (typeof TenantsTenantUsersListRole)[keyof typeof TenantsTenantUsersListRole];
+
+// eslint-disable-next-line @typescript-eslint/no-redeclare
+export const TenantsTenantUsersListRole = {
+  admin: "admin",
+  owner: "owner",
+  user: "user",
+} as const;
+
+export type TenantsTenantUsersListParams = {
+  /**
+   * The pagination cursor value.
+   */
+  cursor?: string;
+  email?: string;
+  /**
+   * Number of results to return per page.
+   */
+  page_size?: number;
+  /**
+   * * `owner` - Owner
+   * `admin` - Admin
+   * `user` - User
+   */
+  role?: TenantsTenantUsersListRole;
+};
+
 /**
  * Serializer for basic user information.
  */
@@ -288,3 +385,4 @@ export interface UserProfileRequest {
   /** @nullable */
   avatar?: Blob | null;
 }
+
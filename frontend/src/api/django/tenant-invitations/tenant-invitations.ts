@@ -1,5 +1,12 @@
 // @ts-nocheck
-import type { Invitation, InvitationRequest } from "../djangoAPI.schemas";
+import type {
+  Invitation,
+  InvitationImportRequest,
+  InvitationImportResult,
+  InvitationRequest,
+  PaginatedInvitationList,
+  TenantsInvitationsListParams,
+} from "../djangoAPI.schemas";
 
 import { customAxiosInstance } from "../../axios";
 
@@ -9,10 +16,11 @@ type SecondParameter<T extends (...args: never) => unknown> = Parameters<T>[1];
  * A viewset that provides the `create` and `list` actions.
  */
 export const tenantsInvitationsList = (
-  options?: SecondParameter<typeof customAxiosInstance<Invitation[]>>,
+  params?: TenantsInvitationsListParams,
+  options?: SecondParameter<typeof customAxiosInstance<PaginatedInvitationList>>,
 ) => {
-  return customAxiosInstance<Invitation[]>(
-    { url: `/tenants/invitations/`, method: "GET" },
+  return customAxiosInstance<PaginatedInvitationList>(
+    { url: `/tenants/invitations/`, method: "GET", params },
     options,
   );
 };
@@ -46,6 +54,35 @@ export const tenantsInvitationsResendCreate = (
     options,
   );
 };
+/**
+ * Invite many users at once from a CSV file or a list of emails.
+Returns the outcome of every row; the invitation emails are sent in
+the background.
+ */
+export const tenantsInvitationsBulkCreate = (
+  invitationImportRequest: InvitationImportRequest,
+  options?: SecondParameter<typeof customAxiosInstance<InvitationImportResult>>,
+) => {
+  const formData = new FormData();
+  if (invitationImportRequest.file !== undefined) {
+    formData.append(`file`, invitationImportRequest.file);
+  }
+  if (invitationImportRequest.emails !== undefined) {
+    invitationImportRequest.emails.forEach((value) =>
+      formData.append(`emails`, value),
+    );
+  }
+
+  return customAxiosInstance<InvitationImportResult>(
+    {
+      url: `/tenants/invitations/bulk/`,
+      method: "POST",
+      headers: { "Content-Type": "multipart/form-data" },
+      data: formData,
+    },
+    options,
+  );
+};
 export type TenantsInvitationsListResult = NonNullable<
   Awaited<ReturnType<typeof tenantsInvitationsList>>
 >;
@@ -55,3 +92,6 @@ export type TenantsInvitationsCreateResult = NonNullable<
 export type TenantsInvitationsResendCreateResult = NonNullable<
   Awaited<ReturnType<typeof tenantsInvitationsResendCreate>>
 >;
+export type TenantsInvitationsBulkCreateResult = NonNullable<
+  Awaited<ReturnType<typeof tenantsInvitationsBulkCreate>>
+>;
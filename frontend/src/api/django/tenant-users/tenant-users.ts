@@ -1,8 +1,9 @@
 // @ts-nocheck
 import type {
-  TenantUserList,
+  PaginatedTenantUserListList,
   TenantUserUpdate,
   TenantUserUpdateRequest,
+  TenantsTenantUsersListParams,
 } from "../djangoAPI.schemas";
 
 import { customAxiosInstance } from "../../axios";
@@ -13,10 +14,13 @@ type SecondParameter<T extends (...args: never) => unknown> = Parameters<T>[1];
  * List, Update and Destroy viewset for the TenantUser model.
  */
 export const tenantsTenantUsersList = (
-  options?: SecondParameter<typeof customAxiosInstance<TenantUserList[]>>,
+  params?: TenantsTenantUsersListParams,
+  options?: SecondParameter<
+    typeof customAxiosInstance<PaginatedTenantUserListList>
+  >,
 ) => {
-  return customAxiosInstance<TenantUserList[]>(
-    { url: `/tenants/tenant-users/`, method: "GET" },
+  return customAxiosInstance<PaginatedTenantUserListList>(
+    { url: `/tenants/tenant-users/`, method: "GET", params },
     options,
   );
 };
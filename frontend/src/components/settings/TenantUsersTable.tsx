@@ -36,7 +36,7 @@ import {
   TooltipContent,
   TooltipTrigger
 } from "@/components/ui/tooltip";
-import { Pencil, Plus } from "lucide-react";
+import { ChevronLeft, ChevronRight, Pencil, Plus } from "lucide-react";
 import { toast } from "sonner";
 import { Input } from "@/components/ui/input";
 import { Label } from "@/components/ui/label";
@@ -50,7 +50,9 @@ import {
 } from "@/api/django/tenant-invitations/tenant-invitations";
 import type {
   TenantUserList,
-  Invitation
+  Invitation,
+  PaginatedInvitationList,
+  PaginatedTenantUserListList
 } from "@/api/django/djangoAPI.schemas";
 import { RoleEnum } from "@/api/django/djangoAPI.schemas";
 import { useTenantStore } from "@/stores/TenantStore";
@@ -67,6 +69,59 @@ const roleBadgeVariants: Record<string, "default" | "secondary" | "outline"> = {
   user: "outline"
 };
 
+// Rows per page of the members and of the pending invitations
+const PAGE_SIZE = 20;
+
+// Delay before the email search is sent to the API
+const SEARCH_DEBOUNCE_MS = 300;
+
+type RoleFilter = "all" | (typeof RoleEnum)[keyof typeof RoleEnum];
+
+// Read the cursor of a page link (`next` or `previous`) of a paginated response
+const getCursor = (link?: string | null) =>
+  link ? (new URL(link).searchParams.get("cursor") ?? undefined) : undefined;
+
+// Previous / next controls of a cursor paginated list
+function CursorPager({
+  label,
+  page,
+  onChange
+}: {
+  label: string;
+  page: { next?: string | null; previous?: string | null } | null;
+  onChange: (cursor: string | undefined) => void;
+}) {
+  if (!page?.next && !page?.previous) return null;
+
+  return (
+    <div className="flex items-center justify-between gap-2">
+      <span className="text-sm text-muted-foreground">{label}</span>
+      <div className="flex gap-2">
+        <Button
+          variant="outline"
+          size="sm"
+          disabled={!page.previous}
+          onClick={() => onChange(getCursor(page.previous))}
+          className="h-8 w-8 p-0"
+        >
+          <ChevronLeft className="h-4 w-4" />
+          <span className="sr-only">Previous page</span>
+        </Button>
+        <Button
+          variant="outline"
+          size="sm"
+          disabled={!page.next}
+          onClick={() => onChange(getCursor(page.next))}
+          className="h-8 w-8 p-0"
+        >
+          <ChevronRight className="h-4 w-4" />
+          <span className="sr-only">Next page</span>
+        </Button>
+      </div>
+    </div>
+  );
+}
+
 // Combined type for displaying both users and pending invitations
 type UserOrInvitation =
   | { type: "user"; data: TenantUserList }
@@ -74,8 +129,19 @@ type UserOrInvitation =
 
 export function TenantUsersTable() {
   const { tenant } = useTenantStore();
-  const [users, setUsers] = useState<TenantUserList[]>([]);
-  const [invitations, setInvitations] = useState<Invitation[]>([]);
+  // Only the current page of each list is kept, the API filters them
+  const [usersPage, setUsersPage] =
+    useState<PaginatedTenantUserListList | null>(null);
+  const [invitationsPage, setInvitationsPage] =
+    useState<PaginatedInvitationList | null>(null);
+  const [usersCursor, setUsersCursor] = useState<string | undefined>();
+  const [invitationsCursor, setInvitationsCursor] = useState<
+    string | undefined
+  >();
+  const [invitationsVersion, setInvitationsVersion] = useState(0);
+  const [search, setSearch] = useState("");
+  const [emailFilter, setEmailFilter] = useState("");
+  const [roleFilter, setRoleFilter] = useState<RoleFilter>("all");
   const [isLoading, setIsLoading] = useState(true);
   const [editingUser, setEditingUser] = useState<TenantUserList | null>(null);
   const [selectedRole, setSelectedRole] = useState<string>("");
@@ -84,26 +150,70 @@ export function TenantUsersTable() {
   const [inviteEmail, setInviteEmail] = useState("");
   const [isSendingInvite, setIsSendingInvite] = useState(false);
 
-  const fetchUsers = async () => {
-    try {
-      const [usersData, invitationsData] = await Promise.all([
-        tenantsTenantUsersList(),
-        tenantsInvitationsList()
-      ]);
-      setUsers(usersData);
-      // Only show pending invitations (not yet accepted)
-      setInvitations(invitationsData.filter((inv) => inv.accepted_at === null));
-    } catch (error) {
-      console.error("Failed to fetch tenant users:", error);
-      toast.error("Failed to load team members.");
-    } finally {
-      setIsLoading(false);
-    }
-  };
+  // Search once the user stops typing, from the first page
+  useEffect(() => {
+    const timeout = setTimeout(() => {
+      setEmailFilter(search.trim());
+      setUsersCursor(undefined);
+      setInvitationsCursor(undefined);
+    }, SEARCH_DEBOUNCE_MS);
+    return () => clearTimeout(timeout);
+  }, [search]);
 
   useEffect(() => {
-    fetchUsers();
-  }, []);
+    let ignore = false;
+    tenantsTenantUsersList({
+      cursor: usersCursor,
+      page_size: PAGE_SIZE,
+      email: emailFilter || undefined,
+      role: roleFilter === "all" ? undefined : roleFilter
+    })
+      .then((page) => {
+        if (!ignore) setUsersPage(page);
+      })
+      .catch((error) => {
+        console.error("Failed to fetch tenant users:", error);
+        toast.error("Failed to load team members.");
+      })
+      .finally(() => {
+        if (!ignore) setIsLoading(false);
+      });
+    return () => {
+      ignore = true;
+    };
+  }, [usersCursor, emailFilter, roleFilter]);
+
+  useEffect(() => {
+    // Pending invitations have no role yet
+    if (roleFilter !== "all") {
+      setInvitationsPage(null);
+      return;
+    }
+
+    let ignore = false;
+    tenantsInvitationsList({
+      accepted: false,
+      cursor: invitationsCursor,
+      page_size: PAGE_SIZE,
+      email: emailFilter || undefined
+    })
+      .then((page) => {
+        if (!ignore) setInvitationsPage(page);
+      })
+      .catch((error) => {
+        console.error("Failed to fetch invitations:", error);
+        toast.error("Failed to load pending invitations.");
+      });
+    return () => {
+      ignore = true;
+    };
+  }, [invitationsCursor, emailFilter, roleFilter, invitationsVersion]);
+
+  const handleRoleFilterChange = (role: string) => {
+    setRoleFilter(role as RoleFilter);
+    setUsersCursor(undefined);
+    setInvitationsCursor(undefined);
+  };
 
   const handleEditRole = (user: TenantUserList) => {
     setEditingUser(user);
@@ -117,23 +227,22 @@ export function TenantUsersTable() {
 
   const handleUpdateRole = async () => {
     if (!editingUser || !selectedRole) return;
+    const role = selectedRole as (typeof RoleEnum)[keyof typeof RoleEnum];
 
     setIsUpdating(true);
     try {
-      await tenantsTenantUsersUpdate(editingUser.pk, {
-        role: selectedRole as (typeof RoleEnum)[keyof typeof RoleEnum]
-      });
+      await tenantsTenantUsersUpdate(editingUser.pk, { role });
 
-      // Update local state
-      setUsers((prevUsers) =>
-        prevUsers.map((user) =>
-          user.pk === editingUser.pk
-            ? {
-                ...user,
-                role: selectedRole as (typeof RoleEnum)[keyof typeof RoleEnum]
-              }
-            : user
-        )
+      // Update the current page
+      setUsersPage((prevPage) =>
+        prevPage
+          ? {
+              ...prevPage,
+              results: prevPage.results.map((user) =>
+                user.pk === editingUser.pk ? { ...user, role } : user
+              )
+            }
+          : prevPage
       );
 
       toast.success("Role updated successfully");
@@ -174,8 +283,9 @@ export function TenantUsersTable() {
       await tenantsInvitationsCreate({ email: inviteEmail });
       toast.success("Invitation sent successfully");
       handleCloseInviteDialog();
-      // Optionally refresh the users list
-      fetchUsers();
+      // Reload the pending invitations from their first page
+      setInvitationsCursor(undefined);
+      setInvitationsVersion((version) => version + 1);
     } catch (error) {
       console.error("Failed to send invitation:", error);
       toast.error("Failed to send invitation. Please try again.");
@@ -194,10 +304,13 @@ export function TenantUsersTable() {
     return fullName || user.email || "—";
   };
 
-  // Combine users and pending invitations for display
+  // Combine the current pages of users and pending invitations for display
   const combinedList: UserOrInvitation[] = [
-    ...users.map((user) => ({ type: "user" as const, data: user })),
-    ...invitations.map((invitation) => ({
+    ...(usersPage?.results ?? []).map((user) => ({
+      type: "user" as const,
+      data: user
+    })),
+    ...(invitationsPage?.results ?? []).map((invitation) => ({
       type: "invitation" as const,
       data: invitation
     }))
@@ -213,6 +326,26 @@ export function TenantUsersTable() {
           </CardDescription>
         </CardHeader>
         <CardContent>
+          <div className="mb-4 flex flex-col gap-2 sm:flex-row">
+            <Input
+              type="search"
+              placeholder="Search by email"
+              value={search}
+              onChange={(e) => setSearch(e.target.value)}
+              className="sm:max-w-xs"
+            />
+            <Select value={roleFilter} onValueChange={handleRoleFilterChange}>
+              <SelectTrigger className="sm:w-40">
+                <SelectValue placeholder="All roles" />
+              </SelectTrigger>
+              <SelectContent>
+                <SelectItem value="all">All roles</SelectItem>
+                <SelectItem value={RoleEnum.owner}>Owner</SelectItem>
+                <SelectItem value={RoleEnum.admin}>Admin</SelectItem>
+                <SelectItem value={RoleEnum.user}>User</SelectItem>
+              </SelectContent>
+            </Select>
+          </div>
           {isLoading ? (
             <div className="space-y-3">
               {[...Array(3)].map((_, i) => (
@@ -343,6 +476,18 @@ export function TenantUsersTable() {
               </TableBody>
             </Table>
           )}
+          <div className="mt-4 space-y-2">
+            <CursorPager
+              label="Members"
+              page={usersPage}
+              onChange={setUsersCursor}
+            />
+            <CursorPager
+              label="Pending invitations"
+              page={invitationsPage}
+              onChange={setInvitationsCursor}
+            />
+          </div>
           <div className="mt-4 flex justify-end">
             <Button
               variant="outline"